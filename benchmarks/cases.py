@@ -0,0 +1,365 @@
+"""
+Benchmark cases for the scrapers, the processing pipelines, dataset storage, the
+fetcher and import time.
+
+Fixtures come from `tests/assets`; tabular benchmarks run on synthetic frames shaped
+like `data/raw/products.csv`.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import Benchmark
+from scripts.scrape_discounts import process_discount_data
+from scripts.scrape_products import process_product_data, update_csv_with_archive
+from src.common import extract_next_data
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry
+from src.models import ProductTile
+from src.prices import Unit
+from src.ratelimit import AdaptiveRateLimiter
+from src.scrapers import ColesProductScraper, ColesProductTileScraper
+from src.standin import ColesStandIn
+from src.storage import RAW_PRODUCTS_SCHEMA, DatasetStore, StorageFormat
+from src.units import normalise_unit_prices
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ASSETS_DIR = os.path.join(REPO_DIR, "tests", "assets")
+BROWSE_PAGE = os.path.join(ASSETS_DIR, "coles-browse-dairy-eggs-fridge-page-4.html")
+PRODUCT_PAGE = os.path.join(ASSETS_DIR, "coles-appy-fizz-250ml-8060378.html")
+
+ROW_COUNTS = (10_000, 100_000, 1_000_000)
+HISTORY_DAYS = (1, 7, 30)
+HISTORY_PRODUCTS = 10_000
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as src:
+        return src.read()
+
+
+def _data_route_body(path: str) -> bytes:
+    # What the page's Next.js data route serves: its props, without the markup.
+    props = extract_next_data(_read(path))["props"]
+    return json.dumps(props).encode("utf-8")
+
+
+# --- Synthetic data --- #
+
+
+def make_product_frame(n: int, day: int = 0, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds `n` synthetic raw product rows, as written by `dump_products`.
+
+    Roughly a third of the products are on special with a "Was" price.
+    """
+    rng = np.random.default_rng(seed + day)
+    ids = np.arange(n).astype(str)
+    cents = rng.integers(100, 5000, n)
+    on_special = rng.random(n) < 0.3
+    was_cents = np.where(on_special, cents + rng.integers(10, 500, n), 0)
+
+    price = pd.Series(cents / 100).map("${:.2f}".format)
+    unit_price = pd.Series(cents / 50).map("${:.2f} per 1kg".format)
+    was = pd.Series(was_cents / 100).map(" | Was ${:.2f} on Oct 2024".format)
+    timestamp = f"2024-10-{day % 28 + 1:02d}T10:00:00+11:00"
+
+    return pd.DataFrame(
+        {
+            "name": "Product " + pd.Series(ids) + " | 500g",
+            "url": "/product/product-" + pd.Series(ids) + "-" + pd.Series(ids),
+            "price": price,
+            "price_calc_method": unit_price.where(~on_special, unit_price + was),
+            "image_url": "/images/" + pd.Series(ids) + ".jpg",
+            "was_price": pd.Series(was_cents / 100)
+            .map("${:.2f}".format)
+            .where(on_special, None),
+            "discount_percentage": None,
+            "special_type": pd.Series(on_special).map({True: "Special", False: None}),
+            "is_on_special": on_special,
+            "price_cents": cents,
+            "was_price_cents": pd.Series(was_cents).where(on_special),
+            "unit_price_cents": cents * 2,
+            "unit_quantity": 1.0,
+            "unit": Unit.KILOGRAM.value,
+            "category": "pantry",
+            "date": timestamp[:10],
+            "timestamp": timestamp,
+        }
+    )
+
+
+def make_tiles(n: int) -> List[ProductTile]:
+    """
+    Builds `n` synthetic ProductTiles, as returned by the tile scraper.
+    """
+    fields = ProductTile.__dataclass_fields__
+    df = make_product_frame(n)[[c for c in fields]]
+    df = df.astype(object).where(df.notna(), None)
+    df["unit"] = df["unit"].map(Unit)
+    return [ProductTile(**record) for record in df.to_dict("records")]
+
+
+# --- Scrapers --- #
+
+
+def scraper_cases() -> List[Benchmark]:
+    return [
+        Benchmark(
+            name="scrape_tiles[browse-page]",
+            setup=lambda: _read(BROWSE_PAGE),
+            func=lambda html: ColesProductTileScraper(html).get_all_products(),
+        ),
+        Benchmark(
+            name="scrape_tiles[data-route]",
+            setup=lambda: _data_route_body(BROWSE_PAGE),
+            func=lambda body: ColesProductTileScraper.tiles_from_page_props(
+                json.loads(body)["pageProps"]
+            ),
+        ),
+        Benchmark(
+            name="scrape_product[product-page]",
+            setup=lambda: _read(PRODUCT_PAGE),
+            func=lambda html: ColesProductScraper(html).get_product(),
+        ),
+        # The fixture's page state is for another product, which forces the HTML
+        # fallback; matching its JSON-LD sku measures the embedded JSON path.
+        Benchmark(
+            name="scrape_product[page-state]",
+            setup=lambda: _read(PRODUCT_PAGE).replace(
+                b'"sku":8060378', b'"sku":6433306'
+            ),
+            func=lambda html: ColesProductScraper(html).get_product(),
+        ),
+    ]
+
+
+# --- Processing pipelines --- #
+
+
+def _process_product_data_case(rows: int) -> Benchmark:
+    def setup():
+        directory = tempfile.mkdtemp(prefix="bench-products-")
+        input_path = os.path.join(directory, "raw.csv")
+        make_product_frame(rows).to_csv(input_path, index=False)
+        return directory, input_path, os.path.join(directory, "out", "processed.csv")
+
+    return Benchmark(
+        name=f"process_product_data[{rows}]",
+        setup=setup,
+        func=lambda state: process_product_data(state[1], state[2]),
+        teardown=lambda state: shutil.rmtree(state[0]),
+    )
+
+
+def _process_discount_data_case(rows: int) -> Benchmark:
+    def setup():
+        tiles = make_tiles(rows)
+        # Give every product a food category so the category filter is exercised.
+        products_path = os.path.join("data", "processed", "products.csv")
+        os.makedirs(os.path.dirname(products_path), exist_ok=True)
+        pd.DataFrame(
+            {"product_id": [f"product-{i}" for i in range(rows)], "category": "pantry"}
+        ).to_csv(products_path, index=False)
+        return tiles
+
+    return Benchmark(
+        name=f"process_discount_data[{rows}]",
+        setup=setup,
+        func=process_discount_data,
+    )
+
+
+def _update_csv_with_archive_case(days: int) -> Benchmark:
+    """
+    Merges one day's snapshot into a history of `days` earlier snapshots. The seed
+    files are restored before each run, so every iteration sees the same history.
+    """
+
+    def setup():
+        directory = tempfile.mkdtemp(prefix="bench-history-")
+        seed_target = os.path.join(directory, "seed-target.csv")
+        seed_archive = os.path.join(directory, "seed-archive.csv")
+        make_product_frame(HISTORY_PRODUCTS, day=days).to_csv(seed_target, index=False)
+        history = [
+            make_product_frame(HISTORY_PRODUCTS, day=day) for day in range(days - 1)
+        ]
+        if history:
+            pd.concat(history, ignore_index=True).to_csv(seed_archive, index=False)
+        new_df = make_product_frame(HISTORY_PRODUCTS, day=days + 1)
+        return directory, seed_target, seed_archive, new_df
+
+    def run(state):
+        directory, seed_target, seed_archive, new_df = state
+        target = os.path.join(directory, "raw", "products.csv")
+        archive = os.path.join(directory, "archive", "products_dropped.csv")
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(seed_target, target)
+        if os.path.exists(seed_archive):
+            os.makedirs(os.path.dirname(archive), exist_ok=True)
+            shutil.copyfile(seed_archive, archive)
+        update_csv_with_archive(new_df, target, archive)
+
+    return Benchmark(
+        name=f"update_csv_with_archive[{days}d]",
+        setup=setup,
+        func=run,
+        teardown=lambda state: shutil.rmtree(state[0]),
+    )
+
+
+def _normalise_unit_prices_case(rows: int) -> Benchmark:
+    def setup():
+        rng = np.random.default_rng(0)
+        units = ["100g", "1kg", "100mL", "1L", "1ea", "1m", "100 sheets", None]
+        return (
+            pd.Series(rng.integers(10, 5000, rows) / 100),
+            pd.Series(rng.choice(np.array(units, dtype=object), rows)),
+        )
+
+    return Benchmark(
+        name=f"normalise_unit_prices[{rows}]",
+        setup=setup,
+        func=lambda state: normalise_unit_prices(*state),
+    )
+
+
+def pipeline_cases(max_rows: int) -> List[Benchmark]:
+    row_counts = [rows for rows in ROW_COUNTS if rows <= max_rows]
+    return (
+        [_process_product_data_case(rows) for rows in row_counts]
+        + [_process_discount_data_case(rows) for rows in row_counts]
+        + [_normalise_unit_prices_case(rows) for rows in row_counts]
+        + [_update_csv_with_archive_case(days) for days in HISTORY_DAYS]
+    )
+
+
+# --- Storage --- #
+
+
+def _storage_cases(format: StorageFormat, rows: int) -> List[Benchmark]:
+    """
+    Loads and rewrites a raw products dataset of `rows` rows in one storage format.
+    """
+    store = DatasetStore(format)
+
+    def setup():
+        directory = tempfile.mkdtemp(prefix="bench-storage-")
+        path = os.path.join(directory, "products.csv")
+        df = make_product_frame(rows)
+        store.write(df, path, RAW_PRODUCTS_SCHEMA)
+        return directory, path, store.read(path)
+
+    def teardown(state):
+        shutil.rmtree(state[0])
+
+    return [
+        Benchmark(
+            name=f"dataset_read[{format.value}-{rows}]",
+            setup=setup,
+            func=lambda state: store.read(state[1]),
+            teardown=teardown,
+        ),
+        Benchmark(
+            name=f"dataset_write[{format.value}-{rows}]",
+            setup=setup,
+            func=lambda state: store.write(state[2], state[1], RAW_PRODUCTS_SCHEMA),
+            teardown=teardown,
+        ),
+    ]
+
+
+def storage_cases(max_rows: int) -> List[Benchmark]:
+    return [
+        case
+        for rows in ROW_COUNTS
+        if rows <= max_rows
+        for format in StorageFormat
+        for case in _storage_cases(format, rows)
+    ]
+
+
+# --- Fetcher --- #
+
+
+def _fetcher_case(name: str, url: str, **options) -> Benchmark:
+    def setup():
+        standin = ColesStandIn().start()
+        fetcher = ColesPageFetcher(
+            headers={"cookie": "stand-in"},
+            # Pace nothing: the benchmark measures the fetcher, not the limiter.
+            rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+            metrics=MetricsRegistry(),
+            base_url=standin.base_url,
+            **options,
+        )
+        return standin, fetcher, url
+
+    def teardown(state):
+        standin, fetcher, _ = state
+        fetcher.session.close()
+        standin.stop()
+
+    return Benchmark(
+        name=name,
+        setup=setup,
+        func=lambda state: state[1].get(state[2]),
+        teardown=teardown,
+    )
+
+
+def fetcher_cases() -> List[Benchmark]:
+    product_url = "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+    return [
+        _fetcher_case(
+            "fetcher_get[stand-in]", "https://www.coles.com.au/browse/dairy-eggs-fridge"
+        ),
+        _fetcher_case("fetcher_get[product-page]", product_url),
+        _fetcher_case(
+            "fetcher_get[product-page,stop-after-state]",
+            product_url,
+            stop_after_page_state=True,
+        ),
+    ]
+
+
+# --- Imports --- #
+
+IMPORTED_MODULES = ("src.scrapers", "src.fetcher", "scripts.scrape_products")
+
+
+def import_cases() -> List[Benchmark]:
+    """
+    Cold import of a module in a fresh interpreter, as paid by each process-pool
+    worker and CLI invocation.
+    """
+    return [
+        Benchmark(
+            name=f"import[{module}]",
+            func=lambda _, module=module: subprocess.run(
+                [sys.executable, "-c", f"import {module}"], cwd=REPO_DIR, check=True
+            ),
+        )
+        for module in IMPORTED_MODULES
+    ]
+
+
+def all_cases(max_rows: int = max(ROW_COUNTS)) -> List[Benchmark]:
+    """
+    Every benchmark, with synthetic frames of at most `max_rows` rows.
+    """
+    return (
+        scraper_cases()
+        + pipeline_cases(max_rows)
+        + storage_cases(max_rows)
+        + fetcher_cases()
+        + import_cases()
+    )
@@ -0,0 +1,154 @@
+"""
+Minimal benchmark harness: timing, peak memory and baseline comparison.
+"""
+
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Benchmark:
+    """
+    A named operation to benchmark.
+
+    `setup` runs once before timing and returns the argument passed to `func` on
+    every iteration, so fixtures and synthetic data are not part of the timing.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    setup: Callable[[], Any] = field(default=lambda: None)
+    teardown: Callable[[Any], None] = field(default=lambda state: None)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops_per_sec: float
+    seconds_per_op: float
+    iterations: int
+    peak_memory_mb: float
+
+
+def run_benchmark(
+    benchmark: Benchmark, min_time: float = 1.0, repeat: int = 3
+) -> BenchmarkResult:
+    """
+    Times a benchmark and measures its peak memory.
+
+    Each of `repeat` rounds runs the operation until `min_time` seconds have passed
+    (at least once); the fastest round is reported. Peak memory is measured with
+    tracemalloc over one extra, untimed iteration.
+    """
+    state = benchmark.setup()
+    try:
+        best = None
+        for _ in range(repeat):
+            gc.collect()
+            iterations = 0
+            start = time.perf_counter()
+            elapsed = 0.0
+            while iterations == 0 or elapsed < min_time:
+                benchmark.func(state)
+                iterations += 1
+                elapsed = time.perf_counter() - start
+            per_op = elapsed / iterations
+            if best is None or per_op < best[0]:
+                best = (per_op, iterations)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            benchmark.func(state)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        benchmark.teardown(state)
+
+    per_op, iterations = best
+    return BenchmarkResult(
+        name=benchmark.name,
+        ops_per_sec=1 / per_op if per_op else float("inf"),
+        seconds_per_op=per_op,
+        iterations=iterations,
+        peak_memory_mb=peak / 1024 / 1024,
+    )
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    """
+    Loads a baseline saved by `save_baseline`, or an empty dict if there is none.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as src:
+        return json.load(src)
+
+
+def save_baseline(results: List[BenchmarkResult], path: str) -> None:
+    """
+    Saves results as the new baseline, keyed by benchmark name.
+    """
+    baseline = load_baseline(path)
+    baseline.update({result.name: asdict(result) for result in results})
+    with open(path, "w") as dst:
+        json.dump(baseline, dst, indent=2, sort_keys=True)
+    logger.info("Saved baseline for %d benchmarks to %s", len(results), path)
+
+
+def find_regressions(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = 0.1,
+) -> List[str]:
+    """
+    Lists benchmarks whose throughput dropped by more than `threshold` (a fraction)
+    relative to the baseline.
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(result.name)
+        if not reference:
+            continue
+        change = result.ops_per_sec / reference["ops_per_sec"] - 1
+        if change < -threshold:
+            regressions.append(result.name)
+    return regressions
+
+
+def format_report(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, Dict[str, float]],
+    regressions: Optional[List[str]] = None,
+) -> str:
+    """
+    Renders results as a plain-text table, with the change against the baseline.
+    """
+    regressions = set(regressions or [])
+    header = (
+        f"{'benchmark':<48} {'ops/sec':>12} {'ms/op':>10} {'peak MB':>9} {'vs base':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for result in results:
+        reference = baseline.get(result.name)
+        change = (
+            f"{(result.ops_per_sec / reference['ops_per_sec'] - 1) * 100:+.1f}%"
+            if reference
+            else "n/a"
+        )
+        flag = "  REGRESSION" if result.name in regressions else ""
+        lines.append(
+            f"{result.name:<48} {result.ops_per_sec:>12.2f} "
+            f"{result.seconds_per_op * 1000:>10.2f} {result.peak_memory_mb:>9.1f} "
+            f"{change:>9}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,106 @@
+"""
+Runs the benchmark suite and compares it against a stored baseline.
+
+Usage:
+    python -m benchmarks.run                    # full suite (up to 1M-row frames)
+    python -m benchmarks.run --quick            # 10k-row frames, one short round
+    python -m benchmarks.run --update-baseline  # record results as the new baseline
+
+Exits with status 1 if any benchmark is slower than the baseline by more than
+the threshold.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from typing import List, Optional
+
+from benchmarks.cases import ROW_COUNTS, all_cases
+from benchmarks.harness import (
+    find_regressions,
+    format_report,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.1
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Allowed drop in ops/sec before flagging a regression (fraction).",
+    )
+    parser.add_argument(
+        "--max-rows", type=int, default=max(ROW_COUNTS), help="Largest synthetic frame."
+    )
+    parser.add_argument("--min-time", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--quick", action="store_true", help="10k-row frames and a single round."
+    )
+    parser.add_argument(
+        "-k", dest="keyword", help="Only run benchmarks whose name contains this."
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.max_rows = min(ROW_COUNTS)
+        args.min_time = 0.2
+        args.repeat = 1
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    cases = [
+        case
+        for case in all_cases(args.max_rows)
+        if not args.keyword or args.keyword in case.name
+    ]
+
+    # The pipelines read and write relative `data/` paths; keep them out of the repo.
+    cwd = os.getcwd()
+    baseline_path = os.path.abspath(args.baseline)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            for case in cases:
+                logger.info("Running %s", case.name)
+                results.append(run_benchmark(case, args.min_time, args.repeat))
+        finally:
+            os.chdir(cwd)
+
+    baseline = load_baseline(baseline_path)
+    regressions = find_regressions(results, baseline, args.threshold)
+    print(format_report(results, baseline, regressions))
+
+    if args.update_baseline:
+        save_baseline(results, baseline_path)
+        return 0
+    if regressions:
+        print(
+            f"\n{len(regressions)} benchmark(s) regressed by more than "
+            f"{args.threshold:.0%}: {', '.join(regressions)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""
+Script to (re)build the price history store from the archived and raw product datasets.
+
+Ingestion is idempotent, so it can be rerun at any time; new observations are
+also added by `scrape_products.py` as it crawls.
+"""
+
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.history import PriceHistory
+from src.storage import STORAGE
+
+logger = logging.getLogger(__name__)
+
+# Oldest observations first: the archive holds rows replaced by later crawls.
+SOURCE_PATHS = [
+    os.path.join("data", "archive", "products_dropped.csv"),
+    os.path.join("data", "raw", "products.csv"),
+]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    with PriceHistory() as history:
+        for path in SOURCE_PATHS:
+            if STORAGE.exists(path):
+                history.ingest_dataset(path)
+            else:
+                logger.warning("Skipping missing %s", path)
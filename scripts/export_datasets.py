@@ -0,0 +1,61 @@
+"""
+Script to export the scraped datasets to another storage format, e.g. CSV copies of
+Parquet datasets for sharing. Copies are written under `data/export/`, mirroring the
+datasets' paths under `data/`.
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.storage import STORAGE, StorageFormat
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATHS = [
+    os.path.join("data", "raw", "products.csv"),
+    os.path.join("data", "processed", "products.csv"),
+    os.path.join("data", "archive", "products_dropped.csv"),
+]
+DISCOUNTS_DIR = os.path.join("data", "discounts")
+
+
+def discount_dataset_paths():
+    """
+    The discount datasets on disk, in any format, named by their CSV path.
+    """
+    paths = set()
+    for path in glob.glob(os.path.join(DISCOUNTS_DIR, "discounts_*.*")):
+        stem, extension = os.path.splitext(path)
+        if extension.lstrip(".") in {format.value for format in StorageFormat}:
+            paths.add(stem + ".csv")
+    return sorted(paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--format",
+        choices=[format.value for format in StorageFormat],
+        default=StorageFormat.CSV.value,
+        help="Format to export to (default: csv).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    format = StorageFormat(args.format)
+    for path in DATASET_PATHS + discount_dataset_paths():
+        if not STORAGE.exists(path):
+            logger.warning("Skipping missing %s", path)
+            continue
+        logger.info(
+            "Exported %s to %s", STORAGE.resolve(path), STORAGE.export(path, format)
+        )
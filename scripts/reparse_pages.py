@@ -0,0 +1,93 @@
+"""
+Script to re-extract product tiles from the browse pages in the page archive, e.g.
+after a scraper fix or a change to the site's markup, without fetching them again.
+
+Browse pages fetched from the Next.js data routes (`--data-routes`) are archived as
+the JSON of their page props, and are re-extracted from it.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.archive import DEFAULT_DIRECTORY, PageArchive
+from src.common import declared_encoding
+from src.endpoints import page_path, public_url
+from src.scrapers import ColesProductTileScraper
+from src.storage import RAW_PRODUCTS_SCHEMA, STORAGE
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_PATH = os.path.join("data", "processed", "reparsed_products.csv")
+DATA_ROUTE_PREFIX = public_url("/_next/data/")
+
+
+def reparse_browse_pages(archive: PageArchive, since=None, until=None) -> pd.DataFrame:
+    """
+    Extracts the product tiles of every archived browse page.
+
+    :return: One row per tile, with the `page_url` and `fetched_at` of its page.
+    """
+    frames = []
+    for page in _iter_browse_pages(archive, since, until):
+        tiles = _extract_tiles(page)
+        if not tiles:
+            continue
+        df = pd.DataFrame(tiles)
+        df["unit"] = df["unit"].map(lambda unit: unit.value if unit else None)
+        df["page_url"] = page.url
+        df["fetched_at"] = page.fetched_at
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _iter_browse_pages(archive: PageArchive, since=None, until=None):
+    yield from archive.iter_pages(public_url("/browse/"), since, until)
+    for page in archive.iter_pages(DATA_ROUTE_PREFIX, since, until):
+        if page_path(page.url).startswith("/browse/"):
+            yield page
+
+
+def _extract_tiles(page):
+    if page.url.startswith(DATA_ROUTE_PREFIX):
+        # The page props as JSON.
+        try:
+            page_props = json.loads(page.body).get("pageProps") or {}
+        except ValueError:
+            logger.warning("Unreadable data route page %s", page.url)
+            return []
+        return ColesProductTileScraper.tiles_from_page_props(page_props)
+
+    scraper = ColesProductTileScraper(
+        page.body, encoding=declared_encoding(page.headers)
+    )
+    return scraper.get_all_products()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--archive", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    with PageArchive(args.archive) as archive:
+        df = reparse_browse_pages(archive, args.since, args.until)
+    logger.info(
+        "Extracted %d tiles into %s",
+        len(df),
+        STORAGE.write(df, args.output, RAW_PRODUCTS_SCHEMA),
+    )
@@ -0,0 +1,69 @@
+"""
+Script to run the local Coles stand-in server for offline load testing.
+
+Point the crawlers at it with the COLES_BASE_URL environment variable, e.g.
+    python scripts/run_standin.py --port 8000 --latency lognormal:0.2,0.5 --rate-limit-rate 0.05
+    COLES_BASE_URL=http://127.0.0.1:8000 python scripts/scrape_products.py
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.standin import ColesStandIn, LatencyDistribution, StandInConfig
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the local Coles stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--latency",
+        type=LatencyDistribution.parse,
+        default=LatencyDistribution(),
+        help='Response delay as "<kind>:<mean>[,<spread>]", kind being one of '
+        "constant, uniform, exponential or lognormal.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument(
+        "--block-after",
+        type=int,
+        help="Serve the Incapsula interstitial after this many requests.",
+    )
+    parser.add_argument(
+        "--block-for", type=int, help="Requests to block before recovering."
+    )
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    args = parse_args()
+    config = StandInConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        block_after=args.block_after,
+        block_for=args.block_for,
+        seed=args.seed,
+    )
+    standin = ColesStandIn(config, host=args.host, port=args.port)
+    logger.info("Serving on %s; press Ctrl+C to stop", standin.base_url)
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.server.server_close()
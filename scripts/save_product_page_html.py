@@ -1,8 +1,8 @@
 """
 This script uses a Selenium-driven browser to search for products on the Coles
-website and save the HTML content of individual product pages to local storage.
-It is designed to avoid duplicate processing by checking against an existing
-index of saved product IDs.
+website and save the HTML content of individual product pages to the page archive
+(`data/archive/pages`). It is designed to avoid duplicate processing by checking
+against an existing index of saved product IDs.
 """
 
 import json
@@ -12,6 +12,8 @@ import sys
 import time
 from datetime import datetime
 from glob import glob
+from typing import Optional
+from urllib.parse import urlparse
 
 import pandas as pd
 import selenium.webdriver.support.expected_conditions as EC
@@ -28,7 +30,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
+from src.archive import PageArchive
+from src.endpoints import ROUTER, RequestClass, public_url
+from src.metrics import REGISTRY
 from src.poms.base import BasePage
+from src.ratelimit import AdaptiveRateLimiter
 from src.webdriver_utils import initialize_driver
 
 logger = logging.getLogger(__name__)
@@ -37,11 +43,11 @@ logging.basicConfig(
 )
 
 SRC_GLOB = "data/raw/products-by-category/*/*.json"
+# Pages saved as standalone files before the page archive existed.
 DST_DIR = "data/raw/product-webpages"
-DST_FILEPATH_TEMPLATE = DST_DIR + "/{product_id}.html"
 METADATA_FILEPATH = "data/raw/00_index.json"
-SHORT_SLEEP_SECONDS = 5
-MID_SLEEP_SECONDS = 10
+COLES_HOST = urlparse(ROUTER.origin_for(RequestClass.OTHER)).netloc
+PAGE_LOAD_TIMEOUT_SECONDS = 10
 
 
 def load_targets():
@@ -59,13 +65,22 @@ def load_targets():
     return targets
 
 
+_archive = None
+
+
+def get_archive() -> PageArchive:
+    global _archive
+    if _archive is None:
+        _archive = PageArchive()
+    return _archive
+
+
+@REGISTRY.timed("storage_write_seconds", stage="dump_html")
 def dump_html(product_id, html_content):
-    os.makedirs(DST_DIR, exist_ok=True)
-    file_path = DST_FILEPATH_TEMPLATE.format(product_id=product_id)
-    with open(file_path, "w", encoding="utf-8") as dst:
-        dst.write(html_content)
-        logger.info(f"Page saved to {file_path}")
-        update_index(product_id=product_id)
+    url = public_url(f"/product/{product_id}")
+    get_archive().put(url, html_content)
+    logger.info(f"Page for {url} archived")
+    update_index(product_id=product_id)
 
 
 def update_index(product_id):
@@ -81,6 +96,23 @@ def init_index():
         update_index(product_id)
 
 
+def import_html_files():
+    """
+    Copies pages saved as standalone files into the page archive, dated by their
+    modification time. Pages already archived are skipped; the files are kept.
+    """
+    archive = get_archive()
+    for path in glob(os.path.join(DST_DIR, "*.html")):
+        product_id = os.path.splitext(os.path.basename(path))[0]
+        url = public_url(f"/product/{product_id}")
+        if archive.get(url) is not None:
+            continue
+        with open(path, "rb") as src:
+            fetched_at = datetime.fromtimestamp(os.path.getmtime(path)).astimezone()
+            archive.put(url, src.read(), fetched_at=fetched_at)
+        update_index(product_id)
+
+
 def load_index():
     try:
         with open(METADATA_FILEPATH, "r") as f:
@@ -101,6 +133,10 @@ class ColesPageLocators:
 
 class ColesPage(BasePage):
 
+    def __init__(self, driver, rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        super().__init__(driver=driver)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+
     def search(self, query):
         try:
             self.click_element(ColesPageLocators.SEARCH_BAR)
@@ -130,8 +166,11 @@ class ColesPage(BasePage):
             return False
 
     def save_product_from_search(self, query):
+        self.rate_limiter.acquire(COLES_HOST)
         self.search(query)
-        time.sleep(SHORT_SLEEP_SECONDS)
+        self.wait_for_element_visibility(
+            ColesPageLocators.PRODUCT_CARD, timeout=PAGE_LOAD_TIMEOUT_SECONDS
+        )
         try:
             clicked = self.click_search_result(0)
         except ElementClickInterceptedException:
@@ -142,24 +181,26 @@ class ColesPage(BasePage):
             product_id = self.driver.current_url.split("/")[-1]
             product_html = self.driver.page_source
             dump_html(product_id=product_id, html_content=product_html)
+            self.rate_limiter.record_success(COLES_HOST)
         else:
             logger.info("Couldn't save!")
 
     def _is_product_page_loaded(self) -> bool:
-        WebDriverWait(self.driver, MID_SLEEP_SECONDS).until(
+        WebDriverWait(self.driver, PAGE_LOAD_TIMEOUT_SECONDS).until(
             EC.visibility_of_element_located(ColesPageLocators.BRAND_LINK)
         )
-        return self.driver.current_url.startswith("https://www.coles.com.au/product")
+        return self.driver.current_url.startswith(ROUTER.url("/product"))
 
 
 if __name__ == "__main__":
 
     logger.info("Started")
+    import_html_files()
     targets = load_targets()
 
     logger.info("Initializing driver")
     driver = initialize_driver()
-    driver.get("https://www.coles.com.au")
+    driver.get(ROUTER.url("/"))
 
     coles_page = ColesPage(driver)
     for query in targets[::-1]:
@@ -172,5 +213,5 @@ if __name__ == "__main__":
             NoSuchElementException,
         ) as e:
             logger.info(f"Failed for {query}. ExceptionType: {type(e)}")
-            time.sleep(5)
+            coles_page.rate_limiter.record_throttle(COLES_HOST)
             continue
@@ -1,35 +1,40 @@
 """
 Script to scrape all available categories on the Coles website.
+
+The category tree is read over HTTP from the browse page's embedded page state,
+and cached to `data/raw/product-categories.json` for the crawlers to use.
 """
 
-import json
+import logging
 import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from src.poms.categories import CategoriesPage
-from src.webdriver_utils import initialize_driver
+from src.categories import CategoryCache, discover_categories
+from src.fetcher import ColesPageFetcher
+from src.metrics import REGISTRY, export_run_metrics
 
-DEST_DIR = "./data/raw"
-DEST_FILEPATH = os.path.join(DEST_DIR, "product-categories.json")
+logger = logging.getLogger(__name__)
 
 
+@REGISTRY.timed("storage_write_seconds", stage="dump_categories")
 def dump_categories(categories):
-    os.makedirs(DEST_DIR, exist_ok=True)
-    with open(DEST_FILEPATH, "w") as dst:
-        json.dump(categories, dst)
+    CategoryCache().save(categories)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    # Silence seleniumwire logs of network requests
+    logging.getLogger("seleniumwire.handler").setLevel(logging.WARNING)
 
-    driver = initialize_driver(implicit_wait=15)
-
-    page = CategoriesPage(driver=driver)
-    page.open()
+    fetcher = ColesPageFetcher()
 
-    found_categories = page.list_categories()
+    found_categories = discover_categories(fetcher)
     if found_categories:
         dump_categories(found_categories)
 
-    driver.quit()
+    export_run_metrics("scrape_categories")
@@ -2,58 +2,87 @@
 Script to scrape discounted/special offer products from the Coles website.
 """
 
+import argparse
 import logging
 import os
 import sys
-import time
-import json
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
 import pandas as pd
 import pytz
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from src.fetcher import ColesPageFetcher
+from src.category_lookup import CATEGORY_LOOKUP, CategoryLookup
+from src.cookies import CookieStore
+from src.discounts import process_discount_tiles
+from src.endpoints import ROUTER
+from src.fetcher import ColesPageFetcher, CookieBackend, browser_driver_factory
+from src.metrics import REGISTRY, export_run_metrics
 from src.models import ProductTile
+from src.nextdata import NextDataClient
+from src.retry import FailureKind, RetryBudget, RetryPolicy
 from src.scrapers import ColesProductTileScraper
+from src.storage import DISCOUNTS_SCHEMA, STORAGE
 
 logger = logging.getLogger(__name__)
 
 LOCAL_TZ = pytz.timezone("Australia/Sydney")
-DURATION_5_MINS = 300
+# Retries allowed over a whole run, so that an outage fails fast instead of
+# retrying every page.
+MAX_RETRIES_PER_CRAWL = 200
+MAX_COOKIE_REFRESHES_PER_CRAWL = 10
+DISCOUNT_FILTER_TYPES = [
+    "halfprice",  # Half price specials
+    "special",  # General specials
+]
+# Specials pages sampled per discount type to check a catalogue crawl's coverage,
+# and the fraction of sampled products it must have found to be trusted.
+COVERAGE_CHECK_PAGES = 1
+MIN_SPECIALS_COVERAGE = 0.9
 
 
 @dataclass
 class SpecialsQuery:
     """Query configuration for Coles specials pages."""
-    base_url: str = "https://www.coles.com.au/on-special"
+    base_url: Optional[str] = None  # defaults to the routed specials page
     pid: str = "offers_modular3_special"
     filter_type: Optional[str] = None  # e.g., 'halfprice', 'special'
     page: int = 1
 
     @property
     def url(self) -> str:
-        url = f"{self.base_url}?pid={self.pid}"
-        if self.filter_type:
-            url += f"&filter_Special={self.filter_type}"
-        url += f"&page={self.page}"
-        return url
+        if self.base_url:
+            url = f"{self.base_url}?pid={self.pid}"
+            if self.filter_type:
+                url += f"&filter_Special={self.filter_type}"
+            return url + f"&page={self.page}"
+        return ROUTER.specials_url(
+            pid=self.pid, filter_Special=self.filter_type, page=self.page
+        )
 
 
-def extract_discount_products(fetcher: ColesPageFetcher, query: SpecialsQuery) -> List[ProductTile]:
+def extract_discount_products(
+    fetcher: ColesPageFetcher,
+    query: SpecialsQuery,
+    data_client: Optional[NextDataClient] = None,
+) -> List[ProductTile]:
     """
     Extract discount products from a Coles specials page.
     
     :param fetcher: ColesPageFetcher instance for making requests
     :param query: SpecialsQuery configuration
+    :param data_client: Fetches the page from its Next.js data route instead of its HTML
     :return: List of ProductTile objects
     """
     try:
-        response = fetcher.get(url=query.url)
-        products = ColesProductTileScraper(response.content).get_all_products()
+        if data_client is not None:
+            products = data_client.get_tiles(query.url)
+        else:
+            response = fetcher.get(url=query.url)
+            products = ColesProductTileScraper.from_response(response).get_all_products()
         
         # Filter to only keep products that are actually on special
         discount_products = [p for p in products if p.is_on_special]
@@ -76,16 +105,14 @@ def extract_discount_products(fetcher: ColesPageFetcher, query: SpecialsQuery) -
         return []
 
 
-def load_product_categories() -> (dict, list):
+def load_product_categories() -> (CategoryLookup, list):
     """
-    Loads product to category mapping and food categories list.
-    
-    This function attempts to load a `product_mapping.json` file from `data/processed/`.
-    If the file is not found, it returns an empty dict and generates the mapping from products.csv.
+    Loads the product to category lookup and food categories list.
+
+    The lookup is shared by the whole process and indexes `data/processed/products.csv`,
+    rebuilding its on-disk index whenever that file changes. It is empty (falsy) if
+    there is no processed products file yet.
     """
-    mapping_path = os.path.join("data", "processed", "product_mapping.json")
-    products_path = os.path.join("data", "processed", "products.csv")
-    
     food_categories = [
         "fruit-vegetables",
         "meat-seafood",
@@ -95,30 +122,12 @@ def load_product_categories() -> (dict, list):
         "pantry",
         "frozen",
     ]
-    
-    if os.path.exists(mapping_path):
-        with open(mapping_path, 'r') as f:
-            product_to_category = json.load(f)
-        logger.info("Loaded product to category mapping from %s", mapping_path)
-    elif os.path.exists(products_path):
-        # Generate mapping from products.csv
-        logger.info("Generating product to category mapping from %s", products_path)
-        df = pd.read_csv(products_path, usecols=["product_id", "category"])
-        product_to_category = df.set_index("product_id")["category"].to_dict()
-        
-        # Save the mapping for future use
-        os.makedirs(os.path.dirname(mapping_path), exist_ok=True)
-        with open(mapping_path, 'w') as f:
-            json.dump(product_to_category, f, indent=2)
-        logger.info("Saved product to category mapping to %s", mapping_path)
-    else:
+    if not CATEGORY_LOOKUP:
         logger.warning(
-            "Neither %s nor %s found. Will use 'discount' as category for all products.",
-            mapping_path, products_path
+            "%s not found. Will use 'discount' as category for all products.",
+            CATEGORY_LOOKUP.products_path,
         )
-        product_to_category = {}
-    
-    return product_to_category, food_categories
+    return CATEGORY_LOOKUP, food_categories
 
 
 def process_discount_data(products: List[ProductTile]) -> pd.DataFrame:
@@ -132,87 +141,16 @@ def process_discount_data(products: List[ProductTile]) -> pd.DataFrame:
         return pd.DataFrame()
     
     product_to_category, food_categories = load_product_categories()
-    
-    df = pd.DataFrame([product.dict() for product in products])
-    
-    # Prepend base URL for product and image URLs
-    df["url"] = "https://www.coles.com.au" + df["url"]
-    df["image_url"] = "https://www.coles.com.au" + df["image_url"]
-    
-    # Extract fields using regex (same as scrape_products)
-    df["product_id"] = df["url"].str.extract(r"product\/(.+)\-\d+$")[0]
-    
-    if product_to_category:
-        df["category"] = df["product_id"].map(product_to_category)
-        df.dropna(subset=['category'], inplace=True) # Remove products with no category
-        df = df[df["category"].isin(food_categories)].copy()
-    else:
-        logger.warning("Product to category mapping is empty. Cannot filter for food products.")
-        df["category"] = "discount" # Fallback to original behavior
-
-    df["size"] = df["name"].str.extract(r"\| (.+)$")
-    df["price_aud"] = df["price"].str.extract(r"\$([\d,]+\.\d+)").astype(float)
-    df["was_price_aud"] = (
-        df["price_calc_method"].str.extract(r"Was \$([\d,]+\.\d+)").astype(float)
-    )
-    df["was_date"] = df["price_calc_method"].str.extract(
-        r"Was \$[\d,]+\.\d+ on (\w{3} \d{4})"
-    )
-    df["unit_price_aud"] = (
-        df["price_calc_method"]
-        .str.replace(",", "")
-        .str.extract(r"\$([\d,]+\.\d+) per")
-        .astype(float)
-    )
-    df["unit"] = (
-        df["price_calc_method"]
-        .str.replace("Was", "")
-        .str.extract(r"\$[\d,]+\.\d+ per (\w+)(?:\s*Was)?")
-    )
-    
-    # Filter: Keep only products where current price is lower than previous price
-    df = df[(df["price_aud"] < df["was_price_aud"]) & df["was_price_aud"].notna()].copy()
-    
-    # Remove duplicate products
-    df.drop_duplicates(subset=["product_id"], keep="first", inplace=True)
-    
-    # Rename columns to match scrape_products format
-    df = df.rename(
-        columns={
-            "name": "product_name",
-            "url": "product_url",
-            "price": "display_price",
-            "price_calc_method": "pricing_details",
-            "image_url": "product_image_url",
-            "price_aud": "current_price_aud",
-            "was_price_aud": "previous_price_aud",
-            "was_date": "previous_price_date",
-            "unit": "unit_of_measure",
-        }
-    )
-    
-    # Reorder columns to match scrape_products format exactly
-    cols_order = [
-        "product_id",
-        "product_name",
-        "category",
-        "size",
-        "display_price",
-        "current_price_aud",
-        "unit_price_aud",
-        "unit_of_measure",
-        "previous_price_aud",
-        "pricing_details",
-        "previous_price_date",
-        "product_url",
-        "product_image_url",
-    ]
-    
-    # Keep only the columns that exist
-    cols_order = [col for col in cols_order if col in df.columns]
-    df = df[cols_order]
-    
-    return df
+    return process_discount_tiles(products, product_to_category, food_categories)
+
+
+def discount_file_key(filter_type: Optional[str]) -> str:
+    """
+    The name discount datasets of a filter type are saved under.
+    """
+    if filter_type == 'halfprice':
+        return '50_percent_off'
+    return 'minor_discounts'
 
 
 def save_discount_products(products: List[ProductTile], filter_type: Optional[str] = None) -> None:
@@ -226,7 +164,8 @@ def save_discount_products(products: List[ProductTile], filter_type: Optional[st
         logger.info("No discount products to save for filter '%s'.", filter_type)
         return
 
-    df_processed = process_discount_data(products)
+    with REGISTRY.timer("discount_processing_seconds", filter=filter_type):
+        df_processed = process_discount_data(products)
     
     if df_processed.empty:
         logger.info("No products with valid discounts (current < previous price) for filter '%s'.", filter_type)
@@ -236,67 +175,167 @@ def save_discount_products(products: List[ProductTile], filter_type: Optional[st
     df_processed["scrape_date"] = now.strftime("%Y-%m-%d")
     df_processed["scrape_timestamp"] = now.isoformat()
 
-    # Create output directory if it doesn't exist
     output_dir = os.path.join("data", "discounts")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    if filter_type == 'halfprice':
-        file_key = '50_percent_off'
-    else:
-        file_key = 'minor_discounts'
+    file_key = discount_file_key(filter_type)
 
     # Save to timestamped file
     timestamp_str = now.strftime("%Y%m%d_%H%M%S")
     filename = f"discounts_{file_key}_{timestamp_str}.csv"
     output_path = os.path.join(output_dir, filename)
     
-    df_processed.to_csv(output_path, index=False)
-    logger.info("Saved %d discount products to %s", len(df_processed), output_path)
-    
-    # Also save to latest file for easy access
-    latest_filename = f"discounts_{file_key}_latest.csv"
-    latest_path = os.path.join(output_dir, latest_filename)
-    df_processed.to_csv(latest_path, index=False)
-    logger.info("Also saved to %s", latest_path)
+    with REGISTRY.timer("storage_write_seconds", stage="save_discount_products"):
+        saved_path = STORAGE.write(df_processed, output_path, DISCOUNTS_SCHEMA)
+        logger.info("Saved %d discount products to %s", len(df_processed), saved_path)
+
+        # Also save to latest file for easy access
+        latest_filename = f"discounts_{file_key}_latest.csv"
+        latest_path = os.path.join(output_dir, latest_filename)
+        saved_path = STORAGE.write(df_processed, latest_path, DISCOUNTS_SCHEMA)
+        logger.info("Also saved to %s", saved_path)
+    REGISTRY.increment("discounts_written_total", len(df_processed), filter=filter_type)
+
 
+def crawl_discount_type(
+    fetcher: ColesPageFetcher,
+    filter_type: str,
+    data_client: Optional[NextDataClient] = None,
+) -> List[ProductTile]:
+    """
+    Crawl every specials page of one discount type.
 
-def scrape_all_discount_types(fetcher: ColesPageFetcher):
+    :param fetcher: ColesPageFetcher instance
+    :param filter_type: Type of special filter (e.g., 'halfprice')
+    :param data_client: Fetches the pages from their Next.js data routes instead of their HTML
+    :return: List of ProductTile objects on special
+    """
+    logger.info("Starting to scrape discount type: %s", filter_type)
+
+    query = SpecialsQuery(filter_type=filter_type, page=1)
+    all_products = []
+
+    # Paginate through all pages
+    while True:
+        products = extract_discount_products(fetcher, query, data_client)
+
+        if products:
+            all_products.extend(products)
+            query.page += 1
+        else:
+            break
+    return all_products
+
+
+def scrape_all_discount_types(
+    fetcher: ColesPageFetcher, data_client: Optional[NextDataClient] = None
+):
     """
     Scrape all types of discount products available on Coles.
     
     :param fetcher: ColesPageFetcher instance
+    :param data_client: Fetches the pages from their Next.js data routes instead of their HTML
     """
-    # Different special filter types to try
-    filter_types = [
-        "halfprice",  # Half price specials
-        "special",  # General specials
-    ]
-    
-    for filter_type in filter_types:
-        logger.info("Starting to scrape discount type: %s", filter_type)
-        
-        query = SpecialsQuery(filter_type=filter_type, page=1)
-        all_products = []
-        
-        # Paginate through all pages
-        while True:
-            products = extract_discount_products(fetcher, query)
-            
-            if products:
-                all_products.extend(products)
-                query.page += 1
-                # Small delay between pages
-                time.sleep(2)
-            else:
-                break
-        
+    for filter_type in DISCOUNT_FILTER_TYPES:
+        all_products = crawl_discount_type(fetcher, filter_type, data_client)
+
         # Save all products for this filter type
         save_discount_products(all_products, filter_type)
-        
-        # Delay between different filter types to be respectful
-        if filter_type != filter_types[-1]:  # Not the last filter
-            logger.info("Sleeping for %d seconds before next filter type...", DURATION_5_MINS)
-            time.sleep(DURATION_5_MINS)
+
+
+def classify_special(product: ProductTile) -> Optional[str]:
+    """
+    The specials filter a catalogue tile belongs to: 'halfprice' for half price
+    specials, 'special' for any other special, or None if not on special.
+    """
+    if not product.is_on_special:
+        return None
+    if product.special_type == "Half Price" or product.discount_percentage == "50%":
+        return "halfprice"
+    return "special"
+
+
+def split_catalogue_specials(products: List[ProductTile]) -> Dict[str, List[ProductTile]]:
+    """
+    Groups catalogue tiles on special by specials filter type.
+    """
+    specials = {filter_type: [] for filter_type in DISCOUNT_FILTER_TYPES}
+    for product in products:
+        filter_type = classify_special(product)
+        if filter_type:
+            specials[filter_type].append(product)
+    return specials
+
+
+def check_specials_coverage(
+    fetcher: ColesPageFetcher,
+    filter_type: str,
+    catalogue_urls: Set[str],
+    pages: int = COVERAGE_CHECK_PAGES,
+    data_client: Optional[NextDataClient] = None,
+) -> Optional[float]:
+    """
+    Samples the first specials pages of a type and measures how many of their
+    products the catalogue crawl also found.
+
+    :param catalogue_urls: URLs of every product in the catalogue crawl.
+    :return: The covered fraction, or None if the specials pages had no products.
+    """
+    sampled = []
+    for page in range(1, pages + 1):
+        products = extract_discount_products(
+            fetcher, SpecialsQuery(filter_type=filter_type, page=page), data_client
+        )
+        if not products:
+            break
+        sampled.extend(products)
+    if not sampled:
+        return None
+
+    coverage = sum(p.url in catalogue_urls for p in sampled) / len(sampled)
+    logger.info(
+        "Catalogue covers %.0f%% of %d sampled '%s' specials",
+        coverage * 100,
+        len(sampled),
+        filter_type,
+    )
+    return coverage
+
+
+def save_catalogue_discounts(
+    fetcher: ColesPageFetcher,
+    products: List[ProductTile],
+    min_coverage: float = MIN_SPECIALS_COVERAGE,
+    data_client: Optional[NextDataClient] = None,
+) -> None:
+    """
+    Derives the discount outputs from a catalogue crawl instead of crawling the
+    specials pages.
+
+    The specials pages are only sampled to check that the catalogue crawl covered
+    them; a discount type whose coverage falls below `min_coverage` is crawled from
+    its specials pages as before.
+
+    :param products: Every tile from the catalogue crawl.
+    :param data_client: Fetches the specials pages from their Next.js data routes.
+    """
+    catalogue_urls = {product.url for product in products}
+    specials = split_catalogue_specials(products)
+
+    for filter_type in DISCOUNT_FILTER_TYPES:
+        coverage = check_specials_coverage(
+            fetcher, filter_type, catalogue_urls, data_client=data_client
+        )
+        if coverage is not None and coverage < min_coverage:
+            logger.warning(
+                "Catalogue covers only %.0f%% of '%s' specials; crawling specials pages.",
+                coverage * 100,
+                filter_type,
+            )
+            REGISTRY.increment("specials_fallback_total", filter=filter_type)
+            save_discount_products(
+                crawl_discount_type(fetcher, filter_type, data_client), filter_type
+            )
+        else:
+            save_discount_products(specials[filter_type], filter_type)
 
 
 def analyze_discount_data(filter_type: Optional[str] = None):
@@ -305,40 +344,60 @@ def analyze_discount_data(filter_type: Optional[str] = None):
     
     :param filter_type: Type of discount filter to analyze
     """
-    if filter_type == 'halfprice':
-        file_key = '50_percent_off'
-    else:
-        file_key = 'minor_discounts'
-
-    filename = f"discounts_{{file_key}}_latest.csv"
+    filename = f"discounts_{discount_file_key(filter_type)}_latest.csv"
     data_path = os.path.join("data", "discounts", filename)
     
-    if not os.path.exists(data_path):
-        logger.warning("No discount data found at %s", data_path)
+    if not STORAGE.exists(data_path):
+        logger.warning("No discount data found at %s", STORAGE.path(data_path))
         return
     
-    df = pd.read_csv(data_path)
+    df = STORAGE.read(data_path)
     
     logger.info("=== DISCOUNT ANALYSIS for %s ===", filter_type)
     logger.info("Total discount products found: %d", len(df))
     
-    if 'previous_price_aud' in df.columns and 'current_price_aud' in df.columns:
-        df['savings_aud'] = df['previous_price_aud'] - df['current_price_aud']
-        df['savings_pct'] = ((df['previous_price_aud'] - df['current_price_aud']) / df['previous_price_aud'] * 100)
-        logger.info("Average savings: $%.2f (%.1f%%)", df['savings_aud'].mean(), df['savings_pct'].mean())
-        logger.info("Total potential savings: $%.2f", df['savings_aud'].sum())
+    if 'previous_price_aud' not in df.columns or 'current_price_aud' not in df.columns:
+        return
+
+    # Savings in integer cents, so totals don't drift with float error.
+    current_cents = (df['current_price_aud'] * 100).round().astype('Int64')
+    previous_cents = (df['previous_price_aud'] * 100).round().astype('Int64')
+    df['savings_cents'] = previous_cents - current_cents
+    df['savings_pct'] = df['savings_cents'] / previous_cents * 100
+    logger.info("Average savings: $%.2f (%.1f%%)", df['savings_cents'].mean() / 100, df['savings_pct'].mean())
+    logger.info("Total potential savings: $%.2f", df['savings_cents'].sum() / 100)
     
     # Show some example products
     logger.info("Example discount products:")
     for i, (_, row) in enumerate(df.head(5).iterrows()):
         logger.info("  %d. %s - $%.2f (Was: $%.2f, Save: $%.2f)", 
                    i+1, row['product_name'], 
-                   row.get('current_price_aud', 0), 
-                   row.get('previous_price_aud', 0),
-                   row.get('previous_price_aud', 0) - row.get('current_price_aud', 0))
-
+                   row['current_price_aud'], 
+                   row['previous_price_aud'],
+                   row['savings_cents'] / 100)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--data-routes",
+        action="store_true",
+        help="Fetch specials pages from the site's Next.js data routes "
+        "(their page props as JSON) instead of their full HTML.",
+    )
+    parser.add_argument(
+        "--cookie-backend",
+        choices=[backend.value for backend in CookieBackend],
+        default=CookieBackend.SELENIUMWIRE.value,
+        help="How cookie refreshes capture the cookie: through seleniumwire's proxy, "
+        "or from the cookie jar of a plain Chrome over the DevTools protocol.",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run Chrome without a window (browser cookie backend only).",
+    )
+    args = parser.parse_args()
+
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -354,19 +413,43 @@ if __name__ == "__main__":
     }
     
     try:
-        fetcher = ColesPageFetcher(headers=headers)
+        retry_policy = RetryPolicy(
+            budget=RetryBudget(
+                max_retries=MAX_RETRIES_PER_CRAWL,
+                max_retries_per_kind={
+                    FailureKind.BOT_BLOCK: MAX_COOKIE_REFRESHES_PER_CRAWL
+                },
+            )
+        )
+        driver_factory = (
+            browser_driver_factory(headless=args.headless)
+            if args.cookie_backend == CookieBackend.BROWSER.value
+            else None
+        )
+        fetcher = ColesPageFetcher(
+            driver_factory=driver_factory,
+            headers=headers,
+            retry_policy=retry_policy,
+            stop_after_page_state=True,
+            cookie_store=CookieStore(),
+            cookie_backend=args.cookie_backend,
+        )
         
+        data_client = NextDataClient(fetcher) if args.data_routes else None
+
         # Scrape all discount types
-        scrape_all_discount_types(fetcher)
+        scrape_all_discount_types(fetcher, data_client)
         
         # Analyze the results
         logger.info("\n" + "="*50)
         logger.info("ANALYSIS COMPLETE - Showing Results")
         logger.info("="*50)
         
-        for filter_type in ["halfprice", "special"]:
+        for filter_type in DISCOUNT_FILTER_TYPES:
             analyze_discount_data(filter_type)
             logger.info("")
+
+        export_run_metrics("scrape_discounts")
             
     except KeyboardInterrupt:
         logger.info("Script interrupted by user")
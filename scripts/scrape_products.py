@@ -2,66 +2,241 @@
 Script to scrape all products for given categories on the Coles website.
 """
 
+import argparse
 import logging
 import os
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 import pandas as pd
 import pytz
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from src.fetcher import ColesPageFetcher
-from src.models import ProductTile
+from src.archive import PageArchive
+from src.categories import CategoryCache
+from src.changes import PriceChangeDetector
+from src.cookies import CookieStore
+from src.endpoints import COLES_ORIGIN, ROUTER, public_url
+from src.fetcher import ColesPageFetcher, CookieBackend, browser_driver_factory
+from src.history import PriceHistory
+from src.metrics import REGISTRY, export_run_metrics
+from src.models import Category, ProductTile
+from src.nextdata import NextDataClient
+from src.prices import PRICE_FRAME_COLUMNS, price_frame
+from src.retry import FailureKind, RetryBudget, RetryPolicy
 from src.scrapers import ColesProductTileScraper
+from src.storage import (
+    PROCESSED_PRODUCTS_SCHEMA,
+    RAW_PRODUCTS_SCHEMA,
+    STORAGE,
+    DatasetStore,
+)
+from src.units import add_base_unit_prices
+
+from scripts.scrape_discounts import save_catalogue_discounts
 
 logger = logging.getLogger(__name__)
 
 LOCAL_TZ = pytz.timezone("Australia/Sydney")
-DURATION_5_MINS = 300
+# Retries allowed over a whole run, so that an outage fails fast instead of
+# retrying every page.
+MAX_RETRIES_PER_CRAWL = 200
+MAX_COOKIE_REFRESHES_PER_CRAWL = 10
+# Categories with more products than this are split into subcategory shards.
+SHARD_MIN_PRODUCTS = 480  # 10 pages at 48 products per page
+# Number of shards crawled concurrently through one shared fetcher. Threads
+# blocked at the same time share a single cookie refresh.
+MAX_WORKERS = 4
+# Used only if category discovery fails and no cached category tree exists.
+FALLBACK_CATEGORIES = [
+    "fruit-vegetables",
+    "dairy-eggs-fridge",
+    "pantry",
+    "meat-seafood",
+    "bakery",
+    "frozen",
+    "household",
+    "health-beauty",
+    "deli",
+    "pet",
+    "baby",
+    "liquor",
+]
 
 
 @dataclass
 class BrowseQuery:
     category: str
     page: int = 1
+    subcategory: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        if self.subcategory:
+            return f"{self.category}/{self.subcategory}"
+        return self.category
 
     @property
     def url(self) -> str:
-        return f"https://www.coles.com.au/browse/{self.category}?page={self.page}"
+        return ROUTER.browse_url(self.path, page=self.page)
+
+
+@dataclass
+class CrawlResult:
+    """
+    Products of a shard or category, and whether every page of it was crawled.
 
+    A crawl cut short by an error is incomplete: the products it missed are not
+    known to be delisted.
+    """
+
+    products: List[ProductTile]
+    complete: bool = True
 
-def extract_products_from_browse(fetcher: ColesPageFetcher, query: BrowseQuery):
-    response = fetcher.get(url=query.url)
-    products = ColesProductTileScraper(response.content).get_all_products()
+
+def extract_products_from_browse(
+    fetcher: ColesPageFetcher,
+    query: BrowseQuery,
+    data_client: Optional[NextDataClient] = None,
+):
+    """
+    Extracts the product tiles of a browse page, from its Next.js data route if a
+    `data_client` is given and from its HTML otherwise.
+    """
+    if data_client is not None:
+        products = data_client.get_tiles(query.url)
+    else:
+        response = fetcher.get(url=query.url)
+        products = ColesProductTileScraper.from_response(response).get_all_products()
     logger.info(
         "Extracted %d products (Category %s, Pg. %d)",
         len(products),
-        query.category,
+        query.path,
         query.page,
     )
     return products
 
 
+def build_shards(
+    category: Category, min_products: int = SHARD_MIN_PRODUCTS
+) -> List[BrowseQuery]:
+    """
+    Splits a large category into one browse query per subcategory.
+
+    Categories at or below `min_products`, or without known subcategories,
+    are crawled as a single shard.
+    """
+    if category.product_count > min_products and category.subcategories:
+        return [
+            BrowseQuery(category=category.slug, subcategory=sub.slug)
+            for sub in category.subcategories
+        ]
+    return [BrowseQuery(category=category.slug)]
+
+
+def crawl_shard(
+    fetcher: ColesPageFetcher,
+    query: BrowseQuery,
+    data_client: Optional[NextDataClient] = None,
+) -> CrawlResult:
+    """
+    Paginates through a single browse shard until a page comes back empty.
+
+    A page that fails ends the shard too, leaving it incomplete.
+    """
+    products = []
+    while True:
+        try:
+            browse_results = extract_products_from_browse(fetcher, query, data_client)
+        except Exception as e:
+            logger.error(
+                "Error extracting products on page %d for '%s': %s",
+                query.page,
+                query.path,
+                e,
+            )
+            return CrawlResult(products, complete=False)
+
+        if browse_results:
+            products.extend(browse_results)
+            query.page += 1
+        else:
+            return CrawlResult(products)
+
+
+def merge_shard_results(results: List[List[ProductTile]]) -> List[ProductTile]:
+    """
+    Merges shard results, keeping the first occurrence of each product URL.
+
+    A product listed under several subcategories is only kept once.
+    """
+    seen_urls = set()
+    merged = []
+    for products in results:
+        for product in products:
+            if product.url in seen_urls:
+                continue
+            seen_urls.add(product.url)
+            merged.append(product)
+    return merged
+
+
+def crawl_category(
+    fetcher: ColesPageFetcher,
+    category: Category,
+    max_workers: int = MAX_WORKERS,
+    data_client: Optional[NextDataClient] = None,
+) -> CrawlResult:
+    """
+    Crawls a category by scheduling each of its shards on a worker pool, and
+    merges the results de-duplicated by product URL. The category is complete if
+    all of its shards are.
+
+    :param data_client: Fetches the pages from their Next.js data routes instead of
+        their HTML.
+    """
+    shards = build_shards(category)
+    if len(shards) > 1:
+        logger.info(
+            "Crawling category '%s' as %d subcategory shards",
+            category.slug,
+            len(shards),
+        )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(lambda query: crawl_shard(fetcher, query, data_client), shards)
+        )
+    return CrawlResult(
+        products=merge_shard_results([result.products for result in results]),
+        complete=all(result.complete for result in results),
+    )
+
+
 def update_csv_with_archive(
-    new_df: pd.DataFrame, target_path: str, archive_path: str
+    new_df: pd.DataFrame,
+    target_path: str,
+    archive_path: str,
+    store: Optional[DatasetStore] = None,
 ) -> None:
     """
-    Appends new_df to an existing CSV file at target_path, deduplicates rows (keeping only the latest
+    Appends new_df to an existing dataset at target_path, deduplicates rows (keeping only the latest
     record based on the 'timestamp' column), and saves dropped duplicate rows to archive_path.
+
+    Both datasets are read and written in the format of `store` (STORAGE by default).
     """
-    if os.path.exists(target_path):
-        df_existing = pd.read_csv(target_path)
+    store = store or STORAGE
+    if store.exists(target_path):
+        df_existing = store.read(target_path)
         df_combined = pd.concat([df_existing, new_df], ignore_index=True)
     else:
         df_combined = new_df.copy()
 
     df_combined["timestamp_parsed"] = pd.to_datetime(
-        df_combined["timestamp"], errors="coerce"
+        df_combined["timestamp"], utc=True, errors="coerce", format="ISO8601"
     )
     df_combined.sort_values("timestamp_parsed", ascending=False, inplace=True)
     dup_mask = df_combined.duplicated(subset=["url"], keep="first")
@@ -70,57 +245,40 @@ def update_csv_with_archive(
     df_final = df_combined[~dup_mask].copy()
     df_final.drop(columns=["timestamp_parsed"], inplace=True)
 
-    os.makedirs(os.path.dirname(target_path), exist_ok=True)
-    df_final.to_csv(target_path, index=False)
-    logger.info("Saved %d deduplicated rows to %s", len(df_final), target_path)
+    saved_path = store.write(df_final, target_path, RAW_PRODUCTS_SCHEMA)
+    logger.info("Saved %d deduplicated rows to %s", len(df_final), saved_path)
 
     # Stale prices and product info to archive
     df_dropped = df_combined[dup_mask].copy()
     if not df_dropped.empty:
         df_dropped.drop(columns=["timestamp_parsed"], inplace=True)
-        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
-        if os.path.exists(archive_path):
-            df_archive = pd.read_csv(archive_path)
-            df_archive = pd.concat([df_archive, df_dropped], ignore_index=True)
-        else:
-            df_archive = df_dropped
-        df_archive.to_csv(archive_path, index=False)
-        logger.info("Archived %d duplicate rows to %s", len(df_dropped), archive_path)
+        saved_path = store.append(df_dropped, archive_path, RAW_PRODUCTS_SCHEMA)
+        logger.info("Archived %d duplicate rows to %s", len(df_dropped), saved_path)
 
 
-def process_product_data(input_path, output_path):
+def process_product_data(input_path, output_path, store: Optional[DatasetStore] = None):
     """
-    Reads scraped product data from a CSV, extracts and transforms
+    Reads scraped product data from a dataset, extracts and transforms
     fields, renames and reorders columns, and saves the processed product data
-    to the output path.
+    to the output path, in the format of `store` (STORAGE by default).
     """
-    df = pd.read_csv(input_path).copy()
+    store = store or STORAGE
+    df = store.read(input_path).copy()
 
     # Prepend base URL for product and image URLs.
-    df["url"] = "https://www.coles.com.au" + df["url"]
-    df["image_url"] = "https://www.coles.com.au" + df["image_url"]
+    df["url"] = COLES_ORIGIN + df["url"]
+    df["image_url"] = COLES_ORIGIN + df["image_url"]
 
     # Extract fields using regex.
     df["product_id"] = df["url"].str.extract(r"product\/(.+)\-\d+$")
     df["size"] = df["name"].str.extract(r"\| (.+)$")
-    df["price_aud"] = df["price"].str.extract(r"\$([\d,]+\.\d+)").astype(float)
-    df["was_price_aud"] = (
-        df["price_calc_method"].str.extract(r"Was \$([\d,]+\.\d+)").astype(float)
-    )
     df["was_date"] = df["price_calc_method"].str.extract(
         r"Was \$[\d,]+\.\d+ on (\w{3} \d{4})"
     )
-    df["unit_price_aud"] = (
-        df["price_calc_method"]
-        .str.replace(",", "")
-        .str.extract(r"\$([\d,]+\.\d+) per")
-        .astype(float)
-    )
-    df["unit"] = (
-        df["price_calc_method"]
-        .str.replace("Was", "")
-        .str.extract(r"\$[\d,]+\.\d+ per (\w+)(?:\s*Was)?")
-    )
+    # Typed prices, or prices parsed from the display strings for older rows.
+    prices = price_frame(df)
+    df = df.drop(columns=[c for c in PRICE_FRAME_COLUMNS if c in df])
+    df = df.join(prices)
 
     # Remove duplicate products.
     df.drop_duplicates(subset=["product_id"], keep="first", inplace=True)
@@ -162,24 +320,38 @@ def process_product_data(input_path, output_path):
     ]
     df = df[cols_order]
 
-    # Ensure the output directory exists and save the processed data.
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    df.to_csv(output_path, index=False)
+    # Unit prices per kg, L or each, for comparison across products.
+    df = add_base_unit_prices(df)
+
+    store.write(df, output_path, PROCESSED_PRODUCTS_SCHEMA)
 
 
-def dump_products(products: List[ProductTile], category: str) -> None:
+def dump_products(
+    products: List[ProductTile],
+    category: str,
+    detector: Optional[PriceChangeDetector] = None,
+    history: Optional[PriceHistory] = None,
+    complete: bool = True,
+) -> None:
     """
     Process and archive new product data for a given category.
 
     This function converts a list of ProductTile objects into a DataFrame,
-    enriches it with metadata, appends it to the raw products CSV (archiving duplicates),
-    and regenerates the processed products dataset.
+    enriches it with metadata, and keeps only the products that are new or whose
+    prices changed since the last crawl. Those are appended to the raw products CSV
+    (archiving the rows they replace) and to the price history store if given, and
+    the processed products dataset is regenerated.
+
+    :param complete: Whether every page of the category was crawled. Products of
+        an incomplete crawl that were not seen are not reported as delisted.
     """
     if not products:
         logger.info("No products to save for category '%s'.", category)
         return
 
+    detector = detector or PriceChangeDetector()
     df_new = pd.DataFrame(products)
+    df_new["unit"] = df_new["unit"].map(lambda unit: unit.value if unit else None)
     now = datetime.now(tz=LOCAL_TZ)
     df_new["category"] = category
     df_new["date"] = now.strftime("%Y-%m-%d")
@@ -189,13 +361,72 @@ def dump_products(products: List[ProductTile], category: str) -> None:
     archive_file = os.path.join("data", "archive", "products_dropped.csv")
     processed_file = os.path.join("data", "processed", "products.csv")
 
-    update_csv_with_archive(df_new, target_file, archive_file)
-    logger.info("Processed %d new rows for category '%s'.", len(df_new), category)
+    with REGISTRY.timer("change_detection_seconds"):
+        changes = detector.detect(df_new, category, complete=complete)
+    REGISTRY.increment(
+        "products_unchanged_total", changes.unchanged_count, category=category
+    )
+    if not changes:
+        logger.info("No price changes for category '%s'.", category)
+        return
 
-    process_product_data(input_path=target_file, output_path=processed_file)
+    df_updates = changes.updates.drop(columns=["fingerprint"])
+    if not df_updates.empty:
+        with REGISTRY.timer("storage_write_seconds", stage="update_csv_with_archive"):
+            update_csv_with_archive(df_updates, target_file, archive_file)
+        logger.info(
+            "Processed %d new or changed rows for category '%s'.",
+            len(df_updates),
+            category,
+        )
+
+        with REGISTRY.timer("storage_write_seconds", stage="process_product_data"):
+            process_product_data(input_path=target_file, output_path=processed_file)
+
+        if history is not None:
+            with REGISTRY.timer("storage_write_seconds", stage="price_history"):
+                history.ingest(df_updates)
+    detector.commit(changes)
+    REGISTRY.increment("products_written_total", len(df_updates), category=category)
+    REGISTRY.increment(
+        "products_delisted_total", len(changes.delisted), category=category
+    )
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--with-discounts",
+        action="store_true",
+        help="Also write the discount outputs, derived from this crawl instead of "
+        "a separate crawl of the specials pages.",
+    )
+    parser.add_argument(
+        "--archive-pages",
+        action="store_true",
+        help="Keep every fetched page in the compressed page archive "
+        "(data/archive/pages) so the crawl can be re-parsed later.",
+    )
+    parser.add_argument(
+        "--data-routes",
+        action="store_true",
+        help="Fetch browse and specials pages from the site's Next.js data routes "
+        "(their page props as JSON) instead of their full HTML.",
+    )
+    parser.add_argument(
+        "--cookie-backend",
+        choices=[backend.value for backend in CookieBackend],
+        default=CookieBackend.SELENIUMWIRE.value,
+        help="How cookie refreshes capture the cookie: through seleniumwire's proxy, "
+        "or from the cookie jar of a plain Chrome over the DevTools protocol.",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run Chrome without a window (browser cookie backend only).",
+    )
+    args = parser.parse_args()
+
     logging.basicConfig(
         level=logging.INFO,  # Set to INFO or WARNING in production.
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -203,51 +434,66 @@ if __name__ == "__main__":
     # Silence seleniumwire logs of network requests
     logging.getLogger("seleniumwire.handler").setLevel(logging.WARNING)
 
-    categories = [
-        "fruit-vegetables",
-        "dairy-eggs-fridge",
-        "pantry",
-        "meat-seafood",
-        "bakery",
-        "frozen",
-        "household",
-        "health-beauty",
-        "deli",
-        "pet",
-        "baby",
-        "liquor",
-    ]
     headers = {
         "cookie": None,
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
         "AppleWebKit/537.36 (KHTML, like Gecko) "
         "Chrome/129.0.0.0 Safari/537.36 Edg/129.0.0.0",
     }
-    fetcher = ColesPageFetcher(headers=headers)
-
-    for category in categories:
-        query = BrowseQuery(category=category, page=1)
-        products = []
-        while True:
-            try:
-                browse_results = extract_products_from_browse(fetcher, query)
-            except Exception as e:
-                browse_results = []
-                logger.error(
-                    "Error extracting products on page %d for category '%s': %s",
-                    query.page,
-                    category,
-                    e,
-                )
-
-            if browse_results:
-                products.extend(browse_results)
-                query.page += 1
-            else:
-                break
-
-        dump_products(products, category)
-
-        if category != categories[-1]:
-            logger.info("Sleeping for %d seconds...", DURATION_5_MINS)
-            time.sleep(DURATION_5_MINS)
+    retry_policy = RetryPolicy(
+        budget=RetryBudget(
+            max_retries=MAX_RETRIES_PER_CRAWL,
+            # Every thread caught by a block spends a retry, though they share
+            # one refresh.
+            max_retries_per_kind={
+                FailureKind.BOT_BLOCK: MAX_COOKIE_REFRESHES_PER_CRAWL * MAX_WORKERS
+            },
+        )
+    )
+    archive = PageArchive() if args.archive_pages else None
+    driver_factory = (
+        browser_driver_factory(headless=args.headless)
+        if args.cookie_backend == CookieBackend.BROWSER.value
+        else None
+    )
+    fetcher = ColesPageFetcher(
+        driver_factory=driver_factory,
+        headers=headers,
+        retry_policy=retry_policy,
+        archive=archive,
+        stop_after_page_state=True,
+        cookie_store=CookieStore(),
+        cookie_backend=args.cookie_backend,
+    )
+    data_client = NextDataClient(fetcher) if args.data_routes else None
+
+    categories = CategoryCache().get(fetcher) or [
+        Category(name=slug, slug=slug, url=public_url(f"/browse/{slug}"))
+        for slug in FALLBACK_CATEGORIES
+    ]
+
+    detector = PriceChangeDetector()
+    catalogue = []
+    with PriceHistory() as history:
+        for category in categories:
+            result = crawl_category(fetcher, category, data_client=data_client)
+            dump_products(
+                result.products,
+                category.slug,
+                detector,
+                history,
+                complete=result.complete,
+            )
+            if args.with_discounts:
+                catalogue.append(result.products)
+
+    if args.with_discounts:
+        save_catalogue_discounts(
+            fetcher, merge_shard_results(catalogue), data_client=data_client
+        )
+
+    if archive is not None:
+        logger.info("Page archive: %s", archive.stats())
+        archive.close()
+
+    export_run_metrics("scrape_products")
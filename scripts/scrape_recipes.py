@@ -19,6 +19,7 @@ from selenium.webdriver.support import expected_conditions as EC
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
+from src.endpoints import ROUTER
 from src.webdriver_utils import init_seleniumwire_webdriver
 
 logger = logging.getLogger(__name__)
@@ -234,7 +235,7 @@ def scrape_dinner_recipes():
     """
     Main function to scrape dinner recipes from Coles website.
     """
-    category_url = "https://www.coles.com.au/recipes-inspiration/category/meal/dinner"
+    category_url = ROUTER.url("/recipes-inspiration/category/meal/dinner")
     max_recipes = 200
     
     driver = None
@@ -1,7 +1,33 @@
 """
 Package for scraping product data from Coles online storefront.
+
+The classes below are imported on first access, so importing one submodule (e.g.
+`src.scrapers` in a re-parse worker) doesn't load the fetcher and Selenium.
 """
 
-from .fetcher import ColesPageFetcher
-from .models import Product, ProductTile
-from .scrapers import ColesProductScraper, ColesProductTileScraper
+import importlib
+
+_EXPORTS = {
+    "ColesPageFetcher": "src.fetcher",
+    "Category": "src.models",
+    "Product": "src.models",
+    "ProductTile": "src.models",
+    "NextDataClient": "src.nextdata",
+    "ColesCategoryScraper": "src.scrapers",
+    "ColesProductScraper": "src.scrapers",
+    "ColesProductTileScraper": "src.scrapers",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
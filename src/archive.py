@@ -0,0 +1,414 @@
+"""
+Raw page archive.
+
+Keeps every fetched page (URL, fetch time, status, headers and body) so pages can be
+re-parsed after a site change. Bodies are deduplicated by content hash and
+appended as independent zstd frames to large segment files, compressed with a
+dictionary trained on the archive's own pages: Coles pages share most of their
+markup, so a dictionary shrinks them far more than compressing each on its own.
+
+A SQLite index maps (URL, fetch time) to a body, and a body to its segment, offset
+and length. Bodies are read by slicing memory-mapped segments, so any page is one
+index lookup and one frame decompression away, and bulk re-parses read the
+segments sequentially.
+
+Layout of the archive directory:
+    index.sqlite           pages, bodies and dictionaries
+    segment-00000.zst      append-only zstd frames, rotated at `segment_bytes`
+
+The archive requires the zstandard package.
+
+Typical usage example:
+>>> with PageArchive() as archive:
+...     archive.put("https://www.coles.com.au/browse/frozen", html)
+...     page = archive.get("https://www.coles.com.au/browse/frozen")
+...     for page in archive.iter_pages(url_prefix=public_url("/browse/")):
+...         ColesProductTileScraper(page.body).get_all_products()
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Mapping, Optional, Union
+from urllib.parse import urlsplit
+
+from src.endpoints import public_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = os.path.join("data", "archive", "pages")
+SEGMENT_BYTES = 256 * 1024 * 1024
+COMPRESSION_LEVEL = 9
+DICTIONARY_BYTES = 112 * 1024
+# Bodies stored before the dictionary is trained from them.
+TRAIN_AFTER = 64
+NO_DICTIONARY = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bodies (
+    hash TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    raw_length INTEGER NOT NULL,
+    dictionary INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    status INTEGER,
+    headers TEXT,
+    hash TEXT NOT NULL REFERENCES bodies (hash),
+    PRIMARY KEY (url, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);
+"""
+
+
+@dataclass
+class ArchivedPage:
+    """
+    A page as fetched.
+    """
+
+    url: str
+    fetched_at: str  # UTC, e.g. "2024-10-01T00:00:00"
+    status: Optional[int] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+def canonical_url(url: str) -> str:
+    """
+    The public Coles URL of a page, whichever origin it was fetched from.
+    """
+    parts = urlsplit(url)
+    return public_url(parts.path + (f"?{parts.query}" if parts.query else ""))
+
+
+def _utc_iso(moment: Optional[datetime]) -> str:
+    moment = moment or datetime.now(tz=timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class PageArchive:
+    """
+    Append-only, deduplicated and compressed archive of fetched pages.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_DIRECTORY,
+        level: int = COMPRESSION_LEVEL,
+        segment_bytes: int = SEGMENT_BYTES,
+        train_after: int = TRAIN_AFTER,
+    ):
+        """
+        :param directory: Archive directory, created if missing.
+        :param level: zstd compression level.
+        :param segment_bytes: Size at which a new segment file is started.
+        :param train_after: Number of bodies to store before training the shared
+            dictionary from them. Bodies stored before then are compressed without
+            one.
+        """
+        import zstandard
+
+        self._zstd = zstandard
+        self.directory = directory
+        self.level = level
+        self.segment_bytes = segment_bytes
+        self.train_after = train_after
+        os.makedirs(directory, exist_ok=True)
+
+        # Pages may be archived from several fetcher threads.
+        self._lock = threading.RLock()
+        self.connection = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+        self._dictionaries: Dict[int, object] = {}
+        self._compressors: Dict[int, object] = {}
+        self._local = threading.local()
+        self._maps: Dict[int, mmap.mmap] = {}
+        self.dictionary_id = self._latest_dictionary_id()
+        self.segment = self._latest_segment()
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self.connection.close()
+
+    def __enter__(self) -> "PageArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- Writing --- #
+
+    def put(
+        self,
+        url: str,
+        body: Union[bytes, str],
+        fetched_at: Optional[datetime] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        status: Optional[int] = 200,
+    ) -> ArchivedPage:
+        """
+        Archives a page. A body already in the archive is not stored again.
+
+        :param url: Page URL; its origin is replaced with the public Coles one.
+        :param fetched_at: When the page was fetched. Defaults to now.
+        :return: The archived page.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        page = ArchivedPage(
+            url=canonical_url(url),
+            fetched_at=_utc_iso(fetched_at),
+            status=status,
+            headers=dict(headers or {}),
+            body=body,
+        )
+        digest = hashlib.blake2b(body, digest_size=20).hexdigest()
+
+        with self._lock, self.connection:
+            stored = self.connection.execute(
+                "SELECT 1 FROM bodies WHERE hash = ?", (digest,)
+            ).fetchone()
+            if stored is None:
+                self._append_body(digest, body)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (
+                    page.url,
+                    page.fetched_at,
+                    page.status,
+                    json.dumps(page.headers),
+                    digest,
+                ),
+            )
+        if stored is None and self.dictionary_id == NO_DICTIONARY:
+            self._maybe_train_dictionary()
+        return page
+
+    def _append_body(self, digest: str, body: bytes) -> None:
+        frame = self._compressor(self.dictionary_id).compress(body)
+        path = self._segment_path(self.segment)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self.segment += 1
+            path = self._segment_path(self.segment)
+
+        with open(path, "ab") as segment:
+            offset = segment.tell()
+            segment.write(frame)
+        self.connection.execute(
+            "INSERT INTO bodies VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, self.segment, offset, len(frame), len(body), self.dictionary_id),
+        )
+
+    def _maybe_train_dictionary(self) -> None:
+        with self._lock:
+            (count,) = self.connection.execute("SELECT COUNT(*) FROM bodies").fetchone()
+            if self.dictionary_id != NO_DICTIONARY or count < self.train_after:
+                return
+            samples = [
+                self._read_body(row)
+                for row in self.connection.execute(
+                    "SELECT segment, offset, length, dictionary FROM bodies "
+                    "ORDER BY segment, offset"
+                )
+            ]
+            try:
+                trained = self._zstd.train_dictionary(DICTIONARY_BYTES, samples)
+            except self._zstd.ZstdError as e:
+                logger.warning("Couldn't train a page dictionary: %s", e)
+                return
+            with self.connection:
+                cursor = self.connection.execute(
+                    "INSERT INTO dictionaries (data) VALUES (?)",
+                    (trained.as_bytes(),),
+                )
+            self.dictionary_id = cursor.lastrowid
+            logger.info(
+                "Trained page dictionary %d from %d bodies",
+                self.dictionary_id,
+                len(samples),
+            )
+
+    # --- Reading --- #
+
+    def get(self, url: str, at: Optional[datetime] = None) -> Optional[ArchivedPage]:
+        """
+        The latest archived copy of a page, or the latest fetched at or before `at`.
+
+        :return: The page, or None if it was never archived (before `at`).
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT url, fetched_at, status, headers, hash FROM pages "
+                "WHERE url = ? AND fetched_at <= ? ORDER BY fetched_at DESC LIMIT 1",
+                (canonical_url(url), _utc_iso(at) if at else "9999"),
+            ).fetchone()
+        return self._page(row) if row else None
+
+    def iter_pages(
+        self,
+        url_prefix: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[ArchivedPage]:
+        """
+        Streams archived pages, e.g. to re-parse them, in segment order so the
+        segments are read sequentially.
+
+        :param url_prefix: Only pages whose URL starts with this.
+        :param since: Only pages fetched at or after this.
+        :param until: Only pages fetched before this.
+        """
+        where, params = [], []
+        if url_prefix:
+            where.append("p.url >= ? AND p.url < ?")
+            params += [url_prefix, url_prefix + "\uffff"]
+        if since:
+            where.append("p.fetched_at >= ?")
+            params.append(_utc_iso(since))
+        if until:
+            where.append("p.fetched_at < ?")
+            params.append(_utc_iso(until))
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT p.url, p.fetched_at, p.status, p.headers, p.hash "
+                "FROM pages p JOIN bodies b ON b.hash = p.hash"
+                + (f" WHERE {' AND '.join(where)}" if where else "")
+                + " ORDER BY b.segment, b.offset, p.fetched_at",
+                params,
+            ).fetchall()
+        for row in rows:
+            yield self._page(row)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Page and body counts, and the size of the bodies before and after
+        compression.
+        """
+        with self._lock:
+            pages, bodies, raw_bytes, stored_bytes = self.connection.execute(
+                "SELECT (SELECT COUNT(*) FROM pages), COUNT(*), "
+                "COALESCE(SUM(raw_length), 0), COALESCE(SUM(length), 0) FROM bodies"
+            ).fetchone()
+        return {
+            "pages": pages,
+            "bodies": bodies,
+            "raw_bytes": raw_bytes,
+            "stored_bytes": stored_bytes,
+        }
+
+    def _page(self, row) -> ArchivedPage:
+        url, fetched_at, status, headers, digest = row
+        with self._lock:
+            location = self.connection.execute(
+                "SELECT segment, offset, length, dictionary FROM bodies WHERE hash = ?",
+                (digest,),
+            ).fetchone()
+        return ArchivedPage(
+            url=url,
+            fetched_at=fetched_at,
+            status=status,
+            headers=json.loads(headers) if headers else {},
+            body=self._read_body(location),
+        )
+
+    def _read_body(self, location) -> bytes:
+        segment, offset, length, dictionary_id = location
+        frame = self._map(segment, offset + length)[offset : offset + length]
+        return self._decompressor(dictionary_id).decompress(frame)
+
+    def _map(self, segment: int, size: int) -> mmap.mmap:
+        """
+        The segment memory-mapped, remapped if it has grown past the mapping.
+        """
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < size:
+                if mapped is not None:
+                    mapped.close()
+                with open(self._segment_path(segment), "rb") as file:
+                    mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped
+
+    # --- Compression --- #
+
+    def _dictionary(self, dictionary_id: int):
+        if dictionary_id not in self._dictionaries:
+            (data,) = self.connection.execute(
+                "SELECT data FROM dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()
+            self._dictionaries[dictionary_id] = self._zstd.ZstdCompressionDict(data)
+        return self._dictionaries[dictionary_id]
+
+    def _compressor(self, dictionary_id: int):
+        # Only used under the write lock.
+        if dictionary_id not in self._compressors:
+            dictionary = (
+                self._dictionary(dictionary_id)
+                if dictionary_id != NO_DICTIONARY
+                else None
+            )
+            self._compressors[dictionary_id] = self._zstd.ZstdCompressor(
+                level=self.level, dict_data=dictionary
+            )
+        return self._compressors[dictionary_id]
+
+    def _decompressor(self, dictionary_id: int):
+        # zstd contexts aren't thread-safe, so each reading thread has its own.
+        decompressors = self._local.__dict__.setdefault("decompressors", {})
+        if dictionary_id not in decompressors:
+            with self._lock:
+                dictionary = (
+                    self._dictionary(dictionary_id)
+                    if dictionary_id != NO_DICTIONARY
+                    else None
+                )
+            decompressors[dictionary_id] = self._zstd.ZstdDecompressor(
+                dict_data=dictionary
+            )
+        return decompressors[dictionary_id]
+
+    # --- Layout --- #
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:05d}.zst")
+
+    def _latest_segment(self) -> int:
+        (segment,) = self.connection.execute(
+            "SELECT COALESCE(MAX(segment), 0) FROM bodies"
+        ).fetchone()
+        return segment
+
+    def _latest_dictionary_id(self) -> int:
+        (dictionary_id,) = self.connection.execute(
+            "SELECT COALESCE(MAX(id), ?) FROM dictionaries", (NO_DICTIONARY,)
+        ).fetchone()
+        return dictionary_id
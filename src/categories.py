@@ -0,0 +1,124 @@
+"""
+Category tree discovery for the Coles website.
+
+Discovers the category hierarchy over plain HTTP (no browser) and caches it on
+disk, so crawlers can pick up new categories without code changes.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Callable, List, Optional
+
+from src.endpoints import ROUTER
+from src.models import Category
+from src.scrapers import ColesCategoryScraper
+
+logger = logging.getLogger(__name__)
+
+# Promotional groupings listed alongside regular categories. Their products also
+# appear under the regular categories, so crawling them only duplicates work.
+CAMPAIGN_CATEGORY_SLUGS = {"down-down", "back-to-school", "bonus-credit-products"}
+
+
+def discover_categories(fetcher, url: Optional[str] = None) -> List[Category]:
+    """
+    Fetches a browse page and extracts the category tree from its page state.
+
+    :param fetcher: A ColesPageFetcher (or anything with a compatible `get`).
+    :param url: The browse page to read the tree from. Defaults to the routed browse page.
+    :return: A list of top-level categories, excluding campaign groupings.
+    """
+    url = url or ROUTER.browse_url()
+    response = fetcher.get(url=url)
+    categories = ColesCategoryScraper(response.content).get_categories()
+    categories = [c for c in categories if c.slug not in CAMPAIGN_CATEGORY_SLUGS]
+    logger.info("Discovered %d categories from %s", len(categories), url)
+    return categories
+
+
+class CategoryCache:
+    """
+    On-disk cache of the category tree with a time-to-live.
+    """
+
+    DEFAULT_PATH = os.path.join("data", "raw", "product-categories.json")
+    DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param path: Location of the cache file. Defaults to `data/raw/product-categories.json`.
+        :param ttl_seconds: How long a cached tree stays fresh. Defaults to one day.
+        :param clock: Function returning the current epoch time (can be overridden in tests).
+        """
+        self.path = path or self.DEFAULT_PATH
+        self.ttl_seconds = (
+            self.DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.clock = clock
+
+    def load(self, allow_stale: bool = False) -> Optional[List[Category]]:
+        """
+        Loads the cached category tree.
+
+        :param allow_stale: Return the tree even if it has outlived the TTL.
+        :return: The cached categories, or None if missing, unreadable or stale.
+        """
+        try:
+            with open(self.path, "r") as src:
+                payload = json.load(src)
+            fetched_at = payload["fetched_at"]
+            categories = [Category.from_dict(c) for c in payload["categories"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if not allow_stale and self.clock() - fetched_at > self.ttl_seconds:
+            return None
+        return categories
+
+    def save(self, categories: List[Category]) -> None:
+        """
+        Saves the category tree along with the time it was fetched.
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            "fetched_at": self.clock(),
+            "categories": [category.dict() for category in categories],
+        }
+        with open(self.path, "w") as dst:
+            json.dump(payload, dst)
+        logger.info("Saved %d categories to %s", len(categories), self.path)
+
+    def get(self, fetcher) -> List[Category]:
+        """
+        Returns the cached tree if fresh, otherwise rediscovers and caches it.
+
+        Falls back to a stale cache if discovery fails or finds nothing.
+        """
+        categories = self.load()
+        if categories:
+            return categories
+
+        try:
+            categories = discover_categories(fetcher)
+        except Exception as e:
+            logger.error("Error discovering categories: %s", e)
+            categories = []
+
+        if categories:
+            self.save(categories)
+            return categories
+
+        stale = self.load(allow_stale=True)
+        if stale:
+            logger.warning("Using stale category cache from %s", self.path)
+            return stale
+        return []
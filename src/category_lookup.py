@@ -0,0 +1,272 @@
+"""
+Product → category lookup backed by a memory-mapped index.
+
+The index is built from the processed products dataset and stores product ids as
+sorted fixed-width byte strings next to a parallel array of category codes, so it
+opens without parsing anything and answers lookups (single or vectorised) by binary
+search. It is rebuilt automatically whenever the processed products file changes.
+
+Each version of the products file gets its own index file, named after it (e.g.
+`product_categories.1729558800000000000-52311.idx`), rather than one file being
+replaced in place: a file mapped by a reader can't be replaced on Windows. Index
+files of older versions are removed once no longer mapped.
+"""
+
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.storage import STORAGE
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PCATIDX1"
+HEADER_LENGTH = struct.Struct("<I")
+CODE_DTYPE = np.dtype("<u2")
+ALIGNMENT = 8
+
+SourceVersion = Tuple[int, int]
+
+
+def _source_version(path: str) -> Optional[SourceVersion]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def write_index(
+    path: str,
+    product_ids: pd.Series,
+    categories: pd.Series,
+    source_version: Optional[SourceVersion] = None,
+) -> None:
+    """
+    Writes a lookup index.
+
+    Layout: magic, header length, JSON header (source version, key width, count,
+    category names), padding to 8 bytes, `count` sorted keys of `width` bytes, then
+    `count` little-endian uint16 category codes.
+    """
+    frame = pd.DataFrame({"product_id": product_ids, "category": categories})
+    frame = frame.dropna().drop_duplicates(subset=["product_id"], keep="first")
+    keys = frame["product_id"].astype(str).str.encode("utf-8")
+    width = max(int(keys.str.len().max()), 1) if len(keys) else 1
+    keys = np.asarray(keys, dtype=f"S{width}")
+    order = np.argsort(keys, kind="stable")
+
+    names, codes = np.unique(frame["category"].astype(str), return_inverse=True)
+    header = json.dumps(
+        {
+            "source_version": list(source_version) if source_version else None,
+            "width": width,
+            "count": len(keys),
+            "categories": names.tolist(),
+        }
+    ).encode("utf-8")
+    prefix = MAGIC + HEADER_LENGTH.pack(len(header)) + header
+    padding = b"\0" * (-len(prefix) % ALIGNMENT)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as dst:
+        dst.write(prefix + padding)
+        dst.write(keys[order].tobytes())
+        dst.write(codes[order].astype(CODE_DTYPE).tobytes())
+    try:
+        os.replace(tmp_path, path)
+    except PermissionError:
+        # Another process built the same index and mapped it first (Windows can't
+        # replace a mapped file); keep its copy.
+        os.remove(tmp_path)
+
+
+class _MappedIndex:
+    """
+    An opened index: zero-copy numpy views over a memory-mapped file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as src:
+            self._mmap = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a category lookup index: {path}")
+        (header_length,) = HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(self._mmap[start : start + header_length])
+        offset = start + header_length
+        offset += -offset % ALIGNMENT
+
+        version = header["source_version"]
+        self.source_version = tuple(version) if version else None
+        self.width = header["width"]
+        self.categories: List[str] = header["categories"]
+        count = header["count"]
+        self.keys = np.frombuffer(
+            self._mmap, dtype=f"S{self.width}", count=count, offset=offset
+        )
+        self.codes = np.frombuffer(
+            self._mmap,
+            dtype=CODE_DTYPE,
+            count=count,
+            offset=offset + count * self.width,
+        )
+
+
+class CategoryLookup:
+    """
+    Cached product → category lookup, shared by the discount pipeline and any
+    enrichment step.
+
+    Typical usage example:
+    >>> lookup = CategoryLookup()
+    >>> lookup.get("coles-full-cream-milk-2l")
+    'dairy-eggs-fridge'
+    >>> df["category"] = lookup.map(df["product_id"])
+    """
+
+    DEFAULT_PRODUCTS_PATH = os.path.join("data", "processed", "products.csv")
+    DEFAULT_INDEX_PATH = os.path.join("data", "processed", "product_categories.idx")
+
+    def __init__(
+        self, products_path: Optional[str] = None, index_path: Optional[str] = None
+    ):
+        """
+        :param products_path: Processed products dataset with `product_id` and
+            `category` columns, in any storage format. Defaults to
+            `data/processed/products.csv`.
+        :param index_path: Where the index is kept, with the version of the products
+            file it was built from inserted before its extension. Defaults to
+            `data/processed/product_categories.idx`.
+        """
+        self.products_path = products_path or self.DEFAULT_PRODUCTS_PATH
+        self.index_path = index_path or self.DEFAULT_INDEX_PATH
+        self._index: Optional[_MappedIndex] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[_MappedIndex]:
+        """
+        The index matching the current processed products file, opening or rebuilding
+        it if that file changed since it was last seen.
+        """
+        source = STORAGE.resolve(self.products_path)
+        version = _source_version(source) if source else None
+        with self._lock:
+            index = self._index
+            if index is not None and (
+                version is None or index.source_version == version
+            ):
+                return index
+
+            if version is None:
+                # Without the products file, the latest index is the best guess.
+                paths = sorted(self._index_files(), key=os.path.getmtime)
+                index = self._open(paths[-1]) if paths else None
+                if index is None:
+                    logger.warning(
+                        "%s not found; product categories are unknown.",
+                        self.products_path,
+                    )
+            else:
+                index = self._open(self.versioned_path(version))
+                if index is None or index.source_version != version:
+                    index = self._build(version)
+            self._index = index
+            if index is not None:
+                self._remove_stale(keep=index.path)
+            return index
+
+    def versioned_path(self, version: SourceVersion) -> str:
+        """
+        The index file for a version (mtime, size) of the products file.
+        """
+        root, ext = os.path.splitext(self.index_path)
+        return f"{root}.{version[0]}-{version[1]}{ext}"
+
+    def _index_files(self) -> List[str]:
+        root, ext = os.path.splitext(self.index_path)
+        pattern = f"{glob.escape(root)}.*-*{glob.escape(ext)}"
+        return [path for path in glob.glob(pattern) if not path.endswith(".tmp")]
+
+    def _open(self, path: str) -> Optional[_MappedIndex]:
+        if not os.path.exists(path):
+            return None
+        try:
+            return _MappedIndex(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable index %s: %s", path, e)
+            return None
+
+    def _remove_stale(self, keep: str) -> None:
+        for path in self._index_files():
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader, on Windows; removed on a later rebuild.
+                pass
+
+    def _build(self, version: SourceVersion) -> _MappedIndex:
+        df = STORAGE.read(
+            self.products_path, columns=["product_id", "category"], dtype=str
+        )
+        path = self.versioned_path(version)
+        write_index(path, df["product_id"], df["category"], version)
+        logger.info(
+            "Built category index for %d products from %s",
+            len(df),
+            self.products_path,
+        )
+        return _MappedIndex(path)
+
+    def __len__(self) -> int:
+        index = self._current()
+        return 0 if index is None else len(index.keys)
+
+    def get(self, product_id: str) -> Optional[str]:
+        """
+        The category of a product, or None if unknown.
+        """
+        category = self.map(pd.Series([product_id])).iloc[0]
+        return None if pd.isna(category) else category
+
+    def map(self, product_ids: pd.Series) -> pd.Series:
+        """
+        Vectorised lookup of many products.
+
+        :return: Categories aligned with `product_ids`, NaN where unknown.
+        """
+        index = self._current()
+        result = pd.Series(np.nan, index=product_ids.index, dtype=object)
+        if index is None or not len(index.keys):
+            return result
+
+        encoded = product_ids.fillna("").astype(str).str.encode("utf-8")
+        # Longer ids can't be in the index, and would be truncated by the cast.
+        fits = (encoded.str.len() <= index.width).to_numpy()
+        queries = np.asarray(encoded.where(fits, b""), dtype=f"S{index.width}")
+
+        positions = np.searchsorted(index.keys, queries)
+        positions = np.minimum(positions, len(index.keys) - 1)
+        found = fits & (index.keys[positions] == queries) & (queries != b"")
+
+        names = np.asarray(index.categories, dtype=object)
+        result[found] = names[index.codes[positions[found]]]
+        return result
+
+
+# Process-wide lookup; opened lazily on first use.
+CATEGORY_LOOKUP = CategoryLookup()
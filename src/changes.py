@@ -0,0 +1,213 @@
+"""
+Price change detection between crawl snapshots.
+
+Keeps a fingerprint of each product's price-relevant fields from the last snapshot,
+keyed by product URL, so a crawl only writes products that are new, changed or
+delisted. Every change is also appended to a compact per-product price timeline.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Fields whose change makes a product worth writing again.
+PRICE_FIELDS = [
+    "price",
+    "price_calc_method",
+    "was_price",
+    "discount_percentage",
+    "special_type",
+    "is_on_special",
+]
+STATE_COLUMNS = ["url", "fingerprint", "category", "last_changed"]
+TIMELINE_COLUMNS = ["url", "timestamp", "event", "category"] + PRICE_FIELDS
+
+
+def fingerprint(df: pd.DataFrame) -> pd.Series:
+    """
+    Hashes the price-relevant fields of each row into a 64-bit fingerprint.
+
+    Missing columns and missing values hash as empty strings, so rows scraped before
+    a field existed compare equal to rows where it is empty.
+    """
+    fields = df.reindex(columns=PRICE_FIELDS).astype(object)
+    fields = fields.where(fields.notna(), "").astype(str)
+    return pd.util.hash_pandas_object(fields, index=False).astype("int64")
+
+
+@dataclass
+class ChangeSet:
+    """
+    Difference between a category's snapshot and the previous one.
+    """
+
+    category: str
+    timestamp: str
+    new: pd.DataFrame
+    changed: pd.DataFrame
+    delisted: pd.DataFrame
+    unchanged_count: int
+
+    @property
+    def updates(self) -> pd.DataFrame:
+        """
+        Rows to write: new and changed products, in snapshot order.
+        """
+        return pd.concat([self.new, self.changed]).sort_index()
+
+    def __bool__(self):
+        return not (self.new.empty and self.changed.empty and self.delisted.empty)
+
+
+class PriceChangeDetector:
+    """
+    Detects new, changed and delisted products against the last snapshot.
+
+    Typical usage example:
+    >>> detector = PriceChangeDetector()
+    >>> changes = detector.detect(df_snapshot, category="pantry")
+    >>> update_csv_with_archive(changes.updates, target_path, archive_path)
+    >>> detector.commit(changes)  # only once the updates are safely written
+    """
+
+    DEFAULT_STATE_PATH = os.path.join("data", "state", "price_fingerprints.csv")
+    DEFAULT_TIMELINE_PATH = os.path.join("data", "processed", "price_timeline.csv")
+
+    def __init__(
+        self, state_path: Optional[str] = None, timeline_path: Optional[str] = None
+    ):
+        """
+        :param state_path: Fingerprints from the last snapshot. Defaults to
+            `data/state/price_fingerprints.csv`.
+        :param timeline_path: Append-only price timeline. Defaults to
+            `data/processed/price_timeline.csv`.
+        """
+        self.state_path = state_path or self.DEFAULT_STATE_PATH
+        self.timeline_path = timeline_path or self.DEFAULT_TIMELINE_PATH
+        self._state: Optional[pd.DataFrame] = None
+
+    @property
+    def state(self) -> pd.DataFrame:
+        """
+        Last known fingerprint of every listed product, indexed by URL.
+        """
+        if self._state is None:
+            if os.path.exists(self.state_path):
+                self._state = pd.read_csv(self.state_path, index_col="url")
+            else:
+                self._state = pd.DataFrame(columns=STATE_COLUMNS).set_index("url")
+        return self._state
+
+    def detect(
+        self, snapshot: pd.DataFrame, category: str, complete: bool = True
+    ) -> ChangeSet:
+        """
+        Compares a category's snapshot with the last known state. Does not modify
+        the state; see `commit`.
+
+        :param snapshot: Rows with a `url`, the price fields and a `timestamp`.
+        :param complete: Whether the snapshot covers the whole category. The
+            products missing from a partial snapshot (e.g. a crawl cut short by an
+            error) are not delisted, and stay in the state.
+        :return: New and changed rows of the snapshot, and the delisted products of
+            the category (URLs no longer listed).
+        """
+        snapshot = snapshot.drop_duplicates(subset=["url"], keep="last")
+        fingerprints = fingerprint(snapshot)
+        previous = self.state["fingerprint"].reindex(snapshot["url"]).to_numpy()
+
+        is_new = pd.isna(previous)
+        is_changed = ~is_new & (previous != fingerprints.to_numpy())
+
+        listed = self.state[self.state["category"] == category]
+        delisted = listed[~listed.index.isin(snapshot["url"])].reset_index()
+        if not complete and not delisted.empty:
+            logger.warning(
+                "Category '%s' was only partly crawled; not delisting %d unseen "
+                "products",
+                category,
+                len(delisted),
+            )
+            delisted = delisted.iloc[0:0]
+
+        timestamp = (
+            str(snapshot["timestamp"].iloc[0])
+            if "timestamp" in snapshot and not snapshot.empty
+            else pd.Timestamp.now(tz="UTC").isoformat()
+        )
+        changes = ChangeSet(
+            category=category,
+            timestamp=timestamp,
+            new=snapshot[is_new].assign(fingerprint=fingerprints[is_new]),
+            changed=snapshot[is_changed].assign(fingerprint=fingerprints[is_changed]),
+            delisted=delisted,
+            unchanged_count=int((~is_new & ~is_changed).sum()),
+        )
+        logger.info(
+            "Category '%s': %d new, %d changed, %d delisted, %d unchanged products",
+            category,
+            len(changes.new),
+            len(changes.changed),
+            len(changes.delisted),
+            changes.unchanged_count,
+        )
+        return changes
+
+    def commit(self, changes: ChangeSet) -> None:
+        """
+        Applies a change set to the state and appends it to the price timeline.
+        """
+        updates = changes.updates
+        state = self.state.drop(index=changes.delisted.get("url", []))
+        rows = pd.DataFrame(
+            {
+                "fingerprint": updates["fingerprint"].to_numpy(),
+                "category": changes.category,
+                "last_changed": (
+                    updates["timestamp"].to_numpy()
+                    if "timestamp" in updates
+                    else changes.timestamp
+                ),
+            },
+            index=pd.Index(updates["url"], name="url"),
+        )
+        self._state = pd.concat([state.drop(index=rows.index, errors="ignore"), rows])
+        self._save_state()
+        self._append_timeline(changes)
+
+    def _save_state(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated state behind.
+        tmp_path = self.state_path + ".tmp"
+        self._state.to_csv(tmp_path)
+        os.replace(tmp_path, self.state_path)
+
+    def _append_timeline(self, changes: ChangeSet) -> None:
+        events = pd.concat(
+            [
+                changes.new.assign(event="new"),
+                changes.changed.assign(event="changed"),
+                pd.DataFrame({"url": changes.delisted.get("url", [])}).assign(
+                    event="delisted", timestamp=changes.timestamp
+                ),
+            ],
+            ignore_index=True,
+        )
+        if events.empty:
+            return
+        events["category"] = changes.category
+        events = events.reindex(columns=TIMELINE_COLUMNS)
+
+        directory = os.path.dirname(self.timeline_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        exists = os.path.exists(self.timeline_path)
+        events.to_csv(self.timeline_path, mode="a", header=not exists, index=False)
+        logger.info("Appended %d events to %s", len(events), self.timeline_path)
@@ -4,23 +4,157 @@ Base scrapers with common scraping utilities.
 All scraper classes should inherit from these.
 """
 
+import codecs
+import json
 import logging
-from typing import List, Optional
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
 
 from bs4 import BeautifulSoup
 from bs4.element import Tag
 
+from src.metrics import REGISTRY
+
 logger = logging.getLogger(__name__)
 
+NEXT_DATA_PATTERN = re.compile(
+    rb'<script id="__NEXT_DATA__" type="application/json"[^>]*>(.*?)</script>',
+    re.DOTALL,
+)
+# The Next.js page state and any JSON-LD blocks, found in a single scan.
+EMBEDDED_JSON_PATTERN = re.compile(
+    rb"<script (?:"
+    rb'id="__NEXT_DATA__" type="application/json"'
+    rb'|type="application/(?P<ld>ld\+json)"'
+    rb")[^>]*>(?P<body>.*?)</script>",
+    re.DOTALL,
+)
+
+CHARSET_PATTERN = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def declared_encoding(headers: Optional[Mapping[str, str]]) -> Optional[str]:
+    """
+    The charset a response declares in its Content-Type header.
+
+    :return: The codec name, or None if none (or an unknown one) is declared.
+    """
+    content_type = next(
+        (
+            value
+            for name, value in (headers or {}).items()
+            if name.lower() == "content-type"
+        ),
+        "",
+    )
+    match = CHARSET_PATTERN.search(content_type or "")
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1)).name
+    except LookupError:
+        return None
+
+
+def extract_next_data(html_content: Union[str, bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Extracts the embedded Next.js page state (the `__NEXT_DATA__` script) from a page.
+
+    :param html_content: The page's HTML, as text or raw bytes.
+    :return: The decoded page state if found, otherwise None.
+    """
+    if isinstance(html_content, str):
+        html_content = html_content.encode("utf-8")
+    match = NEXT_DATA_PATTERN.search(html_content)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError as e:
+        logger.error(f"Error decoding __NEXT_DATA__: {e}")
+        return None
+
+
+def extract_embedded_json(
+    html_content: Union[str, bytes]
+) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Extracts the embedded Next.js page state and the JSON-LD blocks of a page in one
+    pass over the document, decoding each block once.
+
+    :param html_content: The page's HTML, as text or raw bytes.
+    :return: The page state if found (otherwise None), and the decoded JSON-LD
+        objects in document order. Blocks that fail to decode are skipped.
+    """
+    if isinstance(html_content, str):
+        html_content = html_content.encode("utf-8")
+    next_data, ld_json = None, []
+    for match in EMBEDDED_JSON_PATTERN.finditer(html_content):
+        try:
+            data = json.loads(match.group("body"))
+        except ValueError as e:
+            logger.error(f"Error decoding embedded JSON: {e}")
+            continue
+        if match.group("ld"):
+            ld_json.extend(data if isinstance(data, list) else [data])
+        elif next_data is None:
+            next_data = data
+    return next_data, ld_json
+
 
 class HtmlScraper:
     """
     Base class for scraping HTML content using BeautifulSoup.
     """
 
-    def __init__(self, html_content: str):
-        self.soup = BeautifulSoup(html_content, "html.parser")
+    def __init__(self, html_content: Union[str, bytes], encoding: Optional[str] = None):
+        """
+        :param html_content: The page's HTML, as text or raw bytes.
+        :param encoding: The charset declared for raw bytes, e.g. by the response
+            headers. The bytes are decoded with it before parsing, instead of the
+            parser sniffing their encoding.
+        """
+        self.html_content = html_content
+        self.encoding = encoding
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._soup = None
+        self._next_data = None
+
+    @classmethod
+    def from_response(cls, response) -> "HtmlScraper":
+        """
+        A scraper for the body of a response, decoded with its declared charset.
+        """
+        headers = getattr(response, "headers", None)
+        return cls(response.content, encoding=declared_encoding(headers))
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        """
+        The parsed document, built on first access so that scrapers reading only
+        the embedded page state never pay for a full HTML parse.
+        """
+        if self._soup is None:
+            with REGISTRY.timer(
+                "scraper_parse_seconds", scraper=self.__class__.__name__
+            ):
+                markup = self.html_content
+                if self.encoding and isinstance(markup, bytes):
+                    markup = markup.decode(self.encoding, errors="replace")
+                self._soup = BeautifulSoup(markup, "html.parser")
+        return self._soup
+
+    @property
+    def next_data(self) -> Dict[str, Any]:
+        """
+        The embedded Next.js page state, or an empty dict if the page has none.
+        """
+        if self._next_data is None:
+            with REGISTRY.timer(
+                "scraper_next_data_seconds", scraper=self.__class__.__name__
+            ):
+                self._next_data = extract_next_data(self.html_content) or {}
+        return self._next_data
 
     @staticmethod
     def get_text_content(tag: Tag, name: str, **kwargs) -> Optional[str]:
@@ -0,0 +1,127 @@
+"""
+On-disk store of the session cookie, for warm starts.
+
+Refreshing the cookie takes a browser launch and two page loads, and a cookie
+stays valid well beyond a short run. The store keeps the last cookie along with
+the time it was captured, and the lifetimes observed for earlier cookies (from
+capture until a request under them was blocked), so the next process can reuse
+it while it is expected to still be valid.
+
+Typical usage example:
+>>> fetcher = ColesPageFetcher(cookie_store=CookieStore())
+"""
+
+import json
+import logging
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CookieStore:
+    """
+    On-disk store of the last captured cookie and of observed cookie lifetimes.
+    """
+
+    DEFAULT_PATH = os.path.join("data", "raw", "session-cookie.json")
+    # Assumed lifetime of a cookie until one has been seen expiring.
+    DEFAULT_LIFETIME_SECONDS = 30 * 60
+    # Number of observed lifetimes kept.
+    MAX_LIFETIMES = 20
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        default_lifetime_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        :param path: Location of the store file. Defaults to `data/raw/session-cookie.json`.
+        :param default_lifetime_seconds: How long a cookie is expected to stay valid
+            until a lifetime has been observed. Defaults to 30 minutes.
+        :param clock: Function returning the current epoch time (can be overridden in tests).
+        """
+        self.path = path or self.DEFAULT_PATH
+        self.default_lifetime_seconds = (
+            self.DEFAULT_LIFETIME_SECONDS
+            if default_lifetime_seconds is None
+            else default_lifetime_seconds
+        )
+        self.clock = clock
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as src:
+                payload = json.load(src)
+        except (OSError, ValueError):
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def _write(self, payload: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The cookie is a credential: write it readable by the owner only, and
+        # atomically, since concurrent runs may share the store.
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as dst:
+            json.dump(payload, dst)
+        os.replace(tmp_path, self.path)
+
+    def expected_lifetime(self) -> float:
+        """
+        How long a cookie is expected to stay valid after its capture: the median
+        of the observed lifetimes, or the default lifetime if none were observed.
+        """
+        lifetimes = self._read().get("lifetimes") or []
+        if not lifetimes:
+            return self.default_lifetime_seconds
+        return statistics.median(lifetimes)
+
+    def load(self) -> Optional[str]:
+        """
+        Loads the stored cookie.
+
+        :return: The cookie, or None if missing, unreadable, expired or older than
+            its expected lifetime.
+        """
+        payload = self._read()
+        cookie = payload.get("cookie")
+        captured_at = payload.get("captured_at")
+        if not cookie or not isinstance(captured_at, (int, float)):
+            return None
+
+        age = self.clock() - captured_at
+        if age > self.expected_lifetime():
+            logger.info("Stored cookie is stale (captured %.0f s ago)", age)
+            return None
+        return cookie
+
+    def save(self, cookie: str) -> None:
+        """
+        Saves a freshly captured cookie along with the time it was captured.
+        """
+        payload = self._read()
+        payload.update(cookie=cookie, captured_at=self.clock())
+        self._write(payload)
+        logger.info("Saved cookie to %s", self.path)
+
+    def expire(self, cookie: str) -> None:
+        """
+        Records that `cookie` is no longer valid, and its lifetime since capture.
+
+        Does nothing unless `cookie` is the stored one, e.g. when it was passed to
+        the fetcher rather than captured.
+        """
+        payload = self._read()
+        if not cookie or payload.get("cookie") != cookie:
+            return
+        lifetime = self.clock() - payload.get("captured_at", 0)
+        lifetimes = (payload.get("lifetimes") or []) + [lifetime]
+        payload.update(cookie=None, lifetimes=lifetimes[-self.MAX_LIFETIMES :])
+        self._write(payload)
+        logger.info("Cookie expired after %.0f s", lifetime)
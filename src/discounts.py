@@ -0,0 +1,132 @@
+"""
+Discount post-processing.
+
+Turns product tiles from the specials (or catalogue) pages into discount rows in the
+`scrape_products` format. Prices are read from the tiles' typed integer-cent fields,
+so tiles that are not discounted (no "Was" price, or not below it) are dropped
+before the frame is built. The pricing details are only parsed for the date of the
+"Was" price.
+
+Typical usage example:
+>>> df = process_discount_tiles(tiles, CATEGORY_LOOKUP, ["pantry", "frozen"])
+"""
+
+import logging
+from operator import attrgetter
+from typing import Iterable, List, Optional
+
+import pandas as pd
+
+from src.category_lookup import CategoryLookup
+from src.endpoints import COLES_ORIGIN
+from src.models import ProductTile
+from src.prices import unit_label
+
+logger = logging.getLogger(__name__)
+
+# Output columns, in the `scrape_products` order.
+DISCOUNT_COLUMNS = [
+    "product_id",
+    "product_name",
+    "category",
+    "size",
+    "display_price",
+    "current_price_aud",
+    "unit_price_aud",
+    "unit_of_measure",
+    "previous_price_aud",
+    "pricing_details",
+    "previous_price_date",
+    "product_url",
+    "product_image_url",
+]
+
+# Tile fields read, and the output columns they become.
+TILE_COLUMNS = {
+    "name": "product_name",
+    "url": "product_url",
+    "price": "display_price",
+    "price_calc_method": "pricing_details",
+    "image_url": "product_image_url",
+}
+
+# Typed tile fields read, and the output columns they become.
+TYPED_COLUMNS = {
+    "price_cents": "current_price_aud",
+    "unit_price_cents": "unit_price_aud",
+    "was_price_cents": "previous_price_aud",
+    "unit_quantity": "unit_quantity",
+    "unit": "unit",
+}
+
+# Pricing details look like "$1.34 per 100gWas $2.70 on Sep 2024".
+PREVIOUS_PRICE_DATE_PATTERN = r"Was \$[\d,]+\.\d+ on (\w{3} \d{4})"
+
+
+def is_discounted(tile: ProductTile) -> bool:
+    """
+    Whether a tile's current price is below its "Was" price.
+    """
+    return (
+        tile.price_cents is not None
+        and tile.was_price_cents is not None
+        and tile.price_cents < tile.was_price_cents
+    )
+
+
+def tiles_to_frame(tiles: Iterable[ProductTile]) -> pd.DataFrame:
+    """
+    Builds a frame of the tile fields read by discount processing, column-wise from
+    the attributes rather than converting each tile to a dict.
+    """
+    fields = {**TILE_COLUMNS, **TYPED_COLUMNS}
+    return pd.DataFrame.from_records(
+        map(attrgetter(*fields), tiles), columns=list(fields)
+    ).rename(columns=fields)
+
+
+def process_discount_tiles(
+    tiles: List[ProductTile],
+    category_lookup: Optional[CategoryLookup] = None,
+    food_categories: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    Processes tiles into discount rows: products whose current price is below their
+    "Was" price, in a food category, one row per product.
+
+    :param category_lookup: Product → category lookup. If missing or empty, every
+        row gets the category "discount" and no category filter is applied.
+    :param food_categories: Categories to keep.
+    :return: DataFrame with `DISCOUNT_COLUMNS`.
+    """
+    df = tiles_to_frame(tile for tile in tiles if is_discounted(tile))
+    if df.empty:
+        return pd.DataFrame(columns=DISCOUNT_COLUMNS)
+
+    for column in ("current_price_aud", "unit_price_aud", "previous_price_aud"):
+        df[column] = df[column].astype(float) / 100
+
+    df["product_url"] = COLES_ORIGIN + df["product_url"]
+    df["product_image_url"] = COLES_ORIGIN + df["product_image_url"]
+    df["product_id"] = df["product_url"].str.extract(r"product\/(.+)\-\d+$")[0]
+
+    if category_lookup:
+        df["category"] = category_lookup.map(df["product_id"])
+        df = df[df["category"].isin(food_categories or [])].copy()
+    else:
+        logger.warning(
+            "Product to category mapping is empty. Cannot filter for food products."
+        )
+        df["category"] = "discount"
+
+    df["size"] = df["product_name"].str.extract(r"\| (.+)$")[0]
+    df["unit_of_measure"] = [
+        unit_label(quantity, unit)
+        for quantity, unit in zip(df["unit_quantity"], df["unit"])
+    ]
+    df["previous_price_date"] = df["pricing_details"].str.extract(
+        PREVIOUS_PRICE_DATE_PATTERN
+    )[0]
+
+    df.drop_duplicates(subset=["product_id"], keep="first", inplace=True)
+    return df[DISCOUNT_COLUMNS]
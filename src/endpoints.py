@@ -0,0 +1,188 @@
+"""
+Endpoints and request routing for the Coles website.
+
+Every Coles URL the crawlers request is built here from a configured origin, and each
+class of request (browse, specials, product pages, cookie refresh, ...) can be routed
+to its own origin, e.g. a caching proxy for static pages or the local stand-in server.
+
+URLs written to the datasets always use the public Coles origin, wherever the
+request was routed.
+
+Typical usage example:
+>>> router = EndpointRouter(routes={RequestClass.PRODUCT: "http://cache.internal:8080"})
+>>> router.browse_url("pantry", page=2)
+'https://www.coles.com.au/browse/pantry?page=2'
+>>> router.route("https://www.coles.com.au/product/appy-fizz-250ml-8060378")
+'http://cache.internal:8080/product/appy-fizz-250ml-8060378'
+>>> router.data_url("20241022.02_v4.26.0", "https://www.coles.com.au/browse/pantry?page=2")
+'https://www.coles.com.au/_next/data/20241022.02_v4.26.0/browse/pantry.json?page=2'
+"""
+
+import logging
+import os
+import re
+from enum import Enum
+from typing import Dict, Mapping, Optional
+from urllib.parse import urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+COLES_ORIGIN = "https://www.coles.com.au"
+COLES_HOST = urlparse(COLES_ORIGIN).netloc
+
+# Environment variables read by `EndpointRouter.from_env`.
+BASE_URL_ENV = "COLES_BASE_URL"
+ROUTE_ENV_TEMPLATE = "COLES_{request_class}_ORIGIN"
+
+
+class RequestClass(Enum):
+    BROWSE = "browse"
+    SPECIALS = "specials"
+    PRODUCT = "product"
+    RECIPES = "recipes"
+    COOKIE_REFRESH = "cookie_refresh"
+    OTHER = "other"
+
+
+# Path prefixes identifying each request class, checked in order.
+PATH_PREFIXES = (
+    ("/browse", RequestClass.BROWSE),
+    ("/on-special", RequestClass.SPECIALS),
+    ("/product", RequestClass.PRODUCT),
+    ("/recipes-inspiration", RequestClass.RECIPES),
+)
+
+
+# Next.js data routes, `/_next/data/<buildId>/<page path>.json`, serving a page's props.
+DATA_ROUTE_PATTERN = re.compile(r"^/_next/data/[^/]+(?P<path>/.*?)(?:\.json)?$")
+
+
+def page_path(url: str) -> str:
+    """
+    The path of the page a URL (or path) requests, reading through data routes.
+    """
+    path = urlparse(url).path
+    match = DATA_ROUTE_PATTERN.match(path)
+    return match.group("path") if match else path
+
+
+def public_url(path: str) -> str:
+    """
+    The public Coles URL for a path, as stored in the datasets.
+    """
+    return COLES_ORIGIN + path
+
+
+class EndpointRouter:
+    """
+    Builds Coles URLs and routes each class of request to its configured origin.
+    """
+
+    def __init__(
+        self,
+        origin: str = COLES_ORIGIN,
+        routes: Optional[Mapping[RequestClass, str]] = None,
+    ):
+        """
+        :param origin: Origin used for every request class without its own route.
+        :param routes: Origins for specific request classes.
+        """
+        self.origin = origin.rstrip("/")
+        self.routes: Dict[RequestClass, str] = {
+            request_class: route.rstrip("/")
+            for request_class, route in (routes or {}).items()
+        }
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "EndpointRouter":
+        """
+        Configures a router from COLES_BASE_URL and per-class overrides such as
+        COLES_PRODUCT_ORIGIN or COLES_COOKIE_REFRESH_ORIGIN.
+        """
+        routes = {}
+        for request_class in RequestClass:
+            name = ROUTE_ENV_TEMPLATE.format(request_class=request_class.name)
+            if environ.get(name):
+                routes[request_class] = environ[name]
+        return cls(origin=environ.get(BASE_URL_ENV) or COLES_ORIGIN, routes=routes)
+
+    @staticmethod
+    def classify(url: str) -> RequestClass:
+        """
+        Determines the request class of a URL (or path) from its path. Data routes
+        are classed as the page they serve.
+        """
+        path = page_path(url)
+        for prefix, request_class in PATH_PREFIXES:
+            if path.startswith(prefix):
+                return request_class
+        return RequestClass.OTHER
+
+    def origin_for(self, request_class: RequestClass) -> str:
+        """
+        The origin requests of this class are sent to.
+        """
+        return self.routes.get(request_class, self.origin)
+
+    def url(
+        self, path: str, request_class: Optional[RequestClass] = None, **query
+    ) -> str:
+        """
+        Builds the URL of a path on the origin routed for its request class.
+
+        :param request_class: Defaults to the class inferred from the path.
+        :param query: Query parameters, in order; None values are left out.
+        """
+        request_class = request_class or self.classify(path)
+        url = self.origin_for(request_class) + path
+        params = {key: value for key, value in query.items() if value is not None}
+        if params:
+            url += "?" + urlencode(params)
+        return url
+
+    def route(self, url: str, request_class: Optional[RequestClass] = None) -> str:
+        """
+        Rewrites the origin of a Coles URL to the one routed for its request class,
+        keeping its path and query. URLs on other hosts are returned unchanged.
+        """
+        parsed = urlparse(url)
+        if parsed.netloc != COLES_HOST:
+            return url
+        request_class = request_class or self.classify(url)
+        origin = urlparse(self.origin_for(request_class))
+        return urlunparse(parsed._replace(scheme=origin.scheme, netloc=origin.netloc))
+
+    def browse_url(self, *path: str, page: Optional[int] = None) -> str:
+        """
+        URL of the browse page for a category path, e.g. ("pantry", "snacks").
+        """
+        return self.url("/".join(("/browse",) + path), page=page)
+
+    def specials_url(self, **query) -> str:
+        """
+        URL of the specials listing with the given query parameters.
+        """
+        return self.url("/on-special", **query)
+
+    def product_url(self, slug: str) -> str:
+        """
+        URL of a product page, e.g. "appy-fizz-250ml-8060378".
+        """
+        return self.url(f"/product/{slug}")
+
+    def data_url(self, build_id: str, url: str) -> str:
+        """
+        URL of the Next.js data route serving the props of the page at `url`.
+
+        :param build_id: The site's current Next.js build ID.
+        :param url: A page URL (public or routed) or path, with its query.
+        """
+        parsed = urlparse(url)
+        path = f"/_next/data/{build_id}{parsed.path.rstrip('/')}.json"
+        request_class = self.classify(parsed.path)
+        url = self.origin_for(request_class) + path
+        return f"{url}?{parsed.query}" if parsed.query else url
+
+
+# Process-wide router used by the fetcher, query builders and scripts by default.
+ROUTER = EndpointRouter.from_env()
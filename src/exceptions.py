@@ -0,0 +1,15 @@
+"""
+Exceptions raised by the Coles scrapers and fetchers.
+"""
+
+
+class BotDetectedError(ValueError):
+    """
+    Raised when a response is the bot detection page instead of the requested content.
+    """
+
+
+class BuildIdNotFoundError(ValueError):
+    """
+    Raised when the page fetched to discover the Next.js buildId has no page state.
+    """
@@ -1,34 +1,108 @@
 import logging
 import random
+import threading
 import time
+from concurrent.futures import Future
+from enum import Enum
 from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
 
 import requests
-import selenium.webdriver.support.expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 
-from src.webdriver_utils import init_seleniumwire_webdriver
+from src.archive import PageArchive
+from src.cookies import CookieStore
+from src.endpoints import ROUTER, EndpointRouter, RequestClass
+from src.exceptions import BotDetectedError
+from src.httptiming import (
+    TimingHTTPAdapter,
+    record_fetch_timings,
+    reset_connection_timings,
+)
+from src.metrics import REGISTRY, MetricsRegistry
+from src.ratelimit import AdaptiveRateLimiter
+from src.retry import FailureKind, RetryPolicy, Strategy
 
 logger = logging.getLogger(__name__)
 
+# Bytes read per chunk when streaming a body.
+CHUNK_SIZE = 64 * 1024
+# The embedded Next.js page state, `<script id="__NEXT_DATA__" ...>...</script>`.
+PAGE_STATE_START = b'id="__NEXT_DATA__"'
+PAGE_STATE_END = b"</script>"
+# A body cut short after its page state is still read to the end (and discarded)
+# when at most this many bytes remain, so its connection can be reused.
+DRAIN_LIMIT = 64 * 1024
+# Markers of the bot detection page served instead of the requested one.
+BOT_DETECTION_MARKERS = (b"Incapsula", b"Pardon Our Interruption")
+# Bytes read when checking that a stored cookie is still accepted. The bot
+# detection page is shorter than this; a real page doesn't mention it this early.
+VALIDATION_BYTES = 16 * 1024
+
+
+def _init_seleniumwire_webdriver(*args):
+    # Selenium and the browser drivers are only needed to refresh the cookie, so they
+    # are imported then rather than with the fetcher.
+    from src.webdriver_utils import init_seleniumwire_webdriver
+
+    return init_seleniumwire_webdriver(*args)
+
+
+def browser_driver_factory(headless: bool = False) -> Callable:
+    """
+    Driver factory for the browser cookie backend: a plain Chrome, without
+    seleniumwire's proxy.
+
+    :param headless: Run Chrome without a window.
+    """
+
+    def init_driver():
+        from src.webdriver_utils import initialize_driver
+
+        return initialize_driver(headless=headless)
+
+    return init_driver
+
+
+class CookieBackend(Enum):
+    """
+    How a cookie refresh captures the cookie from the browser.
+    """
+
+    # Intercept the cookie header of the browser's requests through seleniumwire's
+    # proxy.
+    SELENIUMWIRE = "seleniumwire"
+    # Read the browser's cookie jar through the DevTools protocol.
+    BROWSER = "browser"
+
 
 class ColesPageFetcher:
     """
     Class to manage requests to Coles website.
+
+    A fetcher can be shared by the threads of a crawl: a block hit by several
+    threads at once triggers a single cookie refresh that the others wait for,
+    concurrent GETs of the same URL send a single request, and the session's
+    headers are swapped rather than mutated when the cookie changes.
     """
 
-    DEFAULT_DRIVER_FACTORY = init_seleniumwire_webdriver
+    DEFAULT_DRIVER_FACTORY = staticmethod(_init_seleniumwire_webdriver)
+    # The browser backend waits for cookies named with each of these prefixes:
+    # the Incapsula session cookie, set with the first response, and the one set
+    # by its bot detection script once the page has run it.
+    SESSION_COOKIE_PREFIXES = ("incap_ses_", "reese84")
+    # How long the browser backend waits for them, and how often it checks.
+    COOKIE_WAIT_SECONDS = 30
+    COOKIE_POLL_SECONDS = 0.25
     DEFAULT_HEADERS = {
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
         "AppleWebKit/537.36 (KHTML, like Gecko) "
         "Chrome/129.0.0.0 Safari/537.36 Edg/129.0.0.0",
     }
-    DEFAULT_REFRESH_URLS = [
-        "https://www.coles.com.au/browse/fruit-vegetables",
-        "https://www.coles.com.au/browse/frozen",
-        "https://www.coles.com.au/browse/dairy-eggs-fridge",
-        "https://www.coles.com.au/browse/household",
+    DEFAULT_REFRESH_PATHS = [
+        "/browse/fruit-vegetables",
+        "/browse/frozen",
+        "/browse/dairy-eggs-fridge",
+        "/browse/household",
     ]
 
     def __init__(
@@ -38,66 +112,354 @@ class ColesPageFetcher:
         headers: Optional[Dict] = None,
         refresh_urls: List[str] = None,
         sleep_func=time.sleep,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        base_url: Optional[str] = None,
+        router: Optional[EndpointRouter] = None,
+        archive: Optional[PageArchive] = None,
+        stop_after_page_state: bool = False,
+        coalesce_requests: bool = True,
+        cookie_store: Optional[CookieStore] = None,
+        cookie_backend: CookieBackend = CookieBackend.SELENIUMWIRE,
     ):
         """
-        :param driver_factory: Callable to create a Selenium (seleniumwire) driver.
-        :param session: An optional requests.Session instance.
+        :param driver_factory: Callable to create a Selenium driver: a seleniumwire one
+            for the seleniumwire cookie backend. Defaults to the backend's driver.
+        :param session: An optional requests.Session instance. Its adapters are kept;
+            mount a `TimingHTTPAdapter` on it to record DNS, connect and TLS timings,
+            as the fetcher does on the session it creates by default.
         :param headers: Optional headers dict; if not provided, defaults are used.
-        :param refresh_urls: A list of URLs to use for cookie refresh. Defaults to a predefined list.
+        :param refresh_urls: A list of URLs to use for cookie refresh. Defaults to a predefined
+            list of browse pages.
         :param sleep_func: Function to use for sleeping. Defaults to time.sleep (can be overridden in tests).
+        :param rate_limiter: Per-host rate limiter applied to every request. Defaults to an
+            AdaptiveRateLimiter sleeping with `sleep_func`.
+        :param retry_policy: Decides how each kind of failure is retried. Defaults to
+            RetryPolicy with an unlimited budget.
+        :param metrics: Registry receiving fetch latencies and cookie refresh counts.
+            Defaults to the process-wide registry.
+        :param base_url: Origin (e.g. "http://127.0.0.1:8000") replacing the origin of every
+            requested and refresh URL, to target a mirror or the local stand-in server.
+            Shorthand for `router=EndpointRouter(origin=base_url)`.
+        :param router: Routes each request to the origin of its request class. Defaults to
+            the process-wide router configured from the environment.
+        :param archive: Archive receiving every page fetched successfully, so it can be
+            re-parsed later. Pages are not archived by default.
+        :param stop_after_page_state: Stop reading HTML bodies once their embedded
+            page state (the `__NEXT_DATA__` script) has been received. The product
+            tiles, JSON-LD and product details all come before it, so the scrapers
+            get everything they read while the rest of the page is never buffered.
+            Bodies without page state are read in full, and so are all bodies
+            when an archive is attached, so that archived pages are complete.
+        :param coalesce_requests: Share the response of an in-flight GET with every
+            caller requesting the same URL meanwhile, instead of sending it again.
+        :param cookie_store: Store the refreshed cookies are saved to. When no cookie
+            is passed in `headers`, the stored one is reused if it is younger than its
+            expected lifetime and still accepted, instead of refreshing it in a browser.
+        :param cookie_backend: How refreshes capture the cookie. The browser backend
+            needs no proxy and returns as soon as the session cookies are set.
         """
-        self.driver_factory = driver_factory or self.DEFAULT_DRIVER_FACTORY
-        self.session = session or requests.Session()
+        self.cookie_backend = CookieBackend(cookie_backend)
+        if driver_factory is None:
+            driver_factory = (
+                browser_driver_factory()
+                if self.cookie_backend is CookieBackend.BROWSER
+                else self.DEFAULT_DRIVER_FACTORY
+            )
+        self.driver_factory = driver_factory
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", TimingHTTPAdapter())
+            session.mount("https://", TimingHTTPAdapter())
+        self.session = session
         self.session.headers = (
             headers.copy() if headers else self.DEFAULT_HEADERS.copy()
         )
-        self.refresh_urls = refresh_urls or self.DEFAULT_REFRESH_URLS
-        self.refresh_url = random.choice(self.refresh_urls)
+        self.router = router or (
+            EndpointRouter(origin=base_url) if base_url else ROUTER
+        )
+        self.refresh_urls = refresh_urls or [
+            self.router.url(path, RequestClass.COOKIE_REFRESH)
+            for path in self.DEFAULT_REFRESH_PATHS
+        ]
+        self.refresh_url = self.router.route(
+            random.choice(self.refresh_urls), RequestClass.COOKIE_REFRESH
+        )
         self.sleep_func = sleep_func
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(sleep_func=sleep_func)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = metrics or REGISTRY
+        self.archive = archive
+        self.stop_after_page_state = stop_after_page_state
+        self.coalesce_requests = coalesce_requests
+        self.cookie_store = cookie_store
 
-        if not self.session.headers.get("cookie"):
+        # Cookie refreshes run one at a time; each one bumps the generation, so a
+        # thread blocked under an older cookie knows another thread refreshed it.
+        self._refresh_lock = threading.RLock()
+        self._refresh_generation = 0
+        self._intercepted_cookie: Optional[str] = None
+        # In-flight GETs by URL, for coalescing.
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+        if not self.session.headers.get("cookie") and not self._restore_cookie():
             self.refresh_cookie()
 
+    def resolve_url(self, url: str) -> str:
+        """
+        Rewrites a URL's origin to the one routed for its request class.
+        """
+        return self.router.route(url)
+
     def get(self, url: str) -> requests.Response:
         """
-        Performs a GET request. On error (network or bot detection), refreshes the cookie and retries.
+        Performs a GET request, retrying failures as the retry policy decides.
+
+        Network errors are retried immediately, 5xx and 429 responses after a jittered
+        backoff (honouring Retry-After), and only bot detection refreshes the cookie.
+
+        While a GET of the same URL is in flight on another thread, waits for it and
+        returns (or raises) its outcome instead.
         """
+        url = self.resolve_url(url)
+        if not self.coalesce_requests:
+            return self._get_with_retries(url)
+
+        with self._in_flight_lock:
+            future = self._in_flight.get(url)
+            leader = future is None
+            if leader:
+                future = self._in_flight[url] = Future()
+        if not leader:
+            self.metrics.increment("fetch_coalesced_total")
+            return future.result()
+
         try:
-            response = self._get(url)
-        except (requests.RequestException, ValueError) as e:
-            logger.error("Error retrieving page with URL '%s': %s", url, e)
-            self.refresh_cookie()
-            response = self._get(url)
+            response = self._get_with_retries(url)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[url]
 
-        return response
+    def _get_with_retries(self, url: str) -> requests.Response:
+        # Failed attempts per kind: each kind's rule caps its own retries, so a
+        # network error doesn't use up the cookie refresh of a later block.
+        attempts: Dict[FailureKind, int] = {}
+        while True:
+            generation = self._refresh_generation
+            try:
+                return self._get(url)
+            except (requests.RequestException, ValueError) as e:
+                kind = self.retry_policy.classify(e)
+                attempt = attempts[kind] = attempts.get(kind, 0) + 1
+                decision = self.retry_policy.decide(e, attempt)
+                if decision is None:
+                    logger.error("Error retrieving page with URL '%s': %s", url, e)
+                    raise
+                self.metrics.increment("fetch_retries_total", kind=decision.kind.value)
+                logger.warning(
+                    "Retrying URL '%s' after %s failure (attempt %d): %s",
+                    url,
+                    decision.kind.value,
+                    attempt,
+                    e,
+                )
+
+            if decision.strategy is Strategy.REFRESH_COOKIE:
+                self._refresh_stale_cookie(generation)
+            elif decision.delay > 0:
+                self.sleep_func(decision.delay)
 
     def _get(self, url: str) -> requests.Response:
         """
-        Internal GET request method that raises a ValueError if bot detection content is found.
+        Internal GET request method that raises a BotDetectedError (a ValueError) if bot
+        detection content is found.
+
+        Requests are paced by the rate limiter, which speeds up on clean responses and
+        backs off on 429/5xx responses or bot detection.
         """
-        response = self.session.get(url=url)
+        host = urlparse(url).netloc
+        self.rate_limiter.acquire(host)
+
+        reset_connection_timings()
+        with self.metrics.timer("fetch_seconds", host=host):
+            response = self.session.get(url=url, stream=True)
+            body_start = time.perf_counter()
+            if self._stops_after_page_state() and response.status_code < 400:
+                content = read_until_page_state(response)
+            else:
+                content = response.content
+        record_fetch_timings(
+            self.metrics, response, time.perf_counter() - body_start, host
+        )
+        self.metrics.increment(
+            "fetch_responses_total", host=host, status=response.status_code
+        )
+        self.metrics.observe("fetch_body_bytes", len(content), host=host)
+        if getattr(response, "truncated", False):
+            self.metrics.increment("fetch_bodies_truncated_total", host=host)
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self.rate_limiter.record_throttle(host)
         response.raise_for_status()
 
-        if ("Incapsula" in str(response.content)) or (
-            "Pardon Our Interruption" in str(response.content)
-        ):
+        with self.metrics.timer("bot_check_seconds"):
+            blocked = is_bot_detection_page(content)
+        if blocked:
+            self.metrics.increment("bot_blocks_total", host=host)
             logger.warning("Request blocked by bot detection measures.")
-            raise ValueError("Bot detected!")
+            self.rate_limiter.record_throttle(
+                host, factor=AdaptiveRateLimiter.BLOCK_FACTOR
+            )
+            raise BotDetectedError("Bot detected!")
 
+        self.rate_limiter.record_success(host)
+        if self.archive is not None:
+            with self.metrics.timer("archive_write_seconds"):
+                self.archive.put(
+                    url, content, headers=response.headers, status=response.status_code
+                )
         return response
 
+    def _stops_after_page_state(self) -> bool:
+        # Archived pages are re-parsed later, possibly for more than the scrapers
+        # read today, so they are kept whole.
+        return self.stop_after_page_state and self.archive is None
+
     def refresh_cookie(self):
         """
         Refreshes current request session's cookie.
 
-        This method opens a browser, and performs two consecutive visits to a predefined
-        Coles webpage. 1. The first visit triggers the initial creation of the cookie.
-        2. The second visit allows interception of a valid cookie from network requests.
+        This method opens a browser on a predefined Coles webpage. With the seleniumwire
+        backend it performs two consecutive visits: 1. The first visit triggers the
+        initial creation of the cookie. 2. The second visit allows interception of a
+        valid cookie from network requests. With the browser backend a single visit
+        is made, and the cookie is read from the browser once its session cookies
+        are set.
 
         The intercepted cookie is then stored in the session's headers. This ensures
         that subsequent HTTP requests are properly authenticated.
+
+        Refreshes are serialised: a call made during another thread's refresh waits
+        for it to finish first.
+        """
+        with self._refresh_lock:
+            logger.info("Refreshing cookie using refresh_url: %s", self.refresh_url)
+            self.metrics.increment("cookie_refreshes_total")
+            self._intercepted_cookie = None
+            with self.metrics.timer(
+                "cookie_refresh_seconds", backend=self.cookie_backend.value
+            ):
+                if self.cookie_backend is CookieBackend.BROWSER:
+                    self._read_browser_cookie()
+                else:
+                    self._refresh_cookie()
+            if self._intercepted_cookie:
+                self.set_cookie(self._intercepted_cookie)
+                if self.cookie_store is not None:
+                    self.cookie_store.save(self._intercepted_cookie)
+
+    def _restore_cookie(self) -> bool:
+        """
+        Sets the cookie from the cookie store if it holds one that is still valid.
+
+        :return: Whether a cookie was restored.
+        """
+        if self.cookie_store is None:
+            return False
+        cookie = self.cookie_store.load()
+        if not cookie:
+            return False
+        valid = self.validate_cookie(cookie)
+        if valid is None:
+            # Nothing was learnt about the cookie, so no lifetime is recorded; the
+            # cookie is refreshed rather than started on unchecked.
+            return False
+        if not valid:
+            self.cookie_store.expire(cookie)
+            return False
+        logger.info("Restored stored cookie")
+        self.metrics.increment("cookie_restores_total")
+        self.set_cookie(cookie)
+        return True
+
+    def validate_cookie(self, cookie: str) -> Optional[bool]:
+        """
+        Checks that `cookie` is still accepted, reading only the first
+        `VALIDATION_BYTES` of the refresh page requested with it.
+
+        :return: Whether the cookie is accepted, or None if the check failed for
+            another reason (a network error or an error status).
+        """
+        host = urlparse(self.refresh_url).netloc
+        self.rate_limiter.acquire(host)
+        head = bytearray()
+        try:
+            with self.metrics.timer("cookie_validation_seconds"):
+                response = self.session.get(
+                    self.refresh_url, headers={"cookie": cookie}, stream=True
+                )
+                try:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        head += chunk
+                        if len(head) >= VALIDATION_BYTES:
+                            break
+                finally:
+                    response.close()
+        except requests.RequestException as e:
+            logger.warning("Error validating stored cookie: %s", e)
+            self.metrics.increment("cookie_validations_total", outcome="error")
+            return None
+
+        valid = not is_bot_detection_page(head)
+        self.metrics.increment(
+            "cookie_validations_total", outcome="valid" if valid else "blocked"
+        )
+        return valid
+
+    def _refresh_stale_cookie(self, generation: int) -> None:
+        """
+        Refreshes the cookie after a block, unless another thread refreshed it since
+        the blocked request was sent (`generation`), in which case the request is
+        simply retried with the new cookie.
+        """
+        with self._refresh_lock:
+            if self._refresh_generation != generation:
+                self.metrics.increment("cookie_refreshes_coalesced_total")
+                return
+            if self.cookie_store is not None:
+                self.cookie_store.expire(self.session.headers.get("cookie"))
+            try:
+                self.refresh_cookie()
+            finally:
+                # Even a failed refresh counts, so that the threads waiting on it
+                # don't each launch a browser of their own.
+                self._refresh_generation += 1
+
+    def set_cookie(self, cookie: str) -> None:
+        """
+        Sets the cookie sent with every request.
+
+        The session's headers are replaced rather than mutated, so a request being
+        prepared on another thread sees either the old headers or the new ones.
         """
-        logger.info("Refreshing cookie using refresh_url: %s", self.refresh_url)
+        headers = self.session.headers.copy()
+        headers["cookie"] = cookie
+        self.session.headers = headers
+
+    def _refresh_cookie(self):
+        import selenium.webdriver.support.expected_conditions as EC
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+
         driver = self.driver_factory()
         driver.request_interceptor = self.intercept_cookie
 
@@ -119,9 +481,141 @@ class ColesPageFetcher:
         finally:
             driver.quit()
 
+    def _read_browser_cookie(self):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self.driver_factory()
+        try:
+            driver.get(self.refresh_url)
+            try:
+                cookies = WebDriverWait(
+                    driver,
+                    self.COOKIE_WAIT_SECONDS,
+                    poll_frequency=self.COOKIE_POLL_SECONDS,
+                ).until(self._session_cookies)
+            except TimeoutException:
+                cookies = self.browser_cookies(driver)
+                logger.warning(
+                    "Session cookies not set after %d s, using: %s",
+                    self.COOKIE_WAIT_SECONDS,
+                    ", ".join(cookie["name"] for cookie in cookies) or "none",
+                )
+        except Exception as e:
+            logger.warning(f"Error while refreshing cookie: {e}")
+            return
+        finally:
+            driver.quit()
+
+        if cookies:
+            self._intercepted_cookie = "; ".join(
+                f"{cookie['name']}={cookie['value']}" for cookie in cookies
+            )
+            logger.info("Read cookie: %s", self._intercepted_cookie)
+
+    def _session_cookies(self, driver) -> Optional[List[Dict]]:
+        # Condition for WebDriverWait: the cookies, once each session cookie is set.
+        cookies = self.browser_cookies(driver)
+        names = [cookie["name"] for cookie in cookies]
+        for prefix in self.SESSION_COOKIE_PREFIXES:
+            if not any(name.startswith(prefix) for name in names):
+                return None
+        return cookies
+
+    def browser_cookies(self, driver) -> List[Dict]:
+        """
+        The cookies the browser sends with requests to the refresh URL.
+
+        Read through the DevTools protocol, which includes HttpOnly cookies and
+        filters them by domain, path and scheme as the browser would. Drivers
+        without it fall back to the cookies of the current page.
+        """
+        if hasattr(driver, "execute_cdp_cmd"):
+            result = driver.execute_cdp_cmd(
+                "Network.getCookies", {"urls": [self.refresh_url]}
+            )
+            return result.get("cookies", [])
+        return driver.get_cookies()
+
     def intercept_cookie(self, request):
+        # Called on seleniumwire's proxy thread, so the cookie is only recorded here
+        # and set by `refresh_cookie` once the browser is done.
         if request.url.startswith(self.refresh_url):
             cookie_value = request.headers.get("cookie")
             if cookie_value:
                 logger.info("Intercepted cookie: %s", cookie_value)
-                self.session.headers["cookie"] = cookie_value
+                self._intercepted_cookie = cookie_value
+
+
+def is_bot_detection_page(content: bytes) -> bool:
+    """
+    Whether `content` is the bot detection page rather than the requested one.
+    """
+    return any(marker in content for marker in BOT_DETECTION_MARKERS)
+
+
+def read_until_page_state(
+    response: requests.Response,
+    chunk_size: int = CHUNK_SIZE,
+    drain_limit: int = DRAIN_LIMIT,
+) -> bytes:
+    """
+    Reads a streamed body in chunks until the end of its embedded page state.
+
+    The rest of the body is read and discarded if at most `drain_limit` bytes of it
+    remain, so the connection returns to the pool; otherwise the connection is
+    closed. The response's `content` is set to the bytes read, and its `truncated`
+    attribute tells whether any were left out.
+
+    :return: The body up to and including the page state's closing tag.
+    """
+    # Matches may straddle chunks, so each search starts a marker's length back.
+    overlap = max(len(PAGE_STATE_START), len(PAGE_STATE_END)) - 1
+    buffer = bytearray()
+    state_start = -1
+    truncated = False
+    for chunk in response.iter_content(chunk_size):
+        searched = max(len(buffer) - overlap, 0)
+        buffer += chunk
+        if state_start < 0:
+            state_start = buffer.find(PAGE_STATE_START, searched)
+            if state_start < 0:
+                continue
+        state_end = buffer.find(PAGE_STATE_END, max(searched, state_start))
+        if state_end >= 0:
+            end = state_end + len(PAGE_STATE_END)
+            dropped = _drain(response, drain_limit)
+            truncated = end < len(buffer) or dropped != 0
+            del buffer[end:]
+            if dropped is None:
+                # Unread bytes would be left on the connection; drop it instead of
+                # returning it to the pool.
+                response.raw.close()
+            break
+
+    content = bytes(buffer)
+    response._content = content
+    response._content_consumed = True
+    response.truncated = truncated
+    response.close()
+    return content
+
+
+def _drain(response: requests.Response, limit: int) -> Optional[int]:
+    """
+    Reads the rest of a body, giving up once more than `limit` bytes are left (as
+    shown by its Content-Length) or have been read.
+
+    :return: The number of bytes read and discarded, or None if the rest was left
+        unread.
+    """
+    length = response.headers.get("Content-Length", "")
+    tell = getattr(response.raw, "tell", None)
+    if length.isdigit() and tell is not None and int(length) - tell() > limit:
+        return None
+    dropped = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        dropped += len(chunk)
+        if dropped > limit:
+            return None
+    return dropped
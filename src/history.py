@@ -0,0 +1,260 @@
+"""
+Price history store.
+
+Keeps every observed price in a SQLite database indexed by (product_id, timestamp),
+built from the raw snapshots and the archive of replaced rows, so history questions
+are answered with index lookups instead of scanning `products_dropped.csv`.
+
+Typical usage example:
+>>> history = PriceHistory()
+>>> history.ingest_csv("data/archive/products_dropped.csv")
+>>> history.product_history("coles-full-cream-milk-2l")
+>>> history.price_changes("dairy-eggs-fridge", "2024-10-01", "2024-11-01")
+>>> history.current_vs_min(days=30, category="pantry")
+"""
+
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pandas as pd
+
+from src.prices import price_frame
+from src.storage import STORAGE, DatasetStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join("data", "processed", "price_history.sqlite")
+CSV_CHUNK_ROWS = 100_000
+
+COLUMNS = [
+    "product_id",
+    "timestamp",
+    "category",
+    "name",
+    "url",
+    "price_aud",
+    "was_price_aud",
+    "unit_price_aud",
+    "is_on_special",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    product_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,  -- UTC, ISO 8601, so text order is time order
+    category TEXT,
+    name TEXT,
+    url TEXT,
+    price_aud REAL,
+    was_price_aud REAL,
+    unit_price_aud REAL,
+    is_on_special INTEGER,
+    PRIMARY KEY (product_id, timestamp)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_by_category ON prices (category, timestamp);
+"""
+
+
+def _utc_iso(values) -> pd.Series:
+    return pd.Series(pd.to_datetime(values, utc=True, errors="coerce")).dt.strftime(
+        "%Y-%m-%dT%H:%M:%S"
+    )
+
+
+def to_history_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts raw product rows (as in `data/raw/products.csv`) to history rows,
+    extracting ids and prices the same way as `process_product_data`.
+    """
+    rows = pd.DataFrame(index=df.index)
+    rows["product_id"] = df["url"].str.extract(r"product\/(.+)\-\d+$")[0]
+    rows["timestamp"] = _utc_iso(df["timestamp"]).to_numpy()
+    rows["category"] = df.get("category")
+    rows["name"] = df["name"]
+    rows["url"] = df["url"]
+    prices = price_frame(df)
+    rows["price_aud"] = prices["price_aud"]
+    rows["was_price_aud"] = prices["was_price_aud"]
+    rows["unit_price_aud"] = prices["unit_price_aud"]
+    if "is_on_special" in df:
+        rows["is_on_special"] = df["is_on_special"].astype(str).eq("True").astype(int)
+    else:
+        rows["is_on_special"] = rows["was_price_aud"].notna().astype(int)
+    return rows.dropna(subset=["product_id", "timestamp"])[COLUMNS]
+
+
+class PriceHistory:
+    """
+    SQLite-backed history of product prices.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        """
+        :param path: Database file, created if missing. Use ":memory:" for a
+            throwaway store.
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "PriceHistory":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # --- Ingestion --- #
+
+    def ingest(self, df: pd.DataFrame) -> int:
+        """
+        Adds raw product rows to the history. Re-ingesting the same observation
+        replaces it, so loading overlapping files is safe.
+
+        :return: The number of rows written.
+        """
+        rows = to_history_rows(df)
+        records = rows.astype(object).where(rows.notna(), None).itertuples(index=False)
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO prices ({', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                records,
+            )
+        return len(rows)
+
+    def ingest_csv(self, path: str, chunk_rows: int = CSV_CHUNK_ROWS) -> int:
+        """
+        Streams a raw products CSV (or the archive of dropped rows) into the history.
+
+        :return: The number of rows written.
+        """
+        total = 0
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str):
+            total += self.ingest(chunk)
+        logger.info("Ingested %d rows from %s into %s", total, path, self.path)
+        return total
+
+    def ingest_dataset(
+        self,
+        path: str,
+        store: Optional[DatasetStore] = None,
+        chunk_rows: int = CSV_CHUNK_ROWS,
+    ) -> int:
+        """
+        Streams a raw products dataset in any storage format into the history.
+
+        :param store: Defaults to STORAGE.
+        :return: The number of rows written.
+        """
+        store = store or STORAGE
+        total = 0
+        for chunk in store.iter_chunks(path, chunk_rows):
+            total += self.ingest(chunk)
+        logger.info(
+            "Ingested %d rows from %s into %s", total, store.resolve(path), self.path
+        )
+        return total
+
+    # --- Queries --- #
+
+    def _query(self, sql: str, params=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def product_history(self, product_id: str) -> pd.DataFrame:
+        """
+        All observations of a product, oldest first.
+        """
+        return self._query(
+            "SELECT * FROM prices WHERE product_id = ? ORDER BY timestamp",
+            (product_id,),
+        )
+
+    def price_changes(self, category: str, start: str, end: str) -> pd.DataFrame:
+        """
+        Observations in a category between two dates whose price differs from the
+        product's previous observation.
+
+        :param start: Inclusive start, any format pandas parses (e.g. "2024-10-01").
+        :param end: Exclusive end.
+        :return: Rows with `previous_price_aud` and `previous_timestamp` added.
+        """
+        start, end = _utc_iso([start, end])
+        return self._query(
+            """
+            WITH ordered AS (
+                SELECT *,
+                    LAG(price_aud) OVER w AS previous_price_aud,
+                    LAG(timestamp) OVER w AS previous_timestamp
+                FROM prices
+                WHERE category = ? AND timestamp < ?
+                WINDOW w AS (PARTITION BY product_id ORDER BY timestamp)
+            )
+            SELECT * FROM ordered
+            WHERE timestamp >= ?
+                AND previous_price_aud IS NOT NULL
+                AND price_aud IS NOT previous_price_aud
+            ORDER BY timestamp, product_id
+            """,
+            (category, end, start),
+        )
+
+    def current_vs_min(
+        self,
+        days: int,
+        category: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """
+        Each product's latest price against its minimum over the last `days` days.
+
+        Rows are only written when a price changes, so the price in effect at the
+        start of the window (the last observation before it) is included.
+
+        :param category: Limit to one category.
+        :param now: End of the window. Defaults to the current time.
+        :return: One row per product with `current_price_aud`, `min_price_aud` and
+            `is_at_min`.
+        """
+        now = now or datetime.now(timezone.utc)
+        since = _utc_iso([now - timedelta(days=days)])[0]
+        category_filter = "WHERE category = ?" if category else ""
+        params = ((category,) if category else ()) + (since, since)
+        return self._query(
+            f"""
+            WITH current AS (
+                SELECT product_id, MAX(timestamp) AS timestamp
+                FROM prices {category_filter}
+                GROUP BY product_id
+            )
+            SELECT
+                c.product_id,
+                p.name,
+                p.category,
+                p.price_aud AS current_price_aud,
+                MIN(h.price_aud) AS min_price_aud,
+                p.price_aud <= MIN(h.price_aud) AS is_at_min,
+                c.timestamp
+            FROM current c
+            JOIN prices p ON p.product_id = c.product_id AND p.timestamp = c.timestamp
+            JOIN prices h ON h.product_id = c.product_id AND h.timestamp >= COALESCE(
+                (
+                    SELECT MAX(timestamp) FROM prices
+                    WHERE product_id = c.product_id AND timestamp <= ?
+                ),
+                ?
+            )
+            GROUP BY c.product_id
+            ORDER BY c.product_id
+            """,
+            params,
+        )
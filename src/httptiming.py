@@ -0,0 +1,146 @@
+"""
+Latency breakdown of HTTP requests.
+
+A requests adapter whose new connections time name resolution, the TCP connect
+and the TLS handshake, and records them along with the time to first byte and
+the body read time of each request into a MetricsRegistry. Kept apart from
+`src.metrics` so that modules recording metrics without fetching (the scrapers)
+don't import requests.
+"""
+
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+from src.metrics import MetricsRegistry
+
+_connection_timings = threading.local()
+
+
+def reset_connection_timings() -> None:
+    """
+    Clears the connection timings recorded by the current thread.
+    """
+    _connection_timings.values = {}
+
+
+def pop_connection_timings() -> Dict[str, float]:
+    """
+    Returns and clears the connection timings recorded by the current thread.
+
+    Keys are "dns", "connect" and "tls"; they are only present when the request
+    opened a new connection rather than reusing a pooled one.
+    """
+    values = getattr(_connection_timings, "values", {})
+    _connection_timings.values = {}
+    return values
+
+
+def _record_connection_timing(stage: str, seconds: float) -> None:
+    if not hasattr(_connection_timings, "values"):
+        _connection_timings.values = {}
+    _connection_timings.values[stage] = seconds
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """
+    HTTP connection timing name resolution and the TCP connect separately.
+    """
+
+    def _new_conn(self) -> socket.socket:
+        start = time.perf_counter()
+        dns_host = self._dns_host
+        try:
+            addresses = socket.getaddrinfo(
+                dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM
+            )
+        except socket.gaierror:
+            # Let urllib3 resolve again and raise its usual error.
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        _record_connection_timing("dns", resolved - start)
+
+        # Each address is tried in turn (e.g. IPv6, then IPv4), as urllib3's own
+        # `create_connection` does, and the last failure is raised.
+        error = None
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    sock = super()._new_conn()
+                except ConnectTimeoutError as e:  # Also NewConnectionError.
+                    error = e
+                    continue
+                finally:
+                    self._dns_host = dns_host
+                _record_connection_timing("connect", time.perf_counter() - resolved)
+                return sock
+            if error is None:
+                return super()._new_conn()
+            raise error
+        finally:
+            # The error's traceback holds this frame: break the cycle, which would
+            # otherwise keep the connection (and its socket) alive until collected.
+            error = None
+
+
+class TimedHTTPSConnection(HTTPSConnection, TimedHTTPConnection):
+    """
+    HTTPS connection additionally timing the TLS handshake.
+    """
+
+    def connect(self) -> None:
+        start = time.perf_counter()
+        super().connect()
+        values = getattr(_connection_timings, "values", {})
+        elapsed = time.perf_counter() - start
+        tcp = values.get("dns", 0.0) + values.get("connect", 0.0)
+        _record_connection_timing("tls", max(0.0, elapsed - tcp))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """
+    Requests adapter whose new connections record DNS, connect and TLS timings.
+    Read them after each request with `pop_connection_timings`.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def record_fetch_timings(
+    metrics: MetricsRegistry, response, body_seconds: float, host: Optional[str]
+) -> None:
+    """
+    Records the latency breakdown of a completed request.
+
+    :param response: The requests.Response; its `elapsed` (send to headers parsed) is
+        used as time to first byte.
+    :param body_seconds: Time spent reading the body.
+    """
+    labels = {"host": host} if host else {}
+    for stage, seconds in pop_connection_timings().items():
+        metrics.observe(f"fetch_{stage}_seconds", seconds, **labels)
+    elapsed = getattr(response, "elapsed", None)
+    if elapsed is not None:
+        metrics.observe("fetch_ttfb_seconds", elapsed.total_seconds(), **labels)
+    metrics.observe("fetch_body_seconds", body_seconds, **labels)
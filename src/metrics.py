@@ -0,0 +1,280 @@
+"""
+Crawl metrics and hot-path instrumentation.
+
+Stages of a crawl (fetching, parsing, storage) record counters and timings into a
+MetricsRegistry, which can be exported as a Prometheus text file or as a JSON run
+summary with percentiles.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = os.path.join("data", "metrics")
+PROMETHEUS_PREFIX = "coles_"
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+# Values kept per distribution for its quantiles. Beyond this many observations a
+# uniform sample of them (reservoir sampling) stands in for all of them, so a long
+# crawl's metrics take bounded memory.
+RESERVOIR_SIZE = 1024
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, object]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """
+    Linearly interpolated percentile of already sorted values.
+
+    :param q: Quantile in [0, 1].
+    """
+    if not sorted_values:
+        return math.nan
+    position = (len(sorted_values) - 1) * q
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    fraction = position - lower
+    return (
+        sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    )
+
+
+class Distribution:
+    """
+    Bounded summary of observed values: their exact count, sum and maximum, and a
+    uniform sample of at most `size` of them for quantiles.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE):
+        self.size = size
+        self.count = 0
+        self.sum = 0.0
+        self.max = -math.inf
+        self.sample: List[float] = []
+
+    def add(self, value: float, rng: random.Random) -> None:
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        if len(self.sample) < self.size:
+            self.sample.append(value)
+        else:
+            # Keeps each of the `count` values with probability size / count.
+            index = rng.randrange(self.count)
+            if index < self.size:
+                self.sample[index] = value
+
+    def snapshot(self) -> "Distribution":
+        """
+        A copy, with its sample sorted for `percentile`.
+        """
+        copy = Distribution(self.size)
+        copy.count, copy.sum, copy.max = self.count, self.sum, self.max
+        copy.sample = sorted(self.sample)
+        return copy
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and observed values (timings, sizes).
+
+    Typical usage example:
+    >>> metrics = MetricsRegistry()
+    >>> with metrics.timer("parse_seconds", scraper="ColesProductTileScraper"):
+    ...     products = scraper.get_all_products()
+    >>> metrics.observe("tiles_per_page", len(products))
+    >>> metrics.write_prometheus("data/metrics/crawl.prom")
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        """
+        :param reservoir_size: Values kept per distribution for its quantiles.
+        """
+        self.reservoir_size = reservoir_size
+        self._counters: Dict[MetricKey, float] = {}
+        self._observations: Dict[MetricKey, Distribution] = {}
+        self._rng = random.Random()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Adds `value` to a counter.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        Records one observation of a distribution, such as a duration in seconds.
+        """
+        key = _key(name, labels)
+        with self._lock:
+            distribution = self._observations.get(key)
+            if distribution is None:
+                distribution = self._observations[key] = Distribution(
+                    self.reservoir_size
+                )
+            distribution.add(value, self._rng)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """
+        Context manager observing the wall time of its block, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """
+        Decorator observing the wall time of each call, in seconds.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def reset(self) -> None:
+        """
+        Clears all recorded metrics.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._observations.clear()
+
+    def _snapshot(
+        self,
+    ) -> Tuple[Dict[MetricKey, float], Dict[MetricKey, Distribution]]:
+        with self._lock:
+            counters = dict(self._counters)
+            observations = {k: v.snapshot() for k, v in self._observations.items()}
+        return counters, observations
+
+    def summary(self) -> Dict[str, Dict[str, object]]:
+        """
+        Summarises the recorded metrics.
+
+        :return: Counters by name, and count/sum/mean/p50/p90/p99/max per distribution.
+            Quantiles are estimated from a sample once a distribution has more than
+            `reservoir_size` values; the rest are exact.
+        """
+        counters, observations = self._snapshot()
+
+        distributions = {}
+        for key, distribution in observations.items():
+            values = distribution.sample
+            distributions[_format_key(key)] = {
+                "count": distribution.count,
+                "sum": distribution.sum,
+                "mean": distribution.sum / distribution.count,
+                "p50": percentile(values, 0.5),
+                "p90": percentile(values, 0.9),
+                "p99": percentile(values, 0.99),
+                "max": distribution.max,
+            }
+        return {
+            "counters": {_format_key(k): v for k, v in counters.items()},
+            "distributions": distributions,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Counters become `counter` metrics and distributions become `summary`
+        metrics with 0.5/0.9/0.99 quantiles.
+        """
+        counters, observations = self._snapshot()
+
+        lines = []
+        for name in sorted({key[0] for key in counters}):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {metric} counter")
+            for key in sorted(k for k in counters if k[0] == name):
+                lines.append(f"{_format_key((metric, key[1]))} {counters[key]:g}")
+
+        for name in sorted({key[0] for key in observations}):
+            metric = PROMETHEUS_PREFIX + name
+            lines.append(f"# TYPE {metric} summary")
+            for key in sorted(k for k in observations if k[0] == name):
+                distribution = observations[key]
+                for q in SUMMARY_QUANTILES:
+                    labels = key[1] + (("quantile", str(q)),)
+                    value = percentile(distribution.sample, q)
+                    lines.append(f"{_format_key((metric, labels))} {value:g}")
+                lines.append(
+                    f"{_format_key((metric + '_sum', key[1]))} {distribution.sum:g}"
+                )
+                lines.append(
+                    f"{_format_key((metric + '_count', key[1]))} {distribution.count}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Writes the Prometheus text file, e.g. for node_exporter's textfile collector.
+        """
+        self._write(path, self.to_prometheus())
+
+    def write_json_summary(self, path: str) -> None:
+        """
+        Writes the run summary as JSON.
+        """
+        self._write(path, json.dumps(self.summary(), indent=2))
+
+    @staticmethod
+    def _write(path: str, content: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so collectors never read a half-written file.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as dst:
+            dst.write(content)
+        os.replace(tmp_path, path)
+        logger.info("Saved metrics to %s", path)
+
+
+# Process-wide registry used by the fetcher, scrapers and scripts by default.
+REGISTRY = MetricsRegistry()
+
+
+def export_run_metrics(
+    run_name: str,
+    metrics: Optional[MetricsRegistry] = None,
+    directory: str = METRICS_DIR,
+) -> None:
+    """
+    Writes `<run_name>.prom` and `<run_name>.json` for a finished run.
+    """
+    metrics = metrics or REGISTRY
+    metrics.write_prometheus(os.path.join(directory, f"{run_name}.prom"))
+    metrics.write_json_summary(os.path.join(directory, f"{run_name}.json"))
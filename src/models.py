@@ -3,7 +3,9 @@ Models for Coles scrapers.
 """
 
 from dataclasses import dataclass, field, asdict
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+
+from src.prices import TypedPrices, Unit, unit_label
 
 
 @dataclass
@@ -22,6 +24,24 @@ class ProductTile:
     discount_percentage: Optional[str] = field(default=None)
     special_type: Optional[str] = field(default=None)  # e.g., "Half Price", "Special", "Down Down"
     is_on_special: bool = field(default=False)
+    # Typed prices, parsed once at scrape time; the strings above are kept for audit
+    price_cents: Optional[int] = field(default=None)
+    was_price_cents: Optional[int] = field(default=None)
+    unit_price_cents: Optional[int] = field(default=None)
+    unit_quantity: Optional[float] = field(default=None)  # e.g., 100 for "per 100g"
+    unit: Optional[Unit] = field(default=None)
+
+    def __post_init__(self):
+        # Tiles built without typed prices (e.g. from pages without page state) get
+        # them from their display strings. Typed prices the page state did have
+        # (say, a was price without a current one) are kept.
+        if self.price_cents is None:
+            typed = TypedPrices.from_display(
+                self.price, self.price_calc_method, self.was_price
+            )
+            for name, value in asdict(typed).items():
+                if getattr(self, name) is None:
+                    setattr(self, name, value)
 
     def __repr__(self):
         repr_string = (
@@ -35,6 +55,10 @@ class ProductTile:
             f"  Special Type       : {self.special_type or 'N/A'}\n"
             f"  On Special         : {self.is_on_special}\n"
             f"  Price Calculation  : {self.price_calc_method or 'N/A'}\n"
+            f"  Price (cents)      : {self.price_cents if self.price_cents is not None else 'N/A'}\n"
+            f"  Was Price (cents)  : {self.was_price_cents if self.was_price_cents is not None else 'N/A'}\n"
+            f"  Unit Price (cents) : {self.unit_price_cents if self.unit_price_cents is not None else 'N/A'}\n"
+            f"  Unit               : {unit_label(self.unit_quantity, self.unit) or 'N/A'}\n"
             f"  Image URL          : {self.image_url or 'N/A'}\n"
             f"{'='*40}\n"
         )
@@ -43,6 +67,18 @@ class ProductTile:
     dict = asdict
 
 
+@dataclass
+class NutritionPanel:
+    """
+    Model for the nutrition information panel on Coles' **dedicated product pages**.
+    """
+
+    servings_per_package: Optional[str] = field(default=None)
+    serving_size: Optional[str] = field(default=None)
+    # Nutrient values per column, e.g. {"Per 100g/ml": {"Energy": "2526kJ", ...}}
+    breakdown: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+
 @dataclass
 class Product:
     """
@@ -56,6 +92,14 @@ class Product:
     retail_limit: Optional[str] = field(default=None)
     promotional_limit: Optional[str] = field(default=None)
     product_code: Optional[str] = field(default=None)
+    # Typed fields from the page's embedded JSON
+    price_cents: Optional[int] = field(default=None)
+    was_price_cents: Optional[int] = field(default=None)
+    unit_price_cents: Optional[int] = field(default=None)
+    unit_of_measure: Optional[str] = field(default=None)  # e.g., "100g", "1kg", "1ea"
+    nutrition: Optional[NutritionPanel] = field(default=None)
+    nutritional_claims: List[str] = field(default_factory=list)
+    store_id: Optional[str] = field(default=None)
 
     def __repr__(self):
         repr_string = (
@@ -68,6 +112,57 @@ class Product:
             f"  Retail Limit       : {self.retail_limit or 'N/A'}\n"
             f"  Promotional Limit  : {self.promotional_limit or 'N/A'}\n"
             f"  Product Code       : {self.product_code or 'N/A'}\n"
+            f"  Price (cents)      : {self.price_cents if self.price_cents is not None else 'N/A'}\n"
+            f"  Was Price (cents)  : {self.was_price_cents if self.was_price_cents is not None else 'N/A'}\n"
+            f"  Unit Price (cents) : {self.unit_price_cents if self.unit_price_cents is not None else 'N/A'}\n"
+            f"  Unit of Measure    : {self.unit_of_measure or 'N/A'}\n"
+            f"  Nutrition Panel    : {'Yes' if self.nutrition else 'N/A'}\n"
+            f"  Nutritional Claims : {', '.join(self.nutritional_claims) or 'N/A'}\n"
+            f"  Store ID           : {self.store_id or 'N/A'}\n"
+            f"{'='*40}\n"
+        )
+        return repr_string
+
+    dict = asdict
+
+
+@dataclass
+class Category:
+    """
+    Model for a node of Coles' **category tree**, as listed on the browse page.
+    """
+
+    name: str
+    slug: str
+    url: str
+    id: Optional[str] = field(default=None)
+    level: int = field(default=1)
+    product_count: int = field(default=0)
+    subcategories: List["Category"] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Category":
+        """
+        Rebuilds a category (and its subcategories) from the output of `dict()`.
+        """
+        data = dict(data)
+        data["subcategories"] = [
+            cls.from_dict(sub) for sub in data.get("subcategories", [])
+        ]
+        return cls(**data)
+
+    def __repr__(self):
+        repr_string = (
+            f"\n{'='*40}\n"
+            f"Category:\n"
+            f"  Name               : {self.name or 'N/A'}\n"
+            f"  Slug               : {self.slug or 'N/A'}\n"
+            f"  URL                : {self.url or 'N/A'}\n"
+            f"  Level              : {self.level}\n"
+            f"  Product Count      : {self.product_count}\n"
+            f"  Subcategories      : {len(self.subcategories)}\n"
             f"{'='*40}\n"
         )
         return repr_string
+
+    dict = asdict
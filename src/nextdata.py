@@ -0,0 +1,119 @@
+"""
+Crawling through the Next.js data routes of the Coles website.
+
+Coles pages are rendered by Next.js, which also serves the props of every page as
+JSON under `/_next/data/<buildId>/<page path>.json`, e.g.
+`/_next/data/20241022.02_v4.26.0/browse/pantry.json?page=2`. These carry the same
+page state as the `__NEXT_DATA__` script of the HTML page without its ~800 KB of
+markup, so a crawl through them transfers and parses a fraction of the bytes.
+
+The buildId changes with every deploy of the site. It is discovered from one HTML
+page, and discovered again when a data route 404s because the build it names was
+replaced.
+
+Typical usage example:
+>>> client = NextDataClient(fetcher)
+>>> tiles = client.get_tiles(ROUTER.browse_url("pantry", page=2))
+>>> product = client.get_product(ROUTER.product_url("appy-fizz-250ml-8060378"))
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from src.common import extract_next_data
+from src.exceptions import BuildIdNotFoundError
+from src.fetcher import ColesPageFetcher
+from src.models import Product, ProductTile
+from src.scrapers import ColesProductScraper, ColesProductTileScraper
+
+logger = logging.getLogger(__name__)
+
+
+class NextDataClient:
+    """
+    Fetches page props from the Next.js data routes, tracking the site's buildId.
+    """
+
+    def __init__(
+        self,
+        fetcher: ColesPageFetcher,
+        discovery_url: Optional[str] = None,
+        build_id: Optional[str] = None,
+    ):
+        """
+        :param fetcher: Fetcher used for both the HTML page and the data routes.
+        :param discovery_url: HTML page the buildId is read from. Defaults to the
+            browse landing page.
+        :param build_id: A known buildId, to skip the first discovery.
+        """
+        self.fetcher = fetcher
+        self.discovery_url = discovery_url or fetcher.router.browse_url()
+        self._build_id = build_id
+        self._lock = threading.Lock()
+
+    @property
+    def build_id(self) -> str:
+        """
+        The site's current buildId, discovered on first access.
+        """
+        with self._lock:
+            if self._build_id is None:
+                self._build_id = self.discover_build_id()
+            return self._build_id
+
+    def discover_build_id(self) -> str:
+        """
+        Reads the buildId from the page state of the discovery page.
+        """
+        response = self.fetcher.get(self.discovery_url)
+        build_id = (extract_next_data(response.content) or {}).get("buildId")
+        if not build_id:
+            raise BuildIdNotFoundError(f"No Next.js buildId on {self.discovery_url}")
+        self.fetcher.metrics.increment("next_build_id_discoveries_total")
+        logger.info("Discovered Next.js buildId %s", build_id)
+        return build_id
+
+    def _rediscover(self, stale_build_id: str) -> str:
+        # Threads hitting the same stale build discover its successor once.
+        with self._lock:
+            if self._build_id == stale_build_id:
+                self._build_id = self.discover_build_id()
+            return self._build_id
+
+    def get_page_props(self, url: str) -> Dict[str, Any]:
+        """
+        Fetches the props of the page at `url` from its data route.
+
+        A 404 is taken as a deploy having replaced the build: the buildId is
+        discovered again and, if it changed, the request is retried once.
+
+        :param url: A page URL, e.g. `ROUTER.browse_url("pantry", page=2)`.
+        :return: The page props, as in the page state of the HTML page.
+        """
+        build_id = self.build_id
+        try:
+            response = self.fetcher.get(self.fetcher.router.data_url(build_id, url))
+        except requests.HTTPError as e:
+            if getattr(e.response, "status_code", None) != 404:
+                raise
+            current = self._rediscover(build_id)
+            if current == build_id:
+                raise
+            logger.info("Next.js buildId changed from %s to %s", build_id, current)
+            response = self.fetcher.get(self.fetcher.router.data_url(current, url))
+        return response.json().get("pageProps") or {}
+
+    def get_tiles(self, url: str) -> List[ProductTile]:
+        """
+        The product tiles of a browse or specials page.
+        """
+        return ColesProductTileScraper.tiles_from_page_props(self.get_page_props(url))
+
+    def get_product(self, url: str) -> Product:
+        """
+        The product of a product page.
+        """
+        return ColesProductScraper.product_from_page_props(self.get_page_props(url))
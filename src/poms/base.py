@@ -4,10 +4,56 @@ Base Page Object Model for Selenium-based interactions.
 All page objects should inherit from this.
 """
 
+import json
+from typing import Dict, List, Optional
+
 from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+# Collects the requested attributes of every matched element inside the browser
+# and returns them as a single JSON string, so that a whole listing costs one
+# WebDriver round trip instead of one per element and attribute.
+#   arguments[0]: locator strategy ("xpath" / "css selector") or null
+#   arguments[1]: locator value, or an array of already-located elements
+#   arguments[2]: {output_key: attribute_name}; "text" maps to innerText and
+#                 DOM properties take precedence over attributes, as with
+#                 Selenium's WebElement.get_attribute.
+EXTRACT_ATTRIBUTES_SCRIPT = """
+const [strategy, target, attributes] = arguments;
+let elements = [];
+if (strategy === "xpath") {
+    const snapshot = document.evaluate(
+        target, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+        elements.push(snapshot.snapshotItem(i));
+    }
+} else if (strategy === "css selector") {
+    elements = Array.from(document.querySelectorAll(target));
+} else {
+    elements = target || [];
+}
+const read = (el, name) => {
+    if (name === "text") {
+        return el.innerText;
+    }
+    const prop = el[name];
+    if (prop !== undefined && prop !== null && typeof prop !== "object" && typeof prop !== "function") {
+        return String(prop);
+    }
+    return el.getAttribute(name);
+};
+return JSON.stringify(elements.map((el) => {
+    const row = {};
+    for (const [key, name] of Object.entries(attributes)) {
+        row[key] = read(el, name);
+    }
+    return row;
+}));
+"""
+
 
 class BasePage:
     """Base Page class."""
@@ -26,6 +72,31 @@ class BasePage:
     def find_elements(self, locator):
         return self.driver.find_elements(*locator)
 
+    def extract_attributes(
+        self, locator, attributes: Dict[str, str]
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        Extracts attributes from all elements matching a locator in a single script call.
+
+        :param locator: A (By, value) locator tuple.
+        :param attributes: Mapping of output key to attribute name. Use "text" for the
+            element's visible text.
+        :return: A list of dicts, one per matched element, keyed like `attributes`.
+        """
+        by, value = locator
+        if by in (By.XPATH, By.CSS_SELECTOR):
+            payload = self.driver.execute_script(
+                EXTRACT_ATTRIBUTES_SCRIPT, by, value, attributes
+            )
+        else:
+            # Other strategies have no direct DOM equivalent; locate the elements
+            # first and let the script read them in one go.
+            elements = self.find_elements(locator)
+            payload = self.driver.execute_script(
+                EXTRACT_ATTRIBUTES_SCRIPT, None, elements, attributes
+            )
+        return json.loads(payload) if payload else []
+
     def click_element(self, locator):
         element = self.find_element(locator)
         element.click()
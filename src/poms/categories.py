@@ -4,6 +4,8 @@ Page Object Model for Coles browse page.
 
 from selenium.webdriver.common.by import By
 
+from src.endpoints import ROUTER
+
 from .base import BasePage
 
 
@@ -19,16 +21,21 @@ class CategoriesPageLocators:
 class CategoriesPage(BasePage):
     """Categories page action methods come here"""
 
-    url = "https://www.coles.com.au/browse"
+    @property
+    def url(self) -> str:
+        return ROUTER.browse_url()
 
     def list_categories(self):
-        cards = self.find_elements(CategoriesPageLocators.CATEGORY_CARD)
+        cards = self.extract_attributes(
+            CategoriesPageLocators.CATEGORY_CARD, {"name": "text", "url": "href"}
+        )
         categories = [
             {
-                "name": card.text,
-                "url": card.get_attribute("href"),
-                "slug": card.get_attribute("href").split("/")[-1],
+                "name": card["name"],
+                "url": card["url"],
+                "slug": card["url"].split("/")[-1],
             }
             for card in cards
+            if card["url"]
         ]
         return categories
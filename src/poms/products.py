@@ -9,6 +9,7 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from src.endpoints import ROUTER
 from src.models import ProductTile
 from src.scrapers import ColesProductTileScraper
 
@@ -52,15 +53,17 @@ class ProductsPage(BasePage):
 
     @staticmethod
     def _build_url(category: str, page: int = 1) -> str:
-        url = f"https://www.coles.com.au/browse/{category}"
-        if page > 1:
-            url += f"?page={page}"
-        return url
+        return ROUTER.browse_url(category, page=page if page > 1 else None)
 
     def list_products(self) -> List[ProductTile]:
-        if self.wait_for_element_visibility(ProductsPageLocators.PRODUCT_CARD):
-            scraper = self.scraper_cls(html_content=self.driver.page_source)
-            products = scraper.get_all_products()
-        else:
-            products = []
-        return products
+        if not self.wait_for_element_visibility(ProductsPageLocators.PRODUCT_CARD):
+            return []
+
+        # Pull only the tiles' markup in one round trip, rather than the whole page
+        # source, and parse it with the regular tile scraper.
+        tiles = self.extract_attributes(
+            ProductsPageLocators.PRODUCT_CARD, {"html": "outerHTML"}
+        )
+        html_content = "".join(tile["html"] for tile in tiles if tile["html"])
+        scraper = self.scraper_cls(html_content=html_content)
+        return scraper.get_all_products()
@@ -0,0 +1,182 @@
+"""
+Typed prices.
+
+Prices are kept as integer cents so that comparisons and differences are exact;
+display strings such as "$9.50" are only kept for audit.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DOLLAR_AMOUNT_PATTERN = re.compile(r"\$?\s*([\d,]+(?:\.\d+)?)")
+
+
+def to_cents(value: Union[int, float, str, None]) -> Optional[int]:
+    """
+    Converts a dollar amount (a number such as 9.5, or a string such as "$9.50" or
+    "$1,209.50") to integer cents.
+
+    :return: The amount in cents, or None if there is no amount.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = DOLLAR_AMOUNT_PATTERN.search(value)
+        if not match:
+            return None
+        value = match.group(1).replace(",", "")
+    try:
+        # Through str, so binary floats such as 2.675 round as written.
+        return int((Decimal(str(value)) * 100).quantize(Decimal(1)))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+class Unit(Enum):
+    """
+    Units prices are quoted per, valued as Coles displays them (e.g. "per 100mL").
+    """
+
+    GRAM = "g"
+    KILOGRAM = "kg"
+    MILLILITRE = "mL"
+    LITRE = "L"
+    METRE = "m"
+    EACH = "ea"
+
+    @classmethod
+    def parse(cls, text: Optional[str]) -> Optional["Unit"]:
+        """
+        The unit for a label such as "kg", "ml", "L" or "each", or None if unknown.
+        """
+        if not text:
+            return None
+        return _UNIT_ALIASES.get(text.strip().lower())
+
+
+_UNIT_ALIASES = {unit.value.lower(): unit for unit in Unit}
+_UNIT_ALIASES.update({"each": Unit.EACH, "litre": Unit.LITRE, "metre": Unit.METRE})
+
+# "$13.57 per 1kg", "$1.34 per 100gWas $2.70 on Sep 2024", "$1.44 per 100g | Was $6.00"
+UNIT_PRICE_PATTERN = re.compile(
+    r"\$([\d,]+\.\d+) per (\d+(?:\.\d+)?)?\s*([A-Za-z]+?)(?=Was|\W|$)"
+)
+WAS_PRICE_PATTERN = re.compile(r"Was \$([\d,]+\.\d+)")
+
+PRICE_FRAME_COLUMNS = ["price_aud", "was_price_aud", "unit_price_aud", "unit"]
+
+
+@dataclass
+class TypedPrices:
+    """
+    Prices of a product in cents, and the unit its unit price is quoted per.
+    """
+
+    price_cents: Optional[int] = None
+    was_price_cents: Optional[int] = None
+    unit_price_cents: Optional[int] = None
+    unit_quantity: Optional[float] = None  # e.g. 100 for "per 100g"
+    unit: Optional[Unit] = None
+
+    @classmethod
+    def from_pricing(cls, pricing: Dict[str, Any]) -> "TypedPrices":
+        """
+        Reads the `pricing` object of a product in the embedded page state.
+        """
+        unit = pricing.get("unit") or {}
+        return cls(
+            price_cents=to_cents(pricing.get("now")),
+            # A zero "was" price means the product is not discounted.
+            was_price_cents=to_cents(pricing.get("was")) or None,
+            unit_price_cents=to_cents(unit.get("price")),
+            unit_quantity=unit.get("ofMeasureQuantity"),
+            unit=Unit.parse(unit.get("ofMeasureUnits")),
+        )
+
+    @classmethod
+    def from_display(
+        cls,
+        price: Optional[str],
+        price_calc_method: Optional[str],
+        was_price: Optional[str] = None,
+    ) -> "TypedPrices":
+        """
+        Parses the display strings of a product tile, for pages without page state.
+        """
+        details = price_calc_method or ""
+        was_match = WAS_PRICE_PATTERN.search(details)
+        unit_match = UNIT_PRICE_PATTERN.search(details)
+        return cls(
+            price_cents=to_cents(price),
+            was_price_cents=to_cents(was_match.group(1) if was_match else was_price),
+            unit_price_cents=to_cents(unit_match.group(1)) if unit_match else None,
+            unit_quantity=(float(unit_match.group(2) or 1) if unit_match else None),
+            unit=Unit.parse(unit_match.group(3)) if unit_match else None,
+        )
+
+
+def unit_label(quantity: Optional[float], unit: Optional[Unit]) -> Optional[str]:
+    """
+    The unit a price is quoted per, as displayed, e.g. "100g" or "1L".
+    """
+    if unit is None:
+        return None
+    if quantity is None or math.isnan(quantity):
+        quantity = 1
+    return f"{quantity:g}{unit.value}"
+
+
+def price_frame(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Prices of raw product rows in AUD: `price_aud`, `was_price_aud`, `unit_price_aud`
+    and `unit` (e.g. "100g").
+
+    Rows with typed prices (`price_cents`, ...) are read directly. Rows scraped
+    before those columns existed are parsed from their display strings.
+    """
+    import pandas as pd
+
+    prices = pd.DataFrame(index=df.index, columns=PRICE_FRAME_COLUMNS, dtype=float)
+    prices["unit"] = prices["unit"].astype(object)
+
+    typed = df["price_cents"].notna() if "price_cents" in df else None
+    if typed is not None and typed.any():
+        rows = df[typed]
+        prices.loc[typed, "price_aud"] = rows["price_cents"].astype(float) / 100
+        prices.loc[typed, "was_price_aud"] = rows["was_price_cents"].astype(float) / 100
+        prices.loc[typed, "unit_price_aud"] = (
+            rows["unit_price_cents"].astype(float) / 100
+        )
+        quantity = rows["unit_quantity"].astype(float).fillna(1)
+        prices.loc[typed, "unit"] = (
+            quantity.map("{:g}".format) + rows["unit"].astype(object)
+        ).where(rows["unit"].notna(), None)
+
+    legacy = ~typed if typed is not None else pd.Series(True, index=df.index)
+    if legacy.any():
+        rows = df[legacy]
+        details = rows["price_calc_method"].astype(object).fillna("")
+        prices.loc[legacy, "price_aud"] = _to_aud(
+            rows["price"].astype(object).fillna("").str.extract(r"\$([\d,]+\.\d+)")[0]
+        )
+        prices.loc[legacy, "was_price_aud"] = _to_aud(
+            details.str.extract(r"Was \$([\d,]+\.\d+)")[0]
+        )
+        prices.loc[legacy, "unit_price_aud"] = _to_aud(
+            details.str.extract(r"\$([\d,]+\.\d+) per")[0]
+        )
+        prices.loc[legacy, "unit"] = details.str.replace("Was", "").str.extract(
+            r"\$[\d,]+\.\d+ per (\w+)"
+        )[0]
+    return prices
+
+
+def _to_aud(values: "pd.Series") -> "pd.Series":
+    return values.str.replace(",", "", regex=False).astype(float)
@@ -0,0 +1,153 @@
+"""
+Adaptive rate limiting for requests to the Coles website.
+
+Each host gets its own token bucket whose refill rate follows an AIMD
+(additive increase, multiplicative decrease) policy: the rate creeps up while
+responses are clean, and is cut sharply when the site pushes back.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    A token bucket refilled continuously at `rate` tokens per second.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param rate: Tokens added per second.
+        :param capacity: Maximum number of tokens held, i.e. the allowed burst.
+        :param clock: Monotonic clock function (can be overridden in tests).
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """
+        Takes a token, going into debt if none is available.
+
+        :return: Seconds the caller must wait before using the token.
+        """
+        self._refill()
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def drain(self) -> None:
+        """
+        Empties the bucket so that the next request waits a full interval.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class AdaptiveRateLimiter:
+    """
+    Per-host rate limiter with AIMD adaptation.
+
+    Typical usage example:
+    >>> limiter = AdaptiveRateLimiter()
+    >>> limiter.acquire("www.coles.com.au")  # blocks until a request is allowed
+    >>> ...  # perform the request
+    >>> limiter.record_success("www.coles.com.au")
+    """
+
+    # Multiplicative decrease applied for each kind of push-back.
+    THROTTLE_FACTOR = 0.5  # 429 / 5xx responses
+    BLOCK_FACTOR = 0.25  # bot detection page
+
+    def __init__(
+        self,
+        initial_rate: float = 0.5,
+        min_rate: float = 1 / 300,
+        max_rate: float = 5.0,
+        increase: float = 0.05,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep_func: Callable[[float], None] = time.sleep,
+    ):
+        """
+        :param initial_rate: Starting requests per second for a new host.
+        :param min_rate: Floor for the rate after repeated back-offs.
+        :param max_rate: Ceiling for the rate after repeated clean responses.
+        :param increase: Requests per second added after each clean response.
+        :param burst: Bucket capacity, i.e. requests allowed back to back.
+        :param clock: Monotonic clock function (can be overridden in tests).
+        :param sleep_func: Function to use for sleeping (can be overridden in tests).
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.burst = burst
+        self.clock = clock
+        self.sleep_func = sleep_func
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> TokenBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.initial_rate, self.burst, self.clock)
+            self._buckets[host] = bucket
+        return bucket
+
+    def rate(self, host: str) -> float:
+        """
+        Current requests per second allowed for a host.
+        """
+        with self._lock:
+            return self._bucket(host).rate
+
+    def acquire(self, host: str) -> float:
+        """
+        Blocks until a request to `host` is allowed.
+
+        :return: Seconds spent waiting.
+        """
+        with self._lock:
+            wait = self._bucket(host).reserve()
+        if wait > 0:
+            self.sleep_func(wait)
+        return wait
+
+    def record_success(self, host: str) -> None:
+        """
+        Additively increases the rate after a clean response.
+        """
+        with self._lock:
+            bucket = self._bucket(host)
+            bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    def record_throttle(self, host: str, factor: float = THROTTLE_FACTOR) -> None:
+        """
+        Multiplicatively decreases the rate after the host pushed back.
+
+        :param factor: Fraction of the current rate to keep.
+        """
+        with self._lock:
+            bucket = self._bucket(host)
+            bucket.rate = max(self.min_rate, bucket.rate * factor)
+            bucket.drain()
+            rate = bucket.rate
+        logger.warning("Backing off %s to %.3f requests/second", host, rate)
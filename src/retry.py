@@ -0,0 +1,211 @@
+"""
+Retry policies for requests to the Coles website.
+
+Failures are classified by kind, and each kind maps to its own strategy, so that
+cheap failures (a dropped connection) are retried cheaply, and the expensive
+cookie refresh is reserved for genuine bot blocks.
+"""
+
+import enum
+import logging
+import random
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+
+import requests
+
+from src.exceptions import BotDetectedError
+
+logger = logging.getLogger(__name__)
+
+
+class FailureKind(enum.Enum):
+    NETWORK = "network"
+    SERVER_ERROR = "server_error"
+    RATE_LIMITED = "rate_limited"
+    BOT_BLOCK = "bot_block"
+    CLIENT_ERROR = "client_error"
+
+
+class Strategy(enum.Enum):
+    RETRY_IMMEDIATELY = "retry_immediately"
+    BACKOFF = "backoff"
+    REFRESH_COOKIE = "refresh_cookie"
+    GIVE_UP = "give_up"
+
+
+@dataclass(frozen=True)
+class RetryRule:
+    """
+    How to handle one kind of failure.
+    """
+
+    strategy: Strategy
+    max_attempts: int = 0
+
+
+@dataclass(frozen=True)
+class RetryDecision:
+    """
+    What to do before the next attempt.
+    """
+
+    kind: FailureKind
+    strategy: Strategy
+    delay: float = 0.0
+
+
+class RetryBudget:
+    """
+    Caps the number of retries spent over a whole crawl, overall and per failure kind.
+
+    Share one budget between every fetcher of a crawl, so that a site-wide outage
+    fails the crawl quickly instead of retrying every page.
+    """
+
+    def __init__(
+        self,
+        max_retries: Optional[int] = None,
+        max_retries_per_kind: Optional[Dict[FailureKind, int]] = None,
+    ):
+        """
+        :param max_retries: Total retries allowed. None means unlimited.
+        :param max_retries_per_kind: Retries allowed for specific failure kinds.
+        """
+        self.max_retries = max_retries
+        self.max_retries_per_kind = max_retries_per_kind or {}
+        self.spent = 0
+        self.spent_per_kind: Dict[FailureKind, int] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, kind: FailureKind) -> bool:
+        """
+        Spends one retry of the given kind.
+
+        :return: True if the budget allowed it, False if it is exhausted.
+        """
+        with self._lock:
+            kind_limit = self.max_retries_per_kind.get(kind)
+            kind_spent = self.spent_per_kind.get(kind, 0)
+            if self.max_retries is not None and self.spent >= self.max_retries:
+                return False
+            if kind_limit is not None and kind_spent >= kind_limit:
+                return False
+            self.spent += 1
+            self.spent_per_kind[kind] = kind_spent + 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Classifies request failures and decides whether and how to retry them.
+
+    Typical usage example:
+    >>> policy = RetryPolicy(budget=RetryBudget(max_retries=100))
+    >>> decision = policy.decide(error, attempt=1)
+    >>> if decision is None:
+    ...     raise error
+    """
+
+    DEFAULT_RULES = {
+        FailureKind.NETWORK: RetryRule(Strategy.RETRY_IMMEDIATELY, max_attempts=2),
+        FailureKind.SERVER_ERROR: RetryRule(Strategy.BACKOFF, max_attempts=3),
+        FailureKind.RATE_LIMITED: RetryRule(Strategy.BACKOFF, max_attempts=3),
+        FailureKind.BOT_BLOCK: RetryRule(Strategy.REFRESH_COOKIE, max_attempts=1),
+        FailureKind.CLIENT_ERROR: RetryRule(Strategy.GIVE_UP),
+    }
+
+    def __init__(
+        self,
+        rules: Optional[Dict[FailureKind, RetryRule]] = None,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        budget: Optional[RetryBudget] = None,
+        random_func: Callable[[], float] = random.random,
+    ):
+        """
+        :param rules: Overrides for the default rule of each failure kind.
+        :param base_delay: Backoff delay cap for the first retry, doubled on each attempt.
+        :param max_delay: Upper bound for any delay, including Retry-After.
+        :param budget: Retry budget shared by the crawl. Defaults to unlimited.
+        :param random_func: Source of jitter in [0, 1) (can be overridden in tests).
+        """
+        self.rules = {**self.DEFAULT_RULES, **(rules or {})}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.random_func = random_func
+
+    @staticmethod
+    def classify(error: Exception) -> FailureKind:
+        """
+        Maps an exception raised while fetching to a failure kind.
+        """
+        if isinstance(error, BotDetectedError):
+            return FailureKind.BOT_BLOCK
+        if isinstance(error, requests.HTTPError):
+            status_code = getattr(error.response, "status_code", None)
+            if status_code == 429:
+                return FailureKind.RATE_LIMITED
+            if status_code is not None and 400 <= status_code < 500:
+                return FailureKind.CLIENT_ERROR
+            return FailureKind.SERVER_ERROR
+        if isinstance(error, requests.RequestException):
+            return FailureKind.NETWORK
+        return FailureKind.CLIENT_ERROR
+
+    def decide(self, error: Exception, attempt: int) -> Optional[RetryDecision]:
+        """
+        Decides how to handle a failed attempt.
+
+        :param error: The exception raised by the attempt.
+        :param attempt: Number of failed attempts of the error's kind so far,
+            starting at 1. Rules and backoff count each kind separately.
+        :return: The decision for the next attempt, or None to give up.
+        """
+        kind = self.classify(error)
+        rule = self.rules[kind]
+        if rule.strategy is Strategy.GIVE_UP or attempt > rule.max_attempts:
+            return None
+        if not self.budget.consume(kind):
+            logger.warning("Retry budget exhausted for %s failures", kind.value)
+            return None
+
+        delay = 0.0
+        if rule.strategy is Strategy.BACKOFF:
+            retry_after = self.retry_after(error)
+            delay = (
+                min(retry_after, self.max_delay)
+                if retry_after is not None
+                else self.backoff_delay(attempt)
+            )
+        return RetryDecision(kind=kind, strategy=rule.strategy, delay=delay)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Exponential backoff with full jitter.
+        """
+        cap = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.random_func() * cap
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """
+        Reads the Retry-After header (seconds or HTTP date) from an error's response.
+        """
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
@@ -2,12 +2,46 @@
 Scraper classes for extracting data from the Coles website.
 """
 
-from typing import List
+import logging
+import re
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
 
 from bs4.element import Tag
 
 from src import models
-from src.common import HtmlScraper
+from src.common import HtmlScraper, extract_embedded_json
+from src.endpoints import public_url
+from src.metrics import REGISTRY
+from src.prices import TypedPrices, to_cents, unit_label
+
+PRODUCT_IMAGE_ORIGIN = "https://productimages.coles.com.au/productimages"
+
+
+def product_slug(state: Dict[str, Any]) -> str:
+    """
+    The URL slug of a product in the page state, as the site builds it, e.g.
+    "coles-cheese-shredded-tasty-light-700g-8145346".
+    """
+    text = " ".join(
+        str(part)
+        for part in (state.get("brand"), state.get("name"), state.get("size"))
+        if part
+    )
+    text = f"{text} {state['id']}".lower().replace("&", " and ").replace("%", "percent")
+    return re.sub(r"[^a-z0-9.']+", "-", text).strip("-")
+
+
+def percentage_off(
+    price_cents: Optional[int], was_cents: Optional[int]
+) -> Optional[float]:
+    """
+    How much cheaper a price is than its was price, in percent, or None.
+    """
+    if price_cents is None or not was_cents:
+        return None
+    return ((was_cents - price_cents) / was_cents) * 100
 
 
 class ColesProductTileScraper(HtmlScraper):
@@ -36,10 +70,137 @@ class ColesProductTileScraper(HtmlScraper):
         "price": "$9.50",
         "price_calc_method": "$13.57 per 1kg",
         "image_url": "/_next/image?url=https%3A%2F%2Fproductimages.coles.com.au%2Fproductimages%2F8%2F8145346.jpg&w=640&q=90",
+        "price_cents": 950,
+        "unit_price_cents": 1357,
+        "unit_quantity": 1,
+        "unit": <Unit.KILOGRAM: 'kg'>,
+        ...
     }
     ```
     """
 
+    _state_pricing: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def state_pricing(self) -> Dict[str, Dict[str, Any]]:
+        """
+        The `pricing` of each product in the embedded page state, by product ID.
+        """
+        if self._state_pricing is None:
+            results = (
+                self.next_data.get("props", {})
+                .get("pageProps", {})
+                .get("searchResults", {})
+                .get("results", [])
+            )
+            self._state_pricing = {
+                str(result["id"]): result["pricing"]
+                for result in results
+                if result.get("_type") == "PRODUCT"
+                and result.get("id") is not None
+                and result.get("pricing")
+            }
+        return self._state_pricing
+
+    def typed_prices(self, url: Optional[str]) -> Optional[TypedPrices]:
+        """
+        The typed prices of the product at a tile URL, from the embedded page state.
+
+        :return: The prices, or None if the page state has none for the product.
+        """
+        match = re.search(r"-(\d+)$", url or "")
+        pricing = match and self.state_pricing.get(match.group(1))
+        return TypedPrices.from_pricing(pricing) if pricing else None
+
+    @classmethod
+    def tiles_from_page_props(
+        cls, page_props: Dict[str, Any]
+    ) -> List[models.ProductTile]:
+        """
+        Builds the product tiles of a browse or specials page from its page props,
+        e.g. as served by the page's Next.js data route, without any HTML.
+        """
+        results = (page_props.get("searchResults") or {}).get("results") or []
+        data = []
+        with REGISTRY.timer("scraper_extract_seconds", scraper=cls.__name__):
+            for result in results:
+                if result.get("_type") != "PRODUCT" or result.get("id") is None:
+                    continue
+                try:
+                    data.append(cls.tile_from_state(result))
+                except Exception as e:
+                    logging.getLogger(cls.__name__).warning(
+                        f"Failed to extract product from page state: {e}"
+                    )
+        REGISTRY.observe("tiles_per_page", len(data))
+        return data
+
+    @staticmethod
+    def tile_from_state(result: Dict[str, Any]) -> models.ProductTile:
+        """
+        Builds a product tile from a search result in the page state, with the same
+        display strings and discount fields as its tile in the HTML.
+        """
+        pricing = result.get("pricing") or {}
+        typed = TypedPrices.from_pricing(pricing)
+
+        name = " ".join(filter(None, [result.get("brand"), result.get("name")]))
+        if result.get("size"):
+            name = f"{name} | {result['size']}"
+        image_uri = (result.get("imageUris") or [{}])[0].get("uri")
+
+        # The tile shows the comparable unit price, then either the price
+        # description ("Was $2.70 on Sep 2024") or the was price.
+        price_calc_method = pricing.get("comparable") or ""
+        was_price = None
+        if typed.was_price_cents:
+            was_price = f"${typed.was_price_cents / 100:,.2f}"
+            description = pricing.get("priceDescription") or ""
+            if description.startswith("Was"):
+                price_calc_method += description
+            else:
+                price_calc_method += f" | Was {was_price}"
+        # Like the tile, the comparable string rounds the unit price that the
+        # pricing object truncates.
+        displayed = TypedPrices.from_display(None, price_calc_method)
+        if displayed.unit_price_cents is not None:
+            typed.unit_price_cents = displayed.unit_price_cents
+
+        percentage = percentage_off(typed.price_cents, typed.was_price_cents)
+        half_price = pricing.get("savePercent") == 50 or (
+            percentage is not None and 49 <= percentage <= 51
+        )
+        special_type, discount_percentage = None, None
+        if percentage is not None:
+            discount_percentage = f"{percentage:.0f}%"
+        if half_price:
+            special_type, discount_percentage = "Half Price", "50%"
+        elif pricing.get("saveStatement"):
+            special_type = pricing["saveStatement"].capitalize()
+
+        return models.ProductTile(
+            name=name or "Unknown Product",
+            url=f"/product/{product_slug(result)}",
+            price=(
+                f"${typed.price_cents / 100:,.2f}"
+                if typed.price_cents is not None
+                else None
+            ),
+            price_calc_method=price_calc_method or None,
+            image_url=(
+                "/_next/image?url="
+                + quote(PRODUCT_IMAGE_ORIGIN + image_uri, safe="")
+                + "&w=640&q=90"
+                if image_uri
+                else None
+            ),
+            was_price=was_price,
+            discount_percentage=discount_percentage,
+            special_type=special_type,
+            is_on_special=bool(typed.was_price_cents),
+            **asdict(typed),
+        )
+
     def get_all_products(self) -> List[models.ProductTile]:
         """
         Retrieves all product data from the HTML content.
@@ -48,12 +209,14 @@ class ColesProductTileScraper(HtmlScraper):
         """
         data = []
         product_tiles = self.find_all_product_tiles()
-        for tile in product_tiles:
-            try:
-                product = self.extract_product_from_tile(tile)
-                data.append(product)
-            except Exception as e:
-                self.logger.warning(f"Failed to extract product from tile: {e}")
+        with REGISTRY.timer("scraper_extract_seconds", scraper=self.__class__.__name__):
+            for tile in product_tiles:
+                try:
+                    product = self.extract_product_from_tile(tile)
+                    data.append(product)
+                except Exception as e:
+                    self.logger.warning(f"Failed to extract product from tile: {e}")
+        REGISTRY.observe("tiles_per_page", len(product_tiles))
         return data
 
     def find_all_product_tiles(self) -> List[Tag]:
@@ -88,6 +251,19 @@ class ColesProductTileScraper(HtmlScraper):
         # Extract discount information
         discount_info = self.extract_discount_info(tile)
         product_data.update(discount_info)
+
+        # Typed prices come from the page state; without it the tile parses them
+        # from the display strings above.
+        typed = self.typed_prices(product_data["url"])
+        if typed is not None:
+            # The page state truncates unit prices where the tile rounds them
+            # ($2.42 vs $2.43 per 1L), so the displayed one is kept when shown.
+            displayed = TypedPrices.from_display(
+                None, product_data["price_calc_method"]
+            )
+            if displayed.unit_price_cents is not None:
+                typed.unit_price_cents = displayed.unit_price_cents
+            product_data.update(asdict(typed))
         
         return models.ProductTile(**product_data)
     
@@ -110,7 +286,6 @@ class ColesProductTileScraper(HtmlScraper):
         if price_calc and "was" in price_calc.lower():
             discount_info["is_on_special"] = True
             # Extract was price using regex
-            import re
             was_match = re.search(r"was \$([\d,]+\.\d+)", price_calc, re.IGNORECASE)
             if was_match:
                 discount_info["was_price"] = f"${was_match.group(1)}"
@@ -140,7 +315,6 @@ class ColesProductTileScraper(HtmlScraper):
             r"(\d+)%\s*discount"
         ]
         
-        import re
         for pattern in discount_patterns:
             match = re.search(pattern, tile_text)
             if match:
@@ -154,18 +328,15 @@ class ColesProductTileScraper(HtmlScraper):
         
         # Calculate percentage if we have current and was price
         if discount_info["was_price"] and not discount_info["discount_percentage"]:
-            try:
-                current_price = self.get_text_content(tile, "span", class_="price__value")
-                if current_price and discount_info["was_price"]:
-                    current = float(current_price.replace("$", "").replace(",", ""))
-                    was = float(discount_info["was_price"].replace("$", "").replace(",", ""))
-                    if was > 0:
-                        percentage = ((was - current) / was) * 100
-                        discount_info["discount_percentage"] = f"{percentage:.0f}%"
-                        if percentage >= 49 and percentage <= 51:  # Approximately half price
-                            discount_info["special_type"] = "Half Price"
-            except (ValueError, TypeError):
-                pass  # Skip calculation if prices can't be parsed
+            current_price = self.get_text_content(tile, "span", class_="price__value")
+            # Compare in integer cents, so the percentage is exact.
+            percentage = percentage_off(
+                to_cents(current_price), to_cents(discount_info["was_price"])
+            )
+            if percentage is not None:
+                discount_info["discount_percentage"] = f"{percentage:.0f}%"
+                if percentage >= 49 and percentage <= 51:  # Approximately half price
+                    discount_info["special_type"] = "Half Price"
         
         return discount_info
 
@@ -204,8 +375,147 @@ class ColesProductScraper(HtmlScraper):
         """
         Retrieves product data from the product pages HTML content.
 
+        The page's embedded JSON (the Next.js page state and the JSON-LD product) is
+        read first. The HTML is only parsed when the page state is missing or
+        describes another product than the JSON-LD block.
+
         :return: A Product instance with product details.
         """
+        with REGISTRY.timer("scraper_extract_seconds", scraper=self.__class__.__name__):
+            return self._get_product()
+
+    def _get_product(self) -> models.Product:
+        next_data, ld_json = extract_embedded_json(self.html_content)
+        self._next_data = next_data or {}
+        page_props = self._next_data.get("props", {}).get("pageProps", {})
+        state = page_props.get("product") or {}
+        listing = next(
+            (data for data in ld_json if data.get("@type") == "Product"), {}
+        )
+
+        sku = listing.get("sku")
+        if state.get("id") is not None and (
+            sku is None or str(state["id"]) == str(sku)
+        ):
+            product = self._product_from_state(state, listing)
+        else:
+            if state:
+                self.logger.debug(
+                    "Page state describes product %s, not %s; parsing the HTML.",
+                    state.get("id"),
+                    sku,
+                )
+            REGISTRY.increment(
+                "scraper_html_fallback_total", scraper=self.__class__.__name__
+            )
+            product = self._product_from_html()
+            offers = listing.get("offers") or [{}]
+            offer = offers[0] if isinstance(offers, list) else offers
+            product.price_cents = to_cents(offer.get("price"))
+
+        product.store_id = (
+            page_props.get("initialState", {}).get("trolley", {}).get("storeId")
+        )
+        return product
+
+    @classmethod
+    def product_from_page_props(cls, page_props: Dict[str, Any]) -> models.Product:
+        """
+        Builds the product of a product page from its page props, e.g. as served by
+        the page's Next.js data route, without any HTML.
+        """
+        with REGISTRY.timer("scraper_extract_seconds", scraper=cls.__name__):
+            product = cls._product_from_state(page_props.get("product") or {}, {})
+        product.store_id = (
+            page_props.get("initialState", {}).get("trolley", {}).get("storeId")
+        )
+        return product
+
+    @classmethod
+    def _product_from_state(cls, state: dict, listing: dict) -> models.Product:
+        """
+        Builds a product from the page state, in the same format as the HTML.
+        """
+        brand = state.get("brandDetails") or {}
+        heirs = (state.get("onlineHeirs") or [{}])[0]
+        restrictions = state.get("restrictions") or {}
+        pricing = state.get("pricing") or {}
+        unit = pricing.get("unit") or {}
+
+        name = listing.get("name")
+        if not name:
+            name = " ".join(filter(None, [state.get("brand"), state.get("name")]))
+            if state.get("size"):
+                name = f"{name} | {state['size']}"
+
+        # Spelled as the unit prices are ("1kg", not "KG"); units that Unit does not
+        # know are kept as the page spells them.
+        prices = TypedPrices.from_pricing(pricing)
+        unit_of_measure = unit_label(prices.unit_quantity, prices.unit)
+        if unit_of_measure is None and unit.get("ofMeasureUnits"):
+            unit_of_measure = (
+                f"{unit.get('ofMeasureQuantity') or 1}{unit['ofMeasureUnits']}"
+            )
+
+        return models.Product(
+            name=name or "Unknown Product",
+            brand_name=state.get("brand"),
+            brand_url=(
+                f"/brands/{brand['seoToken']}-{brand['id']}"
+                if brand.get("seoToken") and brand.get("id")
+                else None
+            ),
+            # The same trail as the page's breadcrumbs.
+            categories=["Home", "All categories"]
+            + [
+                heirs[key]
+                for key in ("subCategory", "category", "aisle")
+                if heirs.get(key)
+            ],
+            retail_limit=cls._limit("Retail limit", restrictions.get("retailLimit")),
+            promotional_limit=cls._limit(
+                "Promotional limit", restrictions.get("promotionalLimit")
+            ),
+            product_code=f"Code: {state['id']}",
+            price_cents=to_cents(pricing.get("now")),
+            # A zero "was" price means the product is not discounted.
+            was_price_cents=to_cents(pricing.get("was")) or None,
+            unit_price_cents=to_cents(unit.get("price")),
+            unit_of_measure=unit_of_measure,
+            nutrition=cls._nutrition(state.get("nutrition")),
+            nutritional_claims=cls._claims(state.get("nutritionalClaims")),
+        )
+
+    @staticmethod
+    def _limit(label: str, value) -> Optional[str]:
+        return f"{label}: {value}" if value is not None else None
+
+    @staticmethod
+    def _nutrition(nutrition: Optional[dict]) -> Optional[models.NutritionPanel]:
+        if not nutrition:
+            return None
+        return models.NutritionPanel(
+            servings_per_package=nutrition.get("servingsPerPackage"),
+            serving_size=nutrition.get("servingSize"),
+            breakdown={
+                column.get("title"): {
+                    nutrient.get("nutrient"): nutrient.get("value")
+                    for nutrient in column.get("nutrients") or []
+                }
+                for column in nutrition.get("breakdown") or []
+            },
+        )
+
+    @staticmethod
+    def _claims(claims: Optional[list]) -> List[str]:
+        # Claims are either plain strings or objects with a title.
+        return [
+            claim if isinstance(claim, str) else claim.get("title")
+            for claim in claims or []
+            if isinstance(claim, str) or claim.get("title")
+        ]
+
+    def _product_from_html(self) -> models.Product:
         product_data = {
             "name": self.get_text_content(self.soup, "h1", class_="product__title"),
             "brand_name": self.get_text_content(
@@ -228,3 +538,83 @@ class ColesProductScraper(HtmlScraper):
             ),
         }
         return models.Product(**product_data)
+
+
+class ColesCategoryScraper(HtmlScraper):
+    """
+    Scraper for extracting the category tree from the embedded page state of **any
+    browse page** on the Coles website, e.g.:
+        - https://www.coles.com.au/browse
+        - https://www.coles.com.au/browse/pantry
+
+    The page state carries the full category hierarchy (top-level categories, their
+    subcategories and aisles), so no browser or HTML parsing is required.
+
+    Typical usage example:
+    >>> html_content = ...  # obtain the page's HTML via your fetching logic
+
+    >>> category_scraper = ColesCategoryScraper(html_content)
+    >>> categories = category_scraper.get_categories()
+
+    >>> # Each 'Category' contains fields like 'name', 'slug', 'url', 'subcategories', etc.
+    >>> for category in categories:
+    ...     print(category.slug, category.product_count)
+    """
+
+    BASE_URL = public_url("/browse")
+    CATEGORIES_QUERY = "GetProductCategories"
+
+    def get_categories(self) -> List[models.Category]:
+        """
+        Retrieves the category tree from the page state.
+
+        :return: A list of top-level Category instances with nested subcategories.
+        """
+        product_categories = self.find_product_categories()
+        excluded_ids = set(product_categories.get("excludedCategoryIds") or [])
+        return [
+            self.extract_category(node, parent_path=[])
+            for node in product_categories.get("catalogGroupView") or []
+            if node.get("id") not in excluded_ids
+        ]
+
+    def find_product_categories(self) -> dict:
+        """
+        Finds the product categories query result in the page state.
+
+        :return: The `productCategories` payload, or an empty dict if not found.
+        """
+        try:
+            queries = self.next_data["props"]["pageProps"]["initialState"][
+                "digitalGraphQLApi"
+            ]["queries"]
+            for key, query in queries.items():
+                if key.startswith(self.CATEGORIES_QUERY) and query.get("data"):
+                    return query["data"]["productCategories"]
+        except (KeyError, TypeError, AttributeError) as e:
+            self.logger.error(f"Error finding product categories: {e}")
+            return {}
+        self.logger.warning("No product categories found in page state.")
+        return {}
+
+    def extract_category(self, node: dict, parent_path: List[str]) -> models.Category:
+        """
+        Extracts a category and its subcategories from a catalog group node.
+
+        :param node: A `catalogGroupView` entry from the page state.
+        :param parent_path: Slugs of the node's ancestors, used to build its URL.
+        :return: An instance of Category with nested subcategories.
+        """
+        path = parent_path + [node["seoToken"]]
+        return models.Category(
+            name=node.get("name"),
+            slug=node["seoToken"],
+            url="/".join([self.BASE_URL] + path),
+            id=node.get("id"),
+            level=node.get("level", len(path)),
+            product_count=node.get("productCount") or 0,
+            subcategories=[
+                self.extract_category(child, parent_path=path)
+                for child in node.get("catalogGroupView") or []
+            ],
+        )
@@ -0,0 +1,348 @@
+"""
+Local stand-in for the Coles website, for offline load testing.
+
+Serves browse, specials and product pages from the test fixtures, with synthetic
+pagination up to the fixture's `noOfResults`, and their Next.js data routes under the
+fixture's buildId. It can inject latency, server errors,
+429 responses and the Incapsula interstitial. Point ColesPageFetcher at it with its
+`base_url` argument, or the scripts with the COLES_BASE_URL environment variable.
+
+Typical usage example:
+>>> with ColesStandIn(StandInConfig(latency=LatencyDistribution("lognormal", 0.2, 0.5))) as standin:
+...     fetcher = ColesPageFetcher(headers={"cookie": "stand-in"}, base_url=standin.base_url)
+...     fetcher.get("https://www.coles.com.au/browse/pantry?page=2")
+"""
+
+import copy
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.common import extract_next_data
+from src.endpoints import DATA_ROUTE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "assets")
+BROWSE_FIXTURE = os.path.join(ASSETS_DIR, "coles-browse-dairy-eggs-fridge-page-4.html")
+PRODUCT_FIXTURE = os.path.join(ASSETS_DIR, "coles-appy-fizz-250ml-8060378.html")
+
+PRODUCT_HREF_PATTERN = re.compile(rb'(href="/product/[^"]*-)(\d+)"')
+BUILD_ID_PATTERN = re.compile(rb'"buildId":"[^"]*"')
+# Number of rendered pages (and data route bodies) kept per stand-in.
+PAGE_CACHE_SIZE = 64
+
+EMPTY_PAGE = (
+    b"<!DOCTYPE html><html><head><title>Coles</title></head><body>"
+    b'<div id="coles-targeting-header-container"></div>'
+    b"<p>No products found</p></body></html>"
+)
+
+INTERSTITIAL_PAGE = (
+    b"<!DOCTYPE html><html><head><title>Pardon Our Interruption</title>"
+    b'<meta name="robots" content="noindex, nofollow">'
+    b'<script src="/_Incapsula_Resource?SWJIYLWA=719d34d31c8e3a6e6fffd425f7e032f3">'
+    b"</script></head><body><h1>Pardon Our Interruption</h1>"
+    b"<p>As you were browsing something about your browser made us think you were "
+    b"a bot.</p></body></html>"
+)
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    Distribution of the delay added before each response, in seconds.
+
+    :param kind: "constant", "uniform" (mean ± spread), "exponential" (mean) or
+        "lognormal" (median `mean`, shape `spread`).
+    """
+
+    kind: str = "constant"
+    mean: float = 0.0
+    spread: float = 0.0
+
+    KINDS = ("constant", "uniform", "exponential", "lognormal")
+
+    def __post_init__(self):
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {self.kind}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.mean <= 0:
+            return 0.0
+        if self.kind == "uniform":
+            return max(
+                0.0, rng.uniform(self.mean - self.spread, self.mean + self.spread)
+            )
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.mean)
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.mean), self.spread)
+        return self.mean
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Parses "<kind>:<mean>[,<spread>]", e.g. "lognormal:0.2,0.5" or "constant:0.05".
+        """
+        kind, _, params = spec.partition(":")
+        values = [float(value) for value in params.split(",") if value]
+        return cls(kind, *values)
+
+
+@dataclass
+class StandInConfig:
+    """
+    Fault injection settings for the stand-in server.
+
+    :param latency: Delay added before every response.
+    :param error_rate: Fraction of requests answered with a 503.
+    :param rate_limit_rate: Fraction of requests answered with a 429.
+    :param retry_after: Retry-After seconds sent with 429 responses.
+    :param block_after: Serve the Incapsula interstitial once this many requests
+        have been answered. None never blocks.
+    :param block_for: Number of requests blocked before serving pages again.
+        None blocks for the rest of the server's life.
+    :param seed: Seed for the latency and fault random draws.
+    """
+
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: Optional[float] = 1.0
+    block_after: Optional[int] = None
+    block_for: Optional[int] = None
+    seed: Optional[int] = None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def do_GET(self):
+        status, headers, body = self.server.standin.respond(self.path)
+        self.send_response(status)
+        headers = {"Content-Type": "text/html; charset=utf-8", **headers}
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, standin: "ColesStandIn"):
+        super().__init__(address, StandInHandler)
+        self.standin = standin
+
+    def handle_error(self, request, client_address):
+        # Clients reading only the start of a page drop the connection mid-body.
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            logger.debug("Client %s dropped the connection", client_address)
+            return
+        super().handle_error(request, client_address)
+
+
+class ColesStandIn:
+    """
+    A local HTTP server imitating the Coles pages the crawlers fetch.
+
+    - `/browse/...` and `/on-special...`: the browse fixture, with product links made
+      unique per page, until `noOfResults` is exhausted; later pages have no tiles.
+    - `/product/...`: the product fixture.
+    - `/_next/data/<buildId>/....json`: the props of the page above, as JSON. Other
+      buildIds 404, as the site's do after a deploy.
+    - anything else: 404.
+    """
+
+    def __init__(
+        self,
+        config: Optional[StandInConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        browse_path: str = BROWSE_FIXTURE,
+        product_path: str = PRODUCT_FIXTURE,
+    ):
+        """
+        :param port: Port to listen on; 0 picks a free one (see `base_url`).
+        """
+        self.config = config or StandInConfig()
+        self.rng = random.Random(self.config.seed)
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+        with open(browse_path, "rb") as src:
+            self.browse_page = src.read()
+        with open(product_path, "rb") as src:
+            self.product_page = src.read()
+
+        browse_state = extract_next_data(self.browse_page) or {}
+        self.browse_props = browse_state.get("props", {}).get("pageProps", {})
+        self.product_props = (
+            (extract_next_data(self.product_page) or {})
+            .get("props", {})
+            .get("pageProps", {})
+        )
+        # Data routes are served under this buildId, which the HTML pages embed;
+        # change it to simulate a deploy.
+        self.fixture_build_id = browse_state.get("buildId")
+        self.build_id = self.fixture_build_id
+        # The fixtures were saved from different builds; a site serves one.
+        self.product_page = BUILD_ID_PATTERN.sub(
+            b'"buildId":"%s"' % self.fixture_build_id.encode(), self.product_page
+        )
+
+        search_results = self.browse_props.get("searchResults", {})
+        page_size = search_results.get("pageSize") or 48
+        self.last_page = math.ceil(
+            search_results.get("noOfResults", page_size) / page_size
+        )
+
+        # Rendering a page copies the whole fixture, so recent pages are kept, but
+        # only a bounded number per stand-in.
+        self.browse_page_for = lru_cache(maxsize=PAGE_CACHE_SIZE)(self._browse_page_for)
+        self.browse_data_for = lru_cache(maxsize=PAGE_CACHE_SIZE)(self._browse_data_for)
+
+        self.server = StandInServer((host, port), self)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ColesStandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Coles stand-in listening on %s", self.base_url)
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "ColesStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _draw(self) -> Tuple[float, float, int]:
+        with self._lock:
+            self.requests_served += 1
+            return (
+                self.config.latency.sample(self.rng),
+                self.rng.random(),
+                self.requests_served,
+            )
+
+    def _blocked(self, count: int) -> bool:
+        block_after = self.config.block_after
+        if block_after is None or count <= block_after:
+            return False
+        return (
+            self.config.block_for is None
+            or count <= block_after + self.config.block_for
+        )
+
+    def respond(self, path: str) -> Tuple[int, dict, bytes]:
+        """
+        Builds the response for a request path, applying the configured faults.
+
+        :return: Status code, extra headers and body.
+        """
+        delay, draw, count = self._draw()
+        if delay:
+            time.sleep(delay)
+
+        if self._blocked(count):
+            return 200, {}, INTERSTITIAL_PAGE
+        if draw < self.config.rate_limit_rate:
+            headers = {}
+            if self.config.retry_after is not None:
+                headers["Retry-After"] = f"{self.config.retry_after:g}"
+            return 429, headers, b"Too Many Requests"
+        if draw < self.config.rate_limit_rate + self.config.error_rate:
+            return 503, {}, b"Service Unavailable"
+
+        parsed = urlparse(path)
+        data_route = DATA_ROUTE_PATTERN.match(parsed.path)
+        if data_route:
+            return self.respond_data_route(
+                parsed.path, data_route.group("path"), parsed.query
+            )
+        if parsed.path.startswith(("/browse", "/on-special")):
+            page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+            return 200, {}, self.with_build_id(self.browse_page_for(page))
+        if parsed.path.startswith("/product/"):
+            return 200, {}, self.with_build_id(self.product_page)
+        return 404, {}, b"Not Found"
+
+    def with_build_id(self, page: bytes) -> bytes:
+        """
+        A fixture page with its page state naming the current buildId.
+        """
+        if self.build_id == self.fixture_build_id:
+            return page
+        return page.replace(
+            b'"buildId":"%s"' % self.fixture_build_id.encode(),
+            b'"buildId":"%s"' % self.build_id.encode(),
+        )
+
+    def _browse_page_for(self, page: int) -> bytes:
+        """
+        The browse fixture with its product ids suffixed by the page number, so each
+        page lists distinct products; pages past the last one have no products.
+        """
+        if page < 1 or page > self.last_page:
+            return EMPTY_PAGE
+        return PRODUCT_HREF_PATTERN.sub(
+            lambda m: m.group(1) + m.group(2) + b"%03d" % page + b'"', self.browse_page
+        )
+
+    def respond_data_route(
+        self, path: str, page_path: str, query: str
+    ) -> Tuple[int, dict, bytes]:
+        """
+        Serves the props of a page the way its Next.js data route does.
+        """
+        if not path.startswith(f"/_next/data/{self.build_id}/"):
+            return 404, {}, b"Not Found"
+        if page_path.startswith(("/browse", "/on-special")):
+            page = int(parse_qs(query).get("page", ["1"])[0])
+            body = self.browse_data_for(page)
+        elif page_path.startswith("/product/"):
+            body = json.dumps({"pageProps": self.product_props, "__N_SSP": True})
+        else:
+            return 404, {}, b"Not Found"
+        return 200, {"Content-Type": "application/json"}, body.encode("utf-8")
+
+    def _browse_data_for(self, page: int) -> str:
+        """
+        The browse fixture's props with its product ids suffixed by the page number,
+        like `_browse_page_for`.
+        """
+        props = copy.deepcopy(self.browse_props)
+        results = props.get("searchResults", {}).get("results", [])
+        if page < 1 or page > self.last_page:
+            results.clear()
+        for result in results:
+            if result.get("_type") == "PRODUCT":
+                result["id"] = int(f"{result['id']}{page:03d}")
+        return json.dumps({"pageProps": props, "__N_SSP": True})
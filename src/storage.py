@@ -0,0 +1,345 @@
+"""
+Dataset storage.
+
+Reads and writes the scraped datasets as CSV, Parquet or Arrow IPC. The columnar
+formats are written with an explicit schema per dataset, dictionary-encoded
+low-cardinality columns and zstd compression, so they load with their types and
+much faster than CSV. CSV is read and written exactly as before, and remains
+available as an export format.
+
+Datasets are named by their CSV path (e.g. `data/raw/products.csv`); the store swaps
+the extension for its format. A dataset is read from its most recently written
+copy, in whichever format that is, so switching formats needs no migration step and
+a copy left over from before a switch is never read in place of newer data. Exports
+are written under `data/export/`, where the store does not read datasets from.
+
+The format is chosen with the COLES_STORAGE_FORMAT environment variable ("csv",
+"parquet" or "arrow"). Parquet and Arrow IPC require pyarrow.
+
+Typical usage example:
+>>> store = DatasetStore(StorageFormat.PARQUET)
+>>> store.write(df, "data/raw/products.csv", RAW_PRODUCTS_SCHEMA)
+'data/raw/products.parquet'
+>>> store.read("data/raw/products.csv")
+"""
+
+import logging
+import os
+from enum import Enum
+from typing import Dict, Iterator, List, Mapping, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_ENV = "COLES_STORAGE_FORMAT"
+COMPRESSION = "zstd"
+CHUNK_ROWS = 100_000
+DATA_DIR = "data"
+EXPORT_DIR = os.path.join(DATA_DIR, "export")
+
+
+class StorageFormat(Enum):
+    CSV = "csv"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+    @property
+    def extension(self) -> str:
+        return "." + self.value
+
+
+class ColumnType(Enum):
+    STRING = "string"
+    DICTIONARY = "dictionary"  # Strings with few distinct values
+    FLOAT = "float"
+    BOOL = "bool"
+    TIMESTAMP = "timestamp"  # Stored in UTC
+
+
+Schema = Mapping[str, ColumnType]
+
+# Columns of `data/raw/products.csv` and `data/archive/products_dropped.csv`.
+RAW_PRODUCTS_SCHEMA: Schema = {
+    "name": ColumnType.STRING,
+    "url": ColumnType.STRING,
+    "price": ColumnType.STRING,
+    "price_calc_method": ColumnType.STRING,
+    "image_url": ColumnType.STRING,
+    "was_price": ColumnType.STRING,
+    "discount_percentage": ColumnType.DICTIONARY,
+    "special_type": ColumnType.DICTIONARY,
+    "is_on_special": ColumnType.BOOL,
+    "price_cents": ColumnType.FLOAT,
+    "was_price_cents": ColumnType.FLOAT,
+    "unit_price_cents": ColumnType.FLOAT,
+    "unit_quantity": ColumnType.FLOAT,
+    "unit": ColumnType.DICTIONARY,
+    "category": ColumnType.DICTIONARY,
+    "date": ColumnType.DICTIONARY,
+    "timestamp": ColumnType.TIMESTAMP,
+}
+
+# Columns of `data/processed/products.csv` and the discount datasets.
+PROCESSED_PRODUCTS_SCHEMA: Schema = {
+    "product_id": ColumnType.STRING,
+    "product_name": ColumnType.STRING,
+    "category": ColumnType.DICTIONARY,
+    "size": ColumnType.DICTIONARY,
+    "display_price": ColumnType.STRING,
+    "current_price_aud": ColumnType.FLOAT,
+    "unit_price_aud": ColumnType.FLOAT,
+    "unit_of_measure": ColumnType.DICTIONARY,
+    "previous_price_aud": ColumnType.FLOAT,
+    "pricing_details": ColumnType.STRING,
+    "previous_price_date": ColumnType.DICTIONARY,
+    "product_url": ColumnType.STRING,
+    "product_image_url": ColumnType.STRING,
+    "scrape_date": ColumnType.DICTIONARY,
+    "scrape_timestamp": ColumnType.TIMESTAMP,
+    "base_unit_price_aud": ColumnType.FLOAT,
+    "base_unit": ColumnType.DICTIONARY,
+    "is_comparable": ColumnType.BOOL,
+}
+DISCOUNTS_SCHEMA = PROCESSED_PRODUCTS_SCHEMA
+
+
+def _as_strings(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.infer_dtype(
+        values, skipna=True
+    ) in ("string", "empty"):
+        return values
+    strings = values.astype(object)
+    present = values.notna()
+    strings[present] = strings[present].astype(str)
+    strings[~present] = None
+    return strings
+
+
+def apply_schema(df: pd.DataFrame, schema: Schema) -> pd.DataFrame:
+    """
+    Converts the schema's columns of a frame to their types. Columns not in the
+    schema, and columns already of their type, are left as they are.
+    """
+    df = df.copy(deep=False)
+    for column, column_type in schema.items():
+        if column not in df:
+            continue
+        values = df[column]
+        if column_type in (ColumnType.STRING, ColumnType.DICTIONARY):
+            df[column] = _as_strings(values)
+        elif column_type == ColumnType.FLOAT:
+            df[column] = pd.to_numeric(values, errors="coerce").astype("float64")
+        elif column_type == ColumnType.BOOL and values.dtype != bool:
+            df[column] = values.astype(str).eq("True")
+        elif column_type == ColumnType.TIMESTAMP and not isinstance(
+            values.dtype, pd.DatetimeTZDtype
+        ):
+            df[column] = pd.to_datetime(
+                values, utc=True, errors="coerce", format="ISO8601"
+            )
+    return df
+
+
+def arrow_table(df: pd.DataFrame, schema: Optional[Schema] = None):
+    """
+    Converts a frame to an Arrow table, with the schema's types for its columns and
+    inferred types for the others.
+    """
+    import pyarrow as pa
+
+    arrow_types = {
+        ColumnType.STRING: pa.string(),
+        ColumnType.DICTIONARY: pa.dictionary(pa.int32(), pa.string()),
+        ColumnType.FLOAT: pa.float64(),
+        ColumnType.BOOL: pa.bool_(),
+        ColumnType.TIMESTAMP: pa.timestamp("us", tz="UTC"),
+    }
+    schema = schema or {}
+    df = apply_schema(df, schema)
+    others = [column for column in df.columns if column not in schema]
+    inferred = pa.Schema.from_pandas(df[others], preserve_index=False)
+    fields = [
+        pa.field(
+            column,
+            (
+                arrow_types[schema[column]]
+                if column in schema
+                else inferred.field(column).type
+            ),
+        )
+        for column in df.columns
+    ]
+    return pa.Table.from_pandas(df, schema=pa.schema(fields), preserve_index=False)
+
+
+class DatasetStore:
+    """
+    Reads and writes datasets in one storage format.
+    """
+
+    def __init__(self, format: StorageFormat = StorageFormat.CSV):
+        self.format = format
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "DatasetStore":
+        """
+        Configures a store from COLES_STORAGE_FORMAT, defaulting to CSV.
+        """
+        name = (environ.get(FORMAT_ENV) or StorageFormat.CSV.value).lower()
+        return cls(StorageFormat(name))
+
+    def path(self, path: str, format: Optional[StorageFormat] = None) -> str:
+        """
+        The file a dataset is stored in, in this store's format unless given.
+        """
+        format = format or self.format
+        return os.path.splitext(path)[0] + format.extension
+
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        The most recently modified existing file of a dataset, preferring this
+        store's format between files modified at the same time, or None.
+        """
+        candidates = []
+        for format in StorageFormat:
+            candidate = self.path(path, format)
+            try:
+                modified = os.stat(candidate).st_mtime_ns
+            except OSError:
+                continue
+            candidates.append((modified, format == self.format, candidate))
+        if not candidates:
+            return None
+        return max(candidates)[2]
+
+    def exists(self, path: str) -> bool:
+        return self.resolve(path) is not None
+
+    @staticmethod
+    def _format_of(path: str) -> StorageFormat:
+        return StorageFormat(os.path.splitext(path)[1].lstrip(".").lower())
+
+    def read(
+        self,
+        path: str,
+        columns: Optional[List[str]] = None,
+        dtype: Optional[Union[type, Dict[str, type]]] = None,
+    ) -> pd.DataFrame:
+        """
+        Reads a dataset, from whichever format it exists in.
+
+        :param columns: Only read these columns.
+        :param dtype: Column types to parse CSV with; columnar formats keep the
+            types they were written with.
+        :raises FileNotFoundError: If the dataset exists in no format.
+        """
+        resolved = self.resolve(path)
+        if resolved is None:
+            raise FileNotFoundError(path)
+
+        format = self._format_of(resolved)
+        if format == StorageFormat.CSV:
+            return pd.read_csv(resolved, usecols=columns, dtype=dtype)
+        if format == StorageFormat.PARQUET:
+            return pd.read_parquet(resolved, columns=columns)
+        return pd.read_feather(resolved, columns=columns)
+
+    def iter_chunks(
+        self, path: str, chunk_rows: int = CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Streams a dataset in chunks of at most `chunk_rows` rows. CSV columns are
+        read as strings.
+        """
+        resolved = self.resolve(path)
+        if resolved is None:
+            raise FileNotFoundError(path)
+
+        format = self._format_of(resolved)
+        if format == StorageFormat.CSV:
+            yield from pd.read_csv(resolved, chunksize=chunk_rows, dtype=str)
+        elif format == StorageFormat.PARQUET:
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(resolved).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        else:
+            import pyarrow as pa
+
+            with pa.memory_map(resolved) as source:
+                reader = pa.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    table = pa.Table.from_batches([reader.get_batch(index)])
+                    for offset in range(0, table.num_rows, chunk_rows):
+                        yield table.slice(offset, chunk_rows).to_pandas()
+
+    def write(
+        self,
+        df: pd.DataFrame,
+        path: str,
+        schema: Optional[Schema] = None,
+        format: Optional[StorageFormat] = None,
+    ) -> str:
+        """
+        Writes a dataset, replacing it, in this store's format unless given.
+
+        :param schema: Types of the dataset's columns in columnar formats.
+        :return: The file written.
+        """
+        format = format or self.format
+        target = self.path(path, format)
+        directory = os.path.dirname(target)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if format == StorageFormat.CSV:
+            df.to_csv(target, index=False)
+            return target
+
+        table = arrow_table(df, schema)
+        # Write then rename, so readers never see a half-written file.
+        tmp_path = target + ".tmp"
+        if format == StorageFormat.PARQUET:
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, tmp_path, compression=COMPRESSION)
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, tmp_path, compression=COMPRESSION)
+        os.replace(tmp_path, target)
+        return target
+
+    def append(
+        self, df: pd.DataFrame, path: str, schema: Optional[Schema] = None
+    ) -> str:
+        """
+        Adds rows to a dataset, creating it if missing.
+
+        :return: The file written.
+        """
+        if self.exists(path):
+            df = pd.concat([self.read(path), df], ignore_index=True)
+        return self.write(df, path, schema)
+
+    def export(
+        self, path: str, format: StorageFormat, directory: str = EXPORT_DIR
+    ) -> str:
+        """
+        Writes a copy of a dataset in another format, e.g. CSV for sharing. The copy
+        goes under `directory`, at the dataset's path relative to `data/`, so it is
+        never read back as the dataset.
+
+        :return: The file written.
+        """
+        relative = os.path.relpath(path, DATA_DIR)
+        if relative.startswith(os.pardir):
+            relative = os.path.basename(path)
+        return self.write(
+            self.read(path), os.path.join(directory, relative), format=format
+        )
+
+
+# Process-wide store used by the scripts by default.
+STORAGE = DatasetStore.from_env()
@@ -0,0 +1,110 @@
+"""
+Unit price normalisation.
+
+Unit prices are quoted per whatever unit Coles displays ("per 100g", "per 1kg",
+"per 100mL", "per 1ea"), so they can't be compared across products as they are.
+This converts them to canonical base units: per kg, per L, per m or per each.
+
+The conversion is column-wise. A column holds only a few dozen distinct units, so
+each distinct unit is parsed once and every row is converted with NumPy array
+operations, which keeps millions of historical rows to a fraction of a second.
+Units that can't be converted (e.g. "per 100 sheets") are flagged as incomparable.
+
+Typical usage example:
+>>> normalise_unit_prices(df["unit_price_aud"], df["unit_of_measure"])
+>>> df = add_base_unit_prices(df)  # as a stage of `process_product_data`
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.prices import Unit
+
+# Base unit of each unit, and how many base units one unit is.
+BASE_UNITS: Dict[Unit, Tuple[Unit, float]] = {
+    Unit.GRAM: (Unit.KILOGRAM, 0.001),
+    Unit.KILOGRAM: (Unit.KILOGRAM, 1.0),
+    Unit.MILLILITRE: (Unit.LITRE, 0.001),
+    Unit.LITRE: (Unit.LITRE, 1.0),
+    Unit.METRE: (Unit.METRE, 1.0),
+    Unit.EACH: (Unit.EACH, 1.0),
+}
+BASE_UNIT_LABELS = list(dict.fromkeys(base.value for base, _ in BASE_UNITS.values()))
+
+# Columns added by `add_base_unit_prices`.
+BASE_UNIT_COLUMNS = ["base_unit_price_aud", "base_unit", "is_comparable"]
+
+UNIT_OF_MEASURE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)?\s*([A-Za-z]+)\s*$")
+
+
+def parse_unit_of_measure(text: Optional[str]) -> Optional[Tuple[float, Unit]]:
+    """
+    Parses a unit of measure such as "100g", "1L" or "kg".
+
+    :return: The quantity and unit, or None if the unit is unknown.
+    """
+    match = UNIT_OF_MEASURE_PATTERN.match(text) if isinstance(text, str) else None
+    unit = Unit.parse(match.group(2)) if match else None
+    if unit is None:
+        return None
+    return float(match.group(1) or 1), unit
+
+
+def normalise_unit_prices(
+    unit_prices: pd.Series, units_of_measure: pd.Series
+) -> pd.DataFrame:
+    """
+    Converts unit prices to prices per base unit, e.g. $1.34 per 100g to $13.40
+    per kg.
+
+    :param unit_prices: Unit prices in AUD.
+    :param units_of_measure: The units they are quoted per, e.g. "100g".
+    :return: Frame with the index of `unit_prices` and `BASE_UNIT_COLUMNS`:
+        the price per base unit, the base unit ("kg", "L", "m" or "ea"), and
+        whether the row can be compared with others of its base unit.
+    """
+    codes, uniques = pd.factorize(units_of_measure, sort=False)
+
+    # One slot per distinct unit, plus a trailing one that missing units (code
+    # -1) pick up.
+    base_units_per_unit = np.full(len(uniques) + 1, np.nan)
+    base_codes = np.full(len(uniques) + 1, -1, dtype=np.int8)
+    for index, text in enumerate(uniques):
+        parsed = parse_unit_of_measure(text)
+        if parsed is None:
+            continue
+        quantity, unit = parsed
+        base, factor = BASE_UNITS[unit]
+        base_units_per_unit[index] = quantity * factor
+        base_codes[index] = BASE_UNIT_LABELS.index(base.value)
+
+    prices = pd.to_numeric(unit_prices, errors="coerce").to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base_prices = prices / base_units_per_unit[codes]
+    return pd.DataFrame(
+        {
+            "base_unit_price_aud": base_prices.round(4),
+            "base_unit": pd.Categorical.from_codes(
+                base_codes[codes], categories=BASE_UNIT_LABELS
+            ),
+            "is_comparable": ~np.isnan(base_prices),
+        },
+        index=unit_prices.index,
+    )
+
+
+def add_base_unit_prices(
+    df: pd.DataFrame,
+    price_column: str = "unit_price_aud",
+    unit_column: str = "unit_of_measure",
+) -> pd.DataFrame:
+    """
+    Pipeline stage adding `BASE_UNIT_COLUMNS` to a frame of processed products.
+
+    :return: A copy of the frame with the columns added (or replaced).
+    """
+    normalised = normalise_unit_prices(df[price_column], df[unit_column])
+    return df.drop(columns=BASE_UNIT_COLUMNS, errors="ignore").join(normalised)
@@ -1,5 +1,4 @@
 import undetected_chromedriver as uc
-from seleniumwire.undetected_chromedriver.v2 import Chrome, ChromeOptions
 
 
 def initialize_driver(headless=False, implicit_wait: int = None):
@@ -22,6 +21,9 @@ def initialize_driver(headless=False, implicit_wait: int = None):
 
 
 def init_seleniumwire_webdriver(*args):
+    # seleniumwire is only needed for this driver, not for `initialize_driver`.
+    from seleniumwire.undetected_chromedriver.v2 import Chrome, ChromeOptions
+
     chrome_options = ChromeOptions()
     chrome_options.add_argument("--log-level=3")
     chrome_options.add_argument("--ignore-certificate-errors")
@@ -0,0 +1,53 @@
+"""
+Tests for ColesCategoryScraper.
+"""
+
+import pytest
+
+from src.models import Category
+from src.scrapers import ColesCategoryScraper
+
+TEST_HTML_FILEPATH = "tests/assets/coles-browse-dairy-eggs-fridge-page-4.html"
+EXPECTED_CATEGORY_COUNT = 16  # 17 listed, "tobacco" is excluded by the page state
+EXPECTED_DAIRY_SUBCATEGORY_COUNT = 15
+
+
+@pytest.fixture(scope="module")
+def html_content():
+    filepath = TEST_HTML_FILEPATH
+    with open(filepath, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def test_get_categories(html_content):
+    scraper = ColesCategoryScraper(html_content)
+    categories = scraper.get_categories()
+
+    assert len(categories) == EXPECTED_CATEGORY_COUNT
+    assert all(isinstance(category, Category) for category in categories)
+    assert "tobacco" not in [category.slug for category in categories]
+
+    dairy = next(c for c in categories if c.slug == "dairy-eggs-fridge")
+    assert dairy.name == "Dairy, Eggs & Fridge"
+    assert dairy.url == "https://www.coles.com.au/browse/dairy-eggs-fridge"
+    assert dairy.level == 1
+    assert dairy.product_count == 2344
+    assert len(dairy.subcategories) == EXPECTED_DAIRY_SUBCATEGORY_COUNT
+
+    cheese = next(c for c in dairy.subcategories if c.slug == "cheese")
+    assert cheese.url == "https://www.coles.com.au/browse/dairy-eggs-fridge/cheese"
+    assert cheese.level == 2
+    assert cheese.subcategories[0].level == 3
+
+
+def test_get_categories_without_html_parse(html_content):
+    scraper = ColesCategoryScraper(html_content)
+    scraper.get_categories()
+
+    # The tree comes from the embedded page state alone.
+    assert scraper._soup is None
+
+
+def test_get_categories_missing_state():
+    scraper = ColesCategoryScraper("<html><body>No state here</body></html>")
+    assert scraper.get_categories() == []
@@ -4,7 +4,7 @@ Tests for common scraper methods.
 
 from bs4 import BeautifulSoup, Tag
 
-from src.common import HtmlScraper
+from src.common import HtmlScraper, declared_encoding, extract_embedded_json
 
 
 def get_soup(html: str) -> Tag:
@@ -95,3 +95,34 @@ def test_get_all_attributes_with_missing():
     result = HtmlScraper.get_all_attributes(div_tag, "a", "href", class_="btn")
     # The second <a> tag has no 'href', so its value should be None.
     assert result == ["/link1", None, "/link3"]
+
+
+def test_extract_embedded_json():
+    html = (
+        '<script type="application/ld+json">{"@type": "Product", "sku": 1}</script>'
+        '<script type="application/ld+json">not json</script>'
+        '<script id="__NEXT_DATA__" type="application/json">{"page": "/"}</script>'
+    )
+    next_data, ld_json = extract_embedded_json(html)
+    assert next_data == {"page": "/"}
+    assert ld_json == [{"@type": "Product", "sku": 1}]
+
+
+def test_extract_embedded_json_not_found():
+    assert extract_embedded_json("<html></html>") == (None, [])
+
+
+def test_declared_encoding():
+    assert declared_encoding({"Content-Type": "text/html; charset=UTF-8"}) == "utf-8"
+    assert declared_encoding({"content-type": 'text/html; charset="latin-1"'}) == (
+        "iso8859-1"
+    )
+    assert declared_encoding({"Content-Type": "text/html"}) is None
+    assert declared_encoding({"Content-Type": "text/html; charset=bogus"}) is None
+    assert declared_encoding(None) is None
+
+
+def test_scraper_decodes_with_declared_encoding():
+    html = "<p class='name'>Crème fraîche</p>".encode("cp1252")
+    scraper = HtmlScraper(html, encoding="cp1252")
+    assert scraper.get_text_content(scraper.soup, "p") == "Crème fraîche"
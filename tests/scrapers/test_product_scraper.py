@@ -4,7 +4,7 @@ Tests for ColesProductScraper.
 
 import pytest
 
-from src.models import Product
+from src.models import NutritionPanel, Product
 from src.scrapers import ColesProductScraper
 
 TEST_HTML_FILEPATH = "tests/assets/coles-appy-fizz-250ml-8060378.html"
@@ -16,6 +16,10 @@ EXPECTED_PRODUCT_DATA = {
     "retail_limit": "Retail limit: 20",
     "promotional_limit": "Promotional limit: 12",
     "product_code": "Code: 8060378",
+    # The page state in the fixture is for another product, so only the JSON-LD
+    # price and the store are read from the embedded JSON.
+    "price_cents": 250,
+    "store_id": "0584",
 }
 
 
@@ -32,3 +36,52 @@ def test_get_product(html_content):
 
     assert isinstance(product, Product)
     assert product == Product(**EXPECTED_PRODUCT_DATA)
+
+
+def test_get_product_from_page_state(html_content):
+    # Make the JSON-LD block describe the product in the page state.
+    html_content = html_content.replace('"sku":8060378', '"sku":6433306')
+    scraper = ColesProductScraper(html_content)
+    product = scraper.get_product()
+
+    assert scraper._soup is None  # the HTML was never parsed
+    assert product.brand_name == "A+ Hosan"
+    assert product.brand_url == "/brands/a-hosan-4250764912"
+    assert product.categories == [
+        "Home",
+        "All categories",
+        "Pantry",
+        "International foods",
+        "Asian",
+    ]
+    assert product.retail_limit == "Retail limit: 20"
+    assert product.product_code == "Code: 6433306"
+    assert product.price_cents == 90
+    assert product.was_price_cents == 100
+    assert product.unit_price_cents == 2250
+    assert product.unit_of_measure == "100g"
+    assert product.store_id == "0584"
+    assert product.nutritional_claims == []
+    assert isinstance(product.nutrition, NutritionPanel)
+    assert product.nutrition.serving_size == "4g"
+    assert product.nutrition.breakdown["Per 100g/ml"]["Energy"] == "2526kJ"
+
+
+@pytest.mark.parametrize(
+    "unit, expected",
+    [
+        ({"ofMeasureQuantity": 100, "ofMeasureUnits": "g"}, "100g"),
+        ({"ofMeasureUnits": "KG"}, "1kg"),
+        ({"ofMeasureQuantity": 1, "ofMeasureUnits": "kg"}, "1kg"),
+        ({"ofMeasureQuantity": 100, "ofMeasureUnits": "ml"}, "100mL"),
+        ({"ofMeasureQuantity": 1, "ofMeasureUnits": "each"}, "1ea"),
+        # Units that Unit does not know are kept as the page spells them.
+        ({"ofMeasureQuantity": 100, "ofMeasureUnits": "sheets"}, "100sheets"),
+        ({}, None),
+    ],
+)
+def test_page_state_unit_of_measure_is_normalised(unit, expected):
+    state = {"id": 1, "name": "Tissues", "pricing": {"now": 3, "unit": unit}}
+    product = ColesProductScraper.product_from_page_props({"product": state})
+
+    assert product.unit_of_measure == expected
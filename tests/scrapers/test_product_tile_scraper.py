@@ -6,6 +6,7 @@ import bs4
 import pytest
 
 from src.models import ProductTile
+from src.prices import Unit
 from src.scrapers import ColesProductTileScraper
 
 TEST_HTML_FILEPATH = "tests/assets/coles-browse-dairy-eggs-fridge-page-4.html"
@@ -56,3 +57,24 @@ def test_find_all_product_tiles(html_content):
 
     for tile in tiles:
         assert isinstance(tile, bs4.element.Tag)
+
+
+def test_typed_prices_from_page_state(html_content):
+    products = ColesProductTileScraper(html_content).get_all_products()
+    by_calc_method = {product.price_calc_method: product for product in products}
+
+    special = by_calc_method["$0.48 per 100gWas $4.90 on Sep 2024"]
+    assert (special.price_cents, special.was_price_cents) == (475, 490)
+    assert (special.unit_quantity, special.unit) == (100, Unit.GRAM)
+    # The page state truncates this unit price to $2.42; the displayed one is kept.
+    assert by_calc_method["$2.43 per 1L"].unit_price_cents == 243
+    assert all(product.unit is not None for product in products)
+
+
+def test_tiles_from_page_props_match_html_tiles(html_content):
+    scraper = ColesProductTileScraper(html_content)
+    page_props = scraper.next_data["props"]["pageProps"]
+
+    assert ColesProductTileScraper.tiles_from_page_props(page_props) == (
+        scraper.get_all_products()
+    )
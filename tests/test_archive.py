@@ -0,0 +1,115 @@
+"""
+Tests for the raw page archive.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from scripts.reparse_pages import reparse_browse_pages
+from src.archive import PageArchive
+from src.endpoints import public_url
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry
+from src.nextdata import NextDataClient
+from src.ratelimit import AdaptiveRateLimiter
+from src.standin import ColesStandIn
+
+pytest.importorskip("zstandard")
+
+BROWSE_PAGE = "tests/assets/coles-browse-dairy-eggs-fridge-page-4.html"
+PRODUCT_PAGE = "tests/assets/coles-appy-fizz-250ml-8060378.html"
+
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_put_get_and_dedupe(tmp_path):
+    url = "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+    body = read(PRODUCT_PAGE)
+    day_1 = datetime(2024, 10, 1, tzinfo=timezone.utc)
+    day_2 = datetime(2024, 10, 2, tzinfo=timezone.utc)
+
+    with PageArchive(str(tmp_path)) as archive:
+        archive.put(url, body, fetched_at=day_1, headers={"etag": "a"})
+        # Fetched from a mirror, with the same body: stored under the public URL.
+        archive.put("http://127.0.0.1:8000/product/appy-fizz-250ml-8060378", body)
+        archive.put(url, b"changed", fetched_at=day_2)
+
+        stats = archive.stats()
+        assert (stats["pages"], stats["bodies"]) == (3, 2)
+        assert stats["stored_bytes"] < stats["raw_bytes"] / 4
+
+        first = archive.get(url, at=datetime(2024, 10, 1, 12, tzinfo=timezone.utc))
+        assert first.body == body
+        assert first.headers == {"etag": "a"}
+        assert first.fetched_at == "2024-10-01T00:00:00"
+        assert archive.get(url, at=day_2).body == b"changed"
+        assert archive.get(url, at=datetime(2024, 9, 1)) is None
+
+
+def test_dictionary_and_segments_survive_reopening(tmp_path):
+    bodies = [
+        read(BROWSE_PAGE).replace(b"$9.50", f"${i}.50".encode()) for i in range(8)
+    ]
+    bodies += [b"x" * 1000 + str(i).encode() for i in range(8)]
+
+    with PageArchive(str(tmp_path), segment_bytes=1, train_after=8) as archive:
+        for i, body in enumerate(bodies):
+            archive.put(f"https://www.coles.com.au/browse/dairy?page={i}", body)
+        assert archive.dictionary_id != 0
+        assert archive.segment == len(bodies) - 1
+
+    with PageArchive(str(tmp_path)) as archive:
+        pages = list(archive.iter_pages(url_prefix="https://www.coles.com.au/browse/"))
+        assert [page.body for page in pages] == bodies
+
+
+def test_fetcher_archives_pages_for_reparsing(tmp_path, monkeypatch):
+    class FakeResponse:
+        status_code = 200
+        headers = {"content-type": "text/html"}
+        content = read(BROWSE_PAGE)
+
+        def raise_for_status(self):
+            pass
+
+    with PageArchive(str(tmp_path)) as archive:
+        fetcher = ColesPageFetcher(
+            headers={"cookie": "test"}, sleep_func=lambda _: None, archive=archive
+        )
+        monkeypatch.setattr(fetcher.session, "get", lambda url, **_: FakeResponse())
+        fetcher.get("https://www.coles.com.au/browse/dairy-eggs-fridge?page=4")
+
+        df = reparse_browse_pages(archive)
+        assert len(df) == 58
+        assert set(df["page_url"]) == {
+            "https://www.coles.com.au/browse/dairy-eggs-fridge?page=4"
+        }
+        assert df["unit"].iloc[0] == "kg"
+
+
+def test_archived_pages_are_whole_and_data_routes_reparse(tmp_path):
+    browse_url = "https://www.coles.com.au/browse/dairy-eggs-fridge?page=2"
+    with ColesStandIn() as standin, PageArchive(str(tmp_path)) as archive:
+        fetcher = ColesPageFetcher(
+            headers={"cookie": "stand-in"},
+            sleep_func=lambda _: None,
+            rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+            metrics=MetricsRegistry(),
+            base_url=standin.base_url,
+            archive=archive,
+            stop_after_page_state=True,
+        )
+        response = fetcher.get(browse_url)
+        assert archive.get(browse_url).body == standin.browse_page_for(2)
+        assert not getattr(response, "truncated", False)
+
+        NextDataClient(fetcher).get_tiles(browse_url)
+        df = reparse_browse_pages(archive)
+
+    assert len(df) == 2 * 58
+    (data_route,) = set(df["page_url"]) - {browse_url}
+    assert data_route.startswith(public_url("/_next/data/"))
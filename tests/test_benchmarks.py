@@ -0,0 +1,73 @@
+"""
+Tests for the benchmark harness.
+"""
+
+from benchmarks.harness import (
+    Benchmark,
+    BenchmarkResult,
+    find_regressions,
+    format_report,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+)
+
+# --- Helpers for Testing --- #
+
+
+def make_result(name, ops_per_sec):
+    return BenchmarkResult(
+        name=name,
+        ops_per_sec=ops_per_sec,
+        seconds_per_op=1 / ops_per_sec,
+        iterations=1,
+        peak_memory_mb=0.0,
+    )
+
+
+# --- Tests --- #
+
+
+def test_run_benchmark_uses_setup_state_and_tears_down():
+    calls = []
+    benchmark = Benchmark(
+        name="append",
+        setup=lambda: calls,
+        func=lambda state: state.append(bytearray(1024 * 1024)),
+        teardown=lambda state: state.clear(),
+    )
+
+    result = run_benchmark(benchmark, min_time=0, repeat=2)
+
+    assert result.name == "append"
+    assert result.iterations == 1
+    assert result.ops_per_sec > 0
+    assert result.peak_memory_mb >= 1
+    assert calls == []
+
+
+def test_find_regressions_over_threshold():
+    baseline = {
+        "fast": {"ops_per_sec": 100.0},
+        "slow": {"ops_per_sec": 100.0},
+    }
+    results = [
+        make_result("fast", 95.0),
+        make_result("slow", 80.0),
+        make_result("new", 1.0),
+    ]
+
+    assert find_regressions(results, baseline, threshold=0.1) == ["slow"]
+
+
+def test_baseline_round_trip(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    assert load_baseline(path) == {}
+
+    save_baseline([make_result("parse", 10.0)], path)
+    baseline = load_baseline(path)
+
+    assert baseline["parse"]["ops_per_sec"] == 10.0
+    report = format_report([make_result("parse", 5.0)], baseline, ["parse"])
+    assert "-50.0%" in report
+    assert "REGRESSION" in report
@@ -0,0 +1,95 @@
+"""
+Tests for deriving the discount outputs from a catalogue crawl.
+"""
+
+import pytest
+
+import scripts.scrape_discounts as scrape_discounts
+from scripts.scrape_discounts import (
+    classify_special,
+    save_catalogue_discounts,
+    split_catalogue_specials,
+)
+from src.models import ProductTile
+
+# --- Helpers for Testing --- #
+
+
+def make_tile(slug, special_type=None, discount_percentage=None, on_special=True):
+    return ProductTile(
+        name=slug,
+        url=f"/product/{slug}",
+        price="$1.00",
+        special_type=special_type,
+        discount_percentage=discount_percentage,
+        is_on_special=on_special,
+    )
+
+
+CATALOGUE = [
+    make_tile("half-1", special_type="Half Price"),
+    make_tile("half-2", discount_percentage="50%"),
+    make_tile("save-1", special_type="Save $0.60"),
+    make_tile("plain-1", on_special=False),
+]
+
+
+@pytest.fixture
+def specials_site(monkeypatch):
+    """
+    Replaces the specials pages with one page per filter type, and records what
+    would be saved instead of writing files.
+    """
+    pages = {"halfprice": ["half-1", "half-2"], "special": ["save-1"]}
+    requested, saved = [], {}
+
+    def extract(fetcher, query, data_client=None):
+        requested.append((query.filter_type, query.page))
+        slugs = pages[query.filter_type] if query.page == 1 else []
+        return [make_tile(slug) for slug in slugs]
+
+    def save(products, filter_type):
+        saved[filter_type] = [product.url for product in products]
+
+    monkeypatch.setattr(scrape_discounts, "extract_discount_products", extract)
+    monkeypatch.setattr(scrape_discounts, "save_discount_products", save)
+    return pages, requested, saved
+
+
+# --- Tests --- #
+
+
+def test_classify_special():
+    assert classify_special(make_tile("a", special_type="Half Price")) == "halfprice"
+    assert classify_special(make_tile("b", discount_percentage="50%")) == "halfprice"
+    assert classify_special(make_tile("c", special_type="Save $0.60")) == "special"
+    assert classify_special(make_tile("d", on_special=False)) is None
+
+
+def test_split_catalogue_specials():
+    specials = split_catalogue_specials(CATALOGUE)
+    assert [p.name for p in specials["halfprice"]] == ["half-1", "half-2"]
+    assert [p.name for p in specials["special"]] == ["save-1"]
+
+
+def test_save_catalogue_discounts_uses_catalogue_when_covered(specials_site):
+    _, requested, saved = specials_site
+    save_catalogue_discounts(fetcher=None, products=CATALOGUE)
+
+    assert saved == {
+        "halfprice": ["/product/half-1", "/product/half-2"],
+        "special": ["/product/save-1"],
+    }
+    # Only the first page of each type is sampled for the coverage check.
+    assert requested == [("halfprice", 1), ("special", 1)]
+
+
+def test_save_catalogue_discounts_falls_back_when_not_covered(specials_site):
+    pages, requested, saved = specials_site
+    pages["special"] = ["save-1", "missed-1"]
+
+    save_catalogue_discounts(fetcher=None, products=CATALOGUE, min_coverage=0.9)
+
+    assert saved["halfprice"] == ["/product/half-1", "/product/half-2"]
+    assert saved["special"] == ["/product/save-1", "/product/missed-1"]
+    assert ("special", 2) in requested
@@ -0,0 +1,111 @@
+"""
+Tests for category discovery and caching.
+"""
+
+from src.categories import CategoryCache, discover_categories
+from src.models import Category
+
+TEST_HTML_FILEPATH = "tests/assets/coles-browse-dairy-eggs-fridge-page-4.html"
+
+# --- Helpers for Testing --- #
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeFetcher:
+    """A fake ColesPageFetcher serving the browse fixture."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    def get(self, url):
+        self.calls += 1
+        if self.fail:
+            raise ValueError("Bot detected!")
+        with open(TEST_HTML_FILEPATH, "rb") as file:
+            return FakeResponse(file.read())
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# --- Tests --- #
+
+
+def test_discover_categories_skips_campaigns():
+    categories = discover_categories(FakeFetcher())
+    slugs = [category.slug for category in categories]
+
+    assert "down-down" not in slugs
+    assert "bonus-credit-products" not in slugs
+    assert "pantry" in slugs
+    assert "drinks" in slugs
+
+
+def test_cache_roundtrip(tmp_path):
+    cache = CategoryCache(path=str(tmp_path / "categories.json"), clock=FakeClock())
+    categories = [
+        Category(
+            name="Pantry",
+            slug="pantry",
+            url="https://www.coles.com.au/browse/pantry",
+            subcategories=[
+                Category(
+                    name="Snacks",
+                    slug="snacks",
+                    url="https://www.coles.com.au/browse/pantry/snacks",
+                    level=2,
+                )
+            ],
+        )
+    ]
+    cache.save(categories)
+
+    assert cache.load() == categories
+
+
+def test_cache_get_uses_fresh_cache(tmp_path):
+    clock = FakeClock()
+    cache = CategoryCache(path=str(tmp_path / "categories.json"), clock=clock)
+    fetcher = FakeFetcher()
+
+    first = cache.get(fetcher)
+    clock.now += 60
+    second = cache.get(fetcher)
+
+    assert first == second
+    assert fetcher.calls == 1
+
+
+def test_cache_get_refreshes_after_ttl(tmp_path):
+    clock = FakeClock()
+    cache = CategoryCache(
+        path=str(tmp_path / "categories.json"), ttl_seconds=100, clock=clock
+    )
+    fetcher = FakeFetcher()
+
+    cache.get(fetcher)
+    clock.now += 101
+    cache.get(fetcher)
+
+    assert fetcher.calls == 2
+
+
+def test_cache_get_falls_back_to_stale(tmp_path):
+    clock = FakeClock()
+    cache = CategoryCache(
+        path=str(tmp_path / "categories.json"), ttl_seconds=100, clock=clock
+    )
+    categories = cache.get(FakeFetcher())
+    clock.now += 101
+
+    assert cache.get(FakeFetcher(fail=True)) == categories
@@ -0,0 +1,111 @@
+"""
+Tests for the memory-mapped product to category lookup.
+"""
+
+import os
+
+import pandas as pd
+
+from src.category_lookup import CategoryLookup
+
+# --- Helpers for Testing --- #
+
+
+def write_products(path, mapping):
+    pd.DataFrame(
+        {"product_id": list(mapping), "category": list(mapping.values())}
+    ).to_csv(path, index=False)
+
+
+def make_lookup(tmp_path):
+    return CategoryLookup(
+        products_path=str(tmp_path / "products.csv"),
+        index_path=str(tmp_path / "products.idx"),
+    )
+
+
+# --- Tests --- #
+
+
+def test_lookup_single_and_vectorised(tmp_path):
+    write_products(
+        tmp_path / "products.csv",
+        {"milk-2l": "dairy", "bread": "bakery", "apple": "fruit", "milk": "dairy"},
+    )
+    lookup = make_lookup(tmp_path)
+
+    assert len(lookup) == 4
+    assert lookup.get("bread") == "bakery"
+    assert lookup.get("missing") is None
+
+    result = lookup.map(
+        pd.Series(["milk", "milk-2l", "milk-2l-extra-long-id", None, "apple"])
+    )
+    assert result[0] == result[1] == "dairy"
+    assert pd.isna(result[2]) and pd.isna(result[3])
+    assert result[4] == "fruit"
+
+
+def test_index_is_reused_across_instances(tmp_path, monkeypatch):
+    write_products(tmp_path / "products.csv", {"bread": "bakery"})
+    assert make_lookup(tmp_path).get("bread") == "bakery"
+
+    # A new process opens the existing index instead of reading the CSV.
+    monkeypatch.setattr(pd, "read_csv", None)
+    assert make_lookup(tmp_path).get("bread") == "bakery"
+
+
+def test_index_rebuilt_when_products_change(tmp_path):
+    products_path = tmp_path / "products.csv"
+    write_products(products_path, {"bread": "bakery"})
+    lookup = make_lookup(tmp_path)
+    assert lookup.get("bread") == "bakery"
+
+    write_products(products_path, {"bread": "pantry", "rice": "pantry"})
+    stat = os.stat(products_path)
+    os.utime(products_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert lookup.get("bread") == "pantry"
+    assert lookup.get("rice") == "pantry"
+
+
+def test_missing_products_file(tmp_path):
+    lookup = make_lookup(tmp_path)
+
+    assert not lookup
+    assert lookup.map(pd.Series(["bread"])).isna().all()
+
+
+def test_rebuild_while_a_reader_has_the_index_mapped(tmp_path, monkeypatch):
+    products_path = tmp_path / "products.csv"
+    write_products(products_path, {"bread": "bakery"})
+    reader = make_lookup(tmp_path)
+    assert reader.get("bread") == "bakery"
+    mapped = reader._index.path
+
+    # As on Windows, a file mapped by the reader can't be replaced or removed.
+    def refuse_mapped(func):
+        def wrapper(*args):
+            if args[-1] == mapped:
+                raise PermissionError(f"{mapped} is mapped")
+            return func(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(os, "replace", refuse_mapped(os.replace))
+    monkeypatch.setattr(os, "remove", refuse_mapped(os.remove))
+
+    write_products(products_path, {"bread": "pantry"})
+    stat = os.stat(products_path)
+    os.utime(products_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert make_lookup(tmp_path).get("bread") == "pantry"
+    assert reader.get("bread") == "pantry"
+    assert reader._index.path != mapped
+    monkeypatch.undo()
+
+    # Once no longer mapped, the old index goes with the next rebuild.
+    write_products(products_path, {"bread": "bakery"})
+    os.utime(products_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000))
+    assert reader.get("bread") == "bakery"
+    assert len(list(tmp_path.glob("products.*.idx"))) == 1
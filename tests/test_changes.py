@@ -0,0 +1,166 @@
+"""
+Tests for price change detection between snapshots.
+"""
+
+import pandas as pd
+
+from src.changes import PriceChangeDetector, fingerprint
+
+# --- Helpers for Testing --- #
+
+
+def make_snapshot(rows, timestamp="2024-10-22T10:00:00+11:00"):
+    return pd.DataFrame(
+        [
+            {
+                "name": url,
+                "url": url,
+                "price": price,
+                "price_calc_method": None,
+                "was_price": was_price,
+                "is_on_special": was_price is not None,
+                "timestamp": timestamp,
+            }
+            for url, price, was_price in rows
+        ],
+        columns=[
+            "name",
+            "url",
+            "price",
+            "price_calc_method",
+            "was_price",
+            "is_on_special",
+            "timestamp",
+        ],
+    )
+
+
+def make_detector(tmp_path):
+    return PriceChangeDetector(
+        state_path=str(tmp_path / "state.csv"),
+        timeline_path=str(tmp_path / "timeline.csv"),
+    )
+
+
+# --- Tests --- #
+
+
+def test_fingerprint_ignores_non_price_fields():
+    a = make_snapshot([("/product/a-1", "$1.00", None)])
+    b = a.assign(name="Renamed", image_url="/img.jpg")
+    c = a.assign(price="$1.10")
+
+    assert fingerprint(a).iloc[0] == fingerprint(b).iloc[0]
+    assert fingerprint(a).iloc[0] != fingerprint(c).iloc[0]
+
+
+def test_first_snapshot_is_all_new(tmp_path):
+    detector = make_detector(tmp_path)
+    snapshot = make_snapshot(
+        [("/product/a-1", "$1.00", None), ("/product/b-2", "$2.00", None)]
+    )
+
+    changes = detector.detect(snapshot, "pantry")
+
+    assert list(changes.new["url"]) == ["/product/a-1", "/product/b-2"]
+    assert changes.changed.empty and changes.delisted.empty
+    assert list(changes.updates["url"]) == ["/product/a-1", "/product/b-2"]
+
+
+def test_detects_changed_unchanged_and_delisted(tmp_path):
+    detector = make_detector(tmp_path)
+    detector.commit(
+        detector.detect(
+            make_snapshot(
+                [
+                    ("/product/a-1", "$1.00", None),
+                    ("/product/b-2", "$2.00", None),
+                    ("/product/c-3", "$3.00", None),
+                ]
+            ),
+            "pantry",
+        )
+    )
+
+    # A fresh detector reads the committed state from disk.
+    detector = make_detector(tmp_path)
+    changes = detector.detect(
+        make_snapshot(
+            [
+                ("/product/a-1", "$1.00", None),
+                ("/product/b-2", "$1.50", "$2.00"),
+                ("/product/d-4", "$4.00", None),
+            ],
+            timestamp="2024-10-23T10:00:00+11:00",
+        ),
+        "pantry",
+    )
+
+    assert list(changes.new["url"]) == ["/product/d-4"]
+    assert list(changes.changed["url"]) == ["/product/b-2"]
+    assert list(changes.delisted["url"]) == ["/product/c-3"]
+    assert changes.unchanged_count == 1
+
+    # Other categories' products are not delisted.
+    assert make_detector(tmp_path).detect(make_snapshot([]), "bakery").delisted.empty
+
+    detector.commit(changes)
+    state = pd.read_csv(tmp_path / "state.csv", index_col="url")
+    assert sorted(state.index) == ["/product/a-1", "/product/b-2", "/product/d-4"]
+    assert state["last_changed"].to_dict() == {
+        "/product/a-1": "2024-10-22T10:00:00+11:00",
+        "/product/b-2": "2024-10-23T10:00:00+11:00",
+        "/product/d-4": "2024-10-23T10:00:00+11:00",
+    }
+
+    timeline = pd.read_csv(tmp_path / "timeline.csv")
+    assert list(timeline["event"]) == [
+        "new",
+        "new",
+        "new",
+        "new",
+        "changed",
+        "delisted",
+    ]
+    b_history = timeline[timeline["url"] == "/product/b-2"]
+    assert list(b_history["price"]) == ["$2.00", "$1.50"]
+
+
+def test_unchanged_snapshot_is_empty(tmp_path):
+    detector = make_detector(tmp_path)
+    snapshot = make_snapshot([("/product/a-1", "$1.00", None)])
+    detector.commit(detector.detect(snapshot, "pantry"))
+
+    changes = detector.detect(snapshot.assign(timestamp="later"), "pantry")
+
+    assert not changes
+    assert changes.unchanged_count == 1
+
+
+def test_partial_snapshot_delists_nothing(tmp_path):
+    detector = make_detector(tmp_path)
+    detector.commit(
+        detector.detect(
+            make_snapshot(
+                [("/product/a-1", "$1.00", None), ("/product/b-2", "$2.00", None)]
+            ),
+            "pantry",
+        )
+    )
+
+    changes = detector.detect(
+        make_snapshot([("/product/a-1", "$1.10", None)]), "pantry", complete=False
+    )
+    assert list(changes.changed["url"]) == ["/product/a-1"]
+    assert changes.delisted.empty
+
+    detector.commit(changes)
+    assert sorted(detector.state.index) == ["/product/a-1", "/product/b-2"]
+    # The next complete crawl sees b-2 as unchanged, not new.
+    changes = detector.detect(
+        make_snapshot(
+            [("/product/a-1", "$1.10", None), ("/product/b-2", "$2.00", None)]
+        ),
+        "pantry",
+    )
+    assert not changes
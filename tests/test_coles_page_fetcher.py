@@ -2,26 +2,44 @@
 Tests for ColesPageFetcher.
 """
 
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock
 
 import pytest
 import requests
 
-from src.fetcher import ColesPageFetcher
+from src.exceptions import BotDetectedError
+from src.fetcher import ColesPageFetcher, CookieBackend, read_until_page_state
+from src.metrics import MetricsRegistry
+from src.ratelimit import AdaptiveRateLimiter
+from src.retry import FailureKind, RetryBudget, RetryPolicy
 
 # --- Helpers for Testing --- #
 
 
+def make_streamed_response(body: bytes, content_length=True) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    if content_length:
+        response.headers["Content-Length"] = str(len(body))
+    return response
+
+
 class FakeResponse:
     """A simple fake requests.Response."""
 
-    def __init__(self, content, status_code=200):
+    def __init__(self, content, status_code=200, headers=None):
         self.content = content.encode("utf-8")
         self.status_code = status_code
+        self.headers = headers or {}
 
     def raise_for_status(self):
         if self.status_code >= 400:
-            raise requests.HTTPError("HTTP Error")
+            raise requests.HTTPError("HTTP Error", response=self)
 
 
 class FakeDriver:
@@ -47,6 +65,31 @@ class FakeDriver:
         pass
 
 
+class FakeBrowserDriver:
+    """
+    A fake plain Chrome driver whose cookie jar gains one of `cookies` each time
+    it is read through the DevTools protocol.
+    """
+
+    def __init__(self, cookies):
+        self.pending = list(cookies)
+        self.jar = []
+        self.visits = []
+        self.quit_called = False
+
+    def get(self, url):
+        self.visits.append(url)
+
+    def execute_cdp_cmd(self, cmd, args):
+        assert cmd == "Network.getCookies"
+        if self.pending:
+            self.jar.append(self.pending.pop(0))
+        return {"cookies": list(self.jar)}
+
+    def quit(self):
+        self.quit_called = True
+
+
 @pytest.fixture
 def fake_driver_factory():
     """Fixture that returns a callable producing FakeDriver instances."""
@@ -143,3 +186,316 @@ def test_get_with_detection(fake_driver_factory, monkeypatch):
     response = fetcher.get("http://example.com")
     assert "Valid content" in response.content.decode("utf-8")
     assert fetcher.session.headers["cookie"] == "dummy_cookie"
+
+
+def test_get_adapts_rate_limit(fake_driver_factory, monkeypatch):
+    """
+    Test that clean responses speed up the host's rate and push-back slows it down.
+    """
+    headers = {"user-agent": "dummy-agent", "cookie": "provided_cookie=abc"}
+    limiter = AdaptiveRateLimiter(initial_rate=1.0, sleep_func=lambda x: None)
+    fetcher = ColesPageFetcher(
+        driver_factory=fake_driver_factory,
+        headers=headers,
+        sleep_func=lambda x: None,
+        refresh_urls=["http://fake.refresh/"],
+        rate_limiter=limiter,
+    )
+    monkeypatch.setattr(fetcher, "refresh_cookie", lambda: None)
+
+    monkeypatch.setattr(
+        fetcher.session, "get", lambda url, **kwargs: FakeResponse("Normal content")
+    )
+    fetcher.get("http://example.com/a")
+    assert limiter.rate("example.com") > 1.0
+
+    monkeypatch.setattr(
+        fetcher.session, "get", lambda url, **kwargs: FakeResponse("Busy", 503)
+    )
+    with pytest.raises(requests.HTTPError):
+        fetcher.get("http://example.com/b")
+    assert limiter.rate("example.com") < 1.0
+
+
+def make_fetcher(fake_driver_factory, monkeypatch, responses, **kwargs):
+    """
+    Builds a fetcher whose session returns (or raises) the given items in order,
+    and which counts cookie refreshes and sleeps instead of performing them.
+    """
+    headers = {"user-agent": "dummy-agent", "cookie": "provided_cookie=abc"}
+    sleeps = []
+    fetcher = ColesPageFetcher(
+        driver_factory=fake_driver_factory,
+        headers=headers,
+        sleep_func=sleeps.append,
+        refresh_urls=["http://fake.refresh/"],
+        **kwargs,
+    )
+    fetcher.refreshes = 0
+    fetcher.sleeps = sleeps
+
+    def fake_refresh_cookie():
+        fetcher.refreshes += 1
+
+    def fake_get(url, **kwargs):
+        item = responses.pop(0)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    monkeypatch.setattr(fetcher, "refresh_cookie", fake_refresh_cookie)
+    monkeypatch.setattr(fetcher.session, "get", fake_get)
+    return fetcher
+
+
+def test_get_retries_network_error_without_refresh(fake_driver_factory, monkeypatch):
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [requests.ConnectionError("reset"), FakeResponse("Valid content")],
+    )
+    response = fetcher.get("http://example.com")
+
+    assert "Valid content" in response.content.decode("utf-8")
+    assert fetcher.refreshes == 0
+
+
+def test_get_refreshes_cookie_on_block_after_network_error(
+    fake_driver_factory, monkeypatch
+):
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [
+            requests.ConnectionError("reset"),
+            FakeResponse("Busy", 503),
+            FakeResponse("Pardon Our Interruption"),
+            FakeResponse("Valid content"),
+        ],
+        retry_policy=RetryPolicy(base_delay=1.0, random_func=lambda: 1.0),
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+    )
+    response = fetcher.get("http://example.com")
+
+    assert "Valid content" in response.content.decode("utf-8")
+    assert fetcher.refreshes == 1
+    # The first server error backs off as a first attempt of its kind.
+    assert fetcher.sleeps == [1.0]
+
+
+def test_get_backs_off_on_server_error(fake_driver_factory, monkeypatch):
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [FakeResponse("Busy", 503), FakeResponse("Valid content")],
+        retry_policy=RetryPolicy(base_delay=4.0, random_func=lambda: 0.5),
+    )
+    response = fetcher.get("http://example.com")
+
+    assert "Valid content" in response.content.decode("utf-8")
+    assert fetcher.refreshes == 0
+    assert 2.0 in fetcher.sleeps
+
+
+def test_get_honours_retry_after(fake_driver_factory, monkeypatch):
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [
+            FakeResponse("Slow down", 429, headers={"Retry-After": "7"}),
+            FakeResponse("Valid content"),
+        ],
+    )
+    fetcher.get("http://example.com")
+
+    assert 7.0 in fetcher.sleeps
+    assert fetcher.refreshes == 0
+
+
+def test_get_gives_up_on_client_error(fake_driver_factory, monkeypatch):
+    fetcher = make_fetcher(
+        fake_driver_factory, monkeypatch, [FakeResponse("Not found", 404)]
+    )
+    with pytest.raises(requests.HTTPError):
+        fetcher.get("http://example.com")
+    assert fetcher.refreshes == 0
+
+
+def test_get_respects_retry_budget(fake_driver_factory, monkeypatch):
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [FakeResponse("Pardon Our Interruption")] * 2,
+        retry_policy=RetryPolicy(
+            budget=RetryBudget(max_retries_per_kind={FailureKind.BOT_BLOCK: 0})
+        ),
+    )
+    with pytest.raises(BotDetectedError):
+        fetcher.get("http://example.com")
+    assert fetcher.refreshes == 0
+
+
+def test_get_records_metrics(fake_driver_factory, monkeypatch):
+    metrics = MetricsRegistry()
+    fetcher = make_fetcher(
+        fake_driver_factory,
+        monkeypatch,
+        [FakeResponse("Pardon Our Interruption"), FakeResponse("Valid content")],
+        metrics=metrics,
+    )
+    fetcher.get("http://example.com")
+
+    summary = metrics.summary()
+    assert summary["counters"]['bot_blocks_total{host="example.com"}'] == 1
+    assert summary["distributions"]['fetch_seconds{host="example.com"}']["count"] == 2
+    assert (
+        summary["distributions"]['fetch_body_seconds{host="example.com"}']["count"] == 2
+    )
+
+
+def test_read_until_page_state():
+    page = (
+        b'<html><body><section data-testid="product-tile"></section>'
+        b'<script id="__NEXT_DATA__" type="application/json">{"page": 1}</script>'
+    )
+    footer = b"<script>analytics()</script></body></html>"
+
+    # Small chunks split the markers across chunks.
+    response = make_streamed_response(page + footer)
+    assert read_until_page_state(response, chunk_size=7, drain_limit=1024) == page
+    assert response.content == page
+    assert response.truncated
+    assert response.raw.tell() == len(page + footer)  # drained for reuse
+
+    response = make_streamed_response(page + footer * 100)
+    assert read_until_page_state(response, chunk_size=64, drain_limit=16) == page
+    assert response.raw.closed  # too much left to drain
+
+    response = make_streamed_response(page, content_length=False)
+    assert read_until_page_state(response, chunk_size=7) == page
+    assert not response.truncated
+
+    # Bodies without page state are read in full.
+    response = make_streamed_response(footer)
+    assert read_until_page_state(response, chunk_size=7) == footer
+    assert not response.truncated
+
+
+def test_concurrent_blocks_share_one_cookie_refresh(fake_driver_factory, monkeypatch):
+    drivers = []
+
+    def driver_factory():
+        drivers.append(fake_driver_factory())
+        return drivers[-1]
+
+    fetcher = ColesPageFetcher(
+        driver_factory=driver_factory,
+        headers={"cookie": "stale_cookie=1"},
+        sleep_func=lambda x: None,
+        refresh_urls=["http://fake.refresh/"],
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+        metrics=MetricsRegistry(),
+    )
+    # Every thread is blocked under the stale cookie before any of them refreshes.
+    blocked = threading.Barrier(8)
+
+    def fake_get(url, **kwargs):
+        if fetcher.session.headers["cookie"] == "stale_cookie=1":
+            blocked.wait(timeout=5)
+            return FakeResponse("Pardon Our Interruption")
+        return FakeResponse(f"Content of {url}")
+
+    monkeypatch.setattr(fetcher.session, "get", fake_get)
+    urls = [f"http://fake.url/page-{n}" for n in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        responses = list(executor.map(fetcher.get, urls))
+
+    assert [r.content for r in responses] == [
+        f"Content of {url}".encode() for url in urls
+    ]
+    assert len(drivers) == 1
+    counters = fetcher.metrics.summary()["counters"]
+    assert counters["cookie_refreshes_total"] == 1
+    assert counters["cookie_refreshes_coalesced_total"] == 7
+
+
+def test_concurrent_gets_of_one_url_are_coalesced(fake_driver_factory, monkeypatch):
+    fetcher = ColesPageFetcher(
+        driver_factory=fake_driver_factory,
+        headers={"cookie": "provided_cookie=abc"},
+        sleep_func=lambda x: None,
+        refresh_urls=["http://fake.refresh/"],
+        metrics=MetricsRegistry(),
+    )
+    release = threading.Event()
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        release.wait(timeout=5)
+        return FakeResponse("Normal content")
+
+    monkeypatch.setattr(fetcher.session, "get", fake_get)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(fetcher.get, "http://fake.url") for _ in range(4)]
+        deadline = time.monotonic() + 5
+        while (
+            fetcher.metrics.summary()["counters"].get("fetch_coalesced_total", 0) < 3
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        release.set()
+        responses = [future.result() for future in futures]
+
+    assert calls == ["http://fake.url"]
+    assert all(response is responses[0] for response in responses)
+    # Once it completes, the URL is fetched again.
+    fetcher.get("http://fake.url")
+    assert len(calls) == 2
+
+
+def test_browser_backend_waits_for_session_cookies():
+    driver = FakeBrowserDriver(
+        [
+            {"name": "incap_ses_1", "value": "a"},
+            {"name": "visid_incap_1", "value": "b"},
+            {"name": "reese84", "value": "c"},
+            {"name": "late", "value": "d"},
+        ]
+    )
+    sleeps = []
+    fetcher = ColesPageFetcher(
+        driver_factory=lambda: driver,
+        headers={"cookie": "stale_cookie=1"},
+        sleep_func=sleeps.append,
+        refresh_urls=["http://fake.refresh/"],
+        metrics=MetricsRegistry(),
+        cookie_backend="browser",
+    )
+    fetcher.COOKIE_POLL_SECONDS = 0.01
+    fetcher.refresh_cookie()
+
+    assert fetcher.cookie_backend is CookieBackend.BROWSER
+    assert (
+        fetcher.session.headers["cookie"] == "incap_ses_1=a; visid_incap_1=b; reese84=c"
+    )
+    assert driver.visits == ["http://fake.refresh/"]
+    assert driver.quit_called
+    assert sleeps == []
+
+
+def test_browser_backend_gives_up_waiting():
+    driver = FakeBrowserDriver([{"name": "incap_ses_1", "value": "a"}])
+    fetcher = ColesPageFetcher(
+        driver_factory=lambda: driver,
+        headers={"cookie": "stale_cookie=1"},
+        refresh_urls=["http://fake.refresh/"],
+        metrics=MetricsRegistry(),
+        cookie_backend=CookieBackend.BROWSER,
+    )
+    fetcher.COOKIE_WAIT_SECONDS = 0.05
+    fetcher.COOKIE_POLL_SECONDS = 0.01
+    fetcher.refresh_cookie()
+
+    assert fetcher.session.headers["cookie"] == "incap_ses_1=a"
+    assert driver.quit_called
@@ -0,0 +1,165 @@
+"""
+Tests for the on-disk cookie store and warm starts of the fetcher.
+"""
+
+import os
+from types import SimpleNamespace
+
+from src.cookies import CookieStore
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry
+from src.ratelimit import AdaptiveRateLimiter
+from src.retry import RetryPolicy
+from src.standin import ColesStandIn, StandInConfig
+
+# --- Helpers for Testing --- #
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeDriver:
+    """
+    A fake seleniumwire driver whose requests carry a cookie naming their driver.
+    """
+
+    launched = 0
+
+    def __init__(self):
+        FakeDriver.launched += 1
+        self.request_interceptor = None
+
+    def get(self, url):
+        request = SimpleNamespace(
+            url=url, headers={"cookie": f"browser-cookie={FakeDriver.launched}"}
+        )
+        self.request_interceptor(request)
+
+    def quit(self):
+        pass
+
+
+def make_fetcher(base_url, store):
+    return ColesPageFetcher(
+        driver_factory=FakeDriver,
+        sleep_func=lambda seconds: None,
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+        retry_policy=RetryPolicy(base_delay=0),
+        metrics=MetricsRegistry(),
+        base_url=base_url,
+        cookie_store=store,
+    )
+
+
+# --- Tests --- #
+
+
+def test_store_expires_cookies_by_observed_lifetime(tmp_path):
+    clock = FakeClock()
+    store = CookieStore(
+        path=str(tmp_path / "cache" / "cookie.json"),
+        default_lifetime_seconds=600,
+        clock=clock,
+    )
+    assert store.load() is None
+
+    store.save("a=1")
+    assert os.stat(store.path).st_mode & 0o777 == 0o600
+    clock.now += 500
+    assert store.load() == "a=1"
+    clock.now += 200
+    assert store.load() is None
+
+    # A cookie passed in rather than captured says nothing about lifetimes.
+    store.expire("other=1")
+    assert store.expected_lifetime() == 600
+
+    store.expire("a=1")
+    assert store.expected_lifetime() == 700
+    assert store.load() is None
+
+    store.save("b=2")
+    clock.now += 300
+    store.expire("b=2")
+    assert store.expected_lifetime() == 500
+
+    # Store files that can't be read are treated as empty.
+    with open(store.path, "w") as dst:
+        dst.write("not json")
+    assert store.load() is None
+
+
+def test_fetcher_restores_stored_cookie(tmp_path):
+    store = CookieStore(path=str(tmp_path / "cookie.json"))
+    store.save("stored-cookie=1")
+    launched = FakeDriver.launched
+
+    with ColesStandIn() as standin:
+        fetcher = make_fetcher(standin.base_url, store)
+
+        assert FakeDriver.launched == launched
+        assert fetcher.session.headers["cookie"] == "stored-cookie=1"
+        counters = fetcher.metrics.summary()["counters"]
+        assert counters["cookie_restores_total"] == 1
+        assert counters['cookie_validations_total{outcome="valid"}'] == 1
+
+
+def test_fetcher_refreshes_stale_or_blocked_stored_cookie(tmp_path):
+    clock = FakeClock()
+    store = CookieStore(path=str(tmp_path / "cookie.json"), clock=clock)
+    store.save("stored-cookie=1")
+
+    # Too old to be worth validating.
+    clock.now += CookieStore.DEFAULT_LIFETIME_SECONDS + 1
+    with ColesStandIn() as standin:
+        fetcher = make_fetcher(standin.base_url, store)
+        assert standin.requests_served == 0
+        assert fetcher.session.headers["cookie"].startswith("browser-cookie=")
+        assert store.load() == fetcher.session.headers["cookie"]
+
+    # Young enough, but blocked when validated.
+    clock.now += 60
+    with ColesStandIn(StandInConfig(block_after=0)) as standin:
+        blocked = fetcher.session.headers["cookie"]
+        fetcher = make_fetcher(standin.base_url, store)
+        assert fetcher.session.headers["cookie"] != blocked
+        assert store.load() == fetcher.session.headers["cookie"]
+        assert store.expected_lifetime() == 60
+
+
+def test_failed_validation_keeps_stored_cookie(tmp_path):
+    clock = FakeClock()
+    store = CookieStore(path=str(tmp_path / "cookie.json"), clock=clock)
+    store.save("stored-cookie=1")
+    clock.now += 60
+
+    with ColesStandIn(StandInConfig(error_rate=1.0)) as standin:
+        fetcher = make_fetcher(standin.base_url, store)
+
+        assert fetcher.session.headers["cookie"].startswith("browser-cookie=")
+        counters = fetcher.metrics.summary()["counters"]
+        assert counters['cookie_validations_total{outcome="error"}'] == 1
+    # The 503 says nothing about the stored cookie's lifetime.
+    assert store._read().get("lifetimes") is None
+    assert store.expected_lifetime() == CookieStore.DEFAULT_LIFETIME_SECONDS
+
+
+def test_blocked_crawl_records_cookie_lifetime(tmp_path):
+    clock = FakeClock()
+    store = CookieStore(path=str(tmp_path / "cookie.json"), clock=clock)
+    store.save("stored-cookie=1")
+
+    config = StandInConfig(block_after=1, block_for=1)
+    with ColesStandIn(config) as standin:
+        fetcher = make_fetcher(standin.base_url, store)
+        clock.now += 120
+        fetcher.get("https://www.coles.com.au/browse/pantry")
+
+        assert fetcher.session.headers["cookie"].startswith("browser-cookie=")
+        assert store.load() == fetcher.session.headers["cookie"]
+        assert store.expected_lifetime() == 120
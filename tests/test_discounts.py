@@ -0,0 +1,61 @@
+"""
+Tests for discount post-processing.
+"""
+
+from src.discounts import DISCOUNT_COLUMNS, process_discount_tiles
+from src.models import ProductTile
+from src.prices import Unit
+
+
+def make_tile(slug, price, price_calc_method):
+    return ProductTile(
+        name=f"{slug} | 500g",
+        url=f"/product/{slug}-123",
+        price=price,
+        price_calc_method=price_calc_method,
+        image_url=f"/images/{slug}.jpg",
+    )
+
+
+def test_process_discount_tiles():
+    tiles = [
+        make_tile("cheese", "$2.15", "$1.34 per 100gWas $2.70 on Sep 2024"),
+        make_tile("milk", "$3.00", "$1.50 per 1L"),  # no "Was" price
+        make_tile("bread", "$5.00", "$1.00 per 100g | Was $4.00"),  # not lower
+        make_tile("cheese", "$2.15", "$1.34 per 100gWas $2.70 on Sep 2024"),
+    ]
+    # Typed prices from the page state take precedence over the display strings.
+    tiles.append(
+        ProductTile(
+            name="Juice | 2L",
+            url="/product/juice-456",
+            price="$4.85",
+            price_calc_method="$2.43 per 1LWas $6.00",
+            price_cents=485,
+            was_price_cents=600,
+            unit_price_cents=243,
+            unit_quantity=1,
+            unit=Unit.LITRE,
+        )
+    )
+    df = process_discount_tiles(tiles)
+
+    assert list(df.columns) == DISCOUNT_COLUMNS
+    assert df["product_id"].tolist() == ["cheese", "juice"]
+    row = df.iloc[0]
+    assert row["product_id"] == "cheese"
+    assert row["category"] == "discount"
+    assert row["size"] == "500g"
+    assert row["current_price_aud"] == 2.15
+    assert row["previous_price_aud"] == 2.70
+    assert row["unit_price_aud"] == 1.34
+    assert row["unit_of_measure"] == "100g"
+    assert row["previous_price_date"] == "Sep 2024"
+    assert row["product_url"] == "https://www.coles.com.au/product/cheese-123"
+    assert df.iloc[1][["current_price_aud", "unit_of_measure"]].tolist() == [4.85, "1L"]
+
+
+def test_process_discount_tiles_without_discounts():
+    df = process_discount_tiles([make_tile("milk", "$3.00", "$1.50 per 1L")])
+    assert df.empty
+    assert list(df.columns) == DISCOUNT_COLUMNS
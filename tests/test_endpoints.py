@@ -0,0 +1,112 @@
+"""
+Tests for URL building and request routing.
+"""
+
+from scripts.scrape_discounts import SpecialsQuery
+from src.endpoints import EndpointRouter, RequestClass
+from src.fetcher import ColesPageFetcher
+from src.poms.products import ProductsPage
+
+# --- Tests --- #
+
+
+def test_default_router_builds_coles_urls():
+    router = EndpointRouter()
+
+    assert router.browse_url() == "https://www.coles.com.au/browse"
+    assert (
+        router.browse_url("pantry", "snacks", page=2)
+        == "https://www.coles.com.au/browse/pantry/snacks?page=2"
+    )
+    assert (
+        router.specials_url(pid="offers", filter_Special=None, page=1)
+        == "https://www.coles.com.au/on-special?pid=offers&page=1"
+    )
+    assert (
+        router.product_url("appy-fizz-250ml-8060378")
+        == "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+    )
+
+
+def test_classify():
+    assert EndpointRouter.classify("/browse/pantry") is RequestClass.BROWSE
+    assert (
+        EndpointRouter.classify("https://www.coles.com.au/on-special?page=2")
+        is RequestClass.SPECIALS
+    )
+    assert EndpointRouter.classify("/product/milk-123") is RequestClass.PRODUCT
+    assert EndpointRouter.classify("/") is RequestClass.OTHER
+
+
+def test_routes_request_classes_to_their_origins():
+    router = EndpointRouter(
+        origin="http://127.0.0.1:8000/",
+        routes={RequestClass.PRODUCT: "http://cache.internal:8080"},
+    )
+
+    assert router.browse_url("pantry") == "http://127.0.0.1:8000/browse/pantry"
+    assert (
+        router.route("https://www.coles.com.au/product/milk-123?x=1")
+        == "http://cache.internal:8080/product/milk-123?x=1"
+    )
+    assert (
+        router.route("https://www.coles.com.au/product/milk-123", RequestClass.OTHER)
+        == "http://127.0.0.1:8000/product/milk-123"
+    )
+    assert (
+        router.route("http://example.com/product/1") == "http://example.com/product/1"
+    )
+
+
+def test_from_env():
+    router = EndpointRouter.from_env(
+        {
+            "COLES_BASE_URL": "http://127.0.0.1:8000",
+            "COLES_COOKIE_REFRESH_ORIGIN": "https://www.coles.com.au",
+        }
+    )
+
+    assert router.origin == "http://127.0.0.1:8000"
+    assert router.origin_for(RequestClass.BROWSE) == "http://127.0.0.1:8000"
+    assert router.origin_for(RequestClass.COOKIE_REFRESH) == "https://www.coles.com.au"
+    assert EndpointRouter.from_env({}).origin == "https://www.coles.com.au"
+
+
+def test_query_builders_use_default_router():
+    assert (
+        SpecialsQuery(filter_type="halfprice", page=2).url
+        == "https://www.coles.com.au/on-special"
+        "?pid=offers_modular3_special&filter_Special=halfprice&page=2"
+    )
+    assert ProductsPage._build_url("pantry") == "https://www.coles.com.au/browse/pantry"
+    assert (
+        ProductsPage._build_url("pantry", page=3)
+        == "https://www.coles.com.au/browse/pantry?page=3"
+    )
+
+
+def test_fetcher_routes_cookie_refresh_separately():
+    router = EndpointRouter(
+        origin="http://127.0.0.1:8000",
+        routes={RequestClass.COOKIE_REFRESH: "https://www.coles.com.au"},
+    )
+    fetcher = ColesPageFetcher(headers={"cookie": "c"}, router=router)
+
+    assert fetcher.refresh_url.startswith("https://www.coles.com.au/browse/")
+    assert (
+        fetcher.resolve_url("https://www.coles.com.au/browse/pantry?page=2")
+        == "http://127.0.0.1:8000/browse/pantry?page=2"
+    )
+
+
+def test_data_routes():
+    router = EndpointRouter(routes={RequestClass.BROWSE: "http://127.0.0.1:8000"})
+    data_url = router.data_url(
+        "20241022.02_v4.26.0", "https://www.coles.com.au/browse/pantry?page=2"
+    )
+
+    assert data_url == (
+        "http://127.0.0.1:8000/_next/data/20241022.02_v4.26.0/browse/pantry.json?page=2"
+    )
+    assert router.classify(data_url) is RequestClass.BROWSE
+    assert router.classify("/_next/data/b/product/x-1.json") is RequestClass.PRODUCT
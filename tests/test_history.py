@@ -0,0 +1,129 @@
+"""
+Tests for the SQLite price history store.
+"""
+
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from src.history import PriceHistory, to_history_rows
+
+# --- Helpers for Testing --- #
+
+
+def make_rows(observations):
+    return pd.DataFrame(
+        [
+            {
+                "name": f"{slug} | 1L",
+                "url": f"/product/{slug}-123",
+                "price": price,
+                "price_calc_method": f"${price[1:]} per 1L",
+                "category": category,
+                "timestamp": timestamp,
+            }
+            for slug, category, price, timestamp in observations
+        ]
+    )
+
+
+@pytest.fixture
+def history():
+    with PriceHistory(":memory:") as history:
+        history.ingest(
+            make_rows(
+                [
+                    ("milk", "dairy", "$3.00", "2024-09-20T10:00:00+10:00"),
+                    ("milk", "dairy", "$2.50", "2024-10-05T10:00:00+10:00"),
+                    ("milk", "dairy", "$3.10", "2024-10-20T10:00:00+11:00"),
+                    ("cheese", "dairy", "$8.00", "2024-10-01T10:00:00+10:00"),
+                    ("cheese", "dairy", "$8.00", "2024-10-10T10:00:00+11:00"),
+                    ("rice", "pantry", "$4.00", "2024-10-02T10:00:00+10:00"),
+                    ("rice", "pantry", "$3.00", "2024-10-12T10:00:00+11:00"),
+                ]
+            )
+        )
+        yield history
+
+
+# --- Tests --- #
+
+
+def test_to_history_rows():
+    rows = to_history_rows(
+        pd.DataFrame(
+            [
+                {
+                    "name": "Milk | 2L",
+                    "url": "/product/coles-milk-2l-8150288",
+                    "price": "$1,003.10",
+                    "price_calc_method": "$1.55 per 1L | Was $3.50 on Oct 2024",
+                    "is_on_special": "True",
+                    "category": "dairy",
+                    "timestamp": "2024-10-22T10:00:00+11:00",
+                }
+            ]
+        )
+    )
+
+    assert rows.iloc[0].to_dict() == {
+        "product_id": "coles-milk-2l",
+        "timestamp": "2024-10-21T23:00:00",
+        "category": "dairy",
+        "name": "Milk | 2L",
+        "url": "/product/coles-milk-2l-8150288",
+        "price_aud": 1003.10,
+        "was_price_aud": 3.50,
+        "unit_price_aud": 1.55,
+        "is_on_special": 1,
+    }
+
+
+def test_product_history(history):
+    result = history.product_history("milk")
+
+    assert list(result["price_aud"]) == [3.00, 2.50, 3.10]
+    assert result["timestamp"].is_monotonic_increasing
+
+
+def test_ingest_is_idempotent(history):
+    history.ingest(make_rows([("milk", "dairy", "$3.00", "2024-09-20T10:00:00+10:00")]))
+    assert len(history.product_history("milk")) == 3
+
+
+def test_price_changes(history):
+    result = history.price_changes("dairy", "2024-10-01", "2024-10-15")
+
+    assert list(result["product_id"]) == ["milk"]
+    assert list(result["price_aud"]) == [2.50]
+    assert list(result["previous_price_aud"]) == [3.00]
+
+
+def test_current_vs_min(history):
+    now = datetime(2024, 10, 21, tzinfo=timezone.utc)
+
+    result = history.current_vs_min(days=14, now=now).set_index("product_id")
+
+    # The $2.50 milk price was still in effect when the 14-day window opened.
+    assert result.loc["milk", "current_price_aud"] == 3.10
+    assert result.loc["milk", "min_price_aud"] == 2.50
+    assert not result.loc["milk", "is_at_min"]
+    assert result.loc["rice", "is_at_min"]
+    assert list(
+        history.current_vs_min(days=14, category="pantry", now=now)["product_id"]
+    ) == ["rice"]
+
+
+def test_ingest_csv(tmp_path):
+    path = tmp_path / "products_dropped.csv"
+    make_rows(
+        [
+            ("milk", "dairy", "$3.00", "2024-09-20T10:00:00+10:00"),
+            ("milk", "dairy", "$2.50", "2024-10-05T10:00:00+10:00"),
+        ]
+    ).to_csv(path, index=False)
+
+    with PriceHistory(str(tmp_path / "history.sqlite")) as history:
+        assert history.ingest_csv(str(path), chunk_rows=1) == 2
+        assert list(history.product_history("milk")["price_aud"]) == [3.00, 2.50]
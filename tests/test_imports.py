@@ -0,0 +1,78 @@
+"""
+Import-time budget: modules used by parsing and processing workers must not load
+Selenium, and the lightest ones must not load pandas or requests either. Their
+import time is also capped, with ample headroom over a typical machine.
+"""
+
+import json
+import re
+import subprocess
+import sys
+
+import pytest
+
+SELENIUM = {"selenium", "seleniumwire", "undetected_chromedriver"}
+PANDAS = {"pandas", "numpy", "pyarrow"}
+HTTP = {"requests", "urllib3"}
+
+BUDGETS = {
+    "src": SELENIUM | PANDAS | {"bs4", "requests"},
+    "src.scrapers": SELENIUM | PANDAS | HTTP,
+    "src.archive": SELENIUM | PANDAS | HTTP,
+    "src.metrics": SELENIUM | PANDAS | HTTP,
+    "src.fetcher": SELENIUM | PANDAS,
+    "src.units": SELENIUM,
+    "src.history": SELENIUM,
+    "scripts.reparse_pages": SELENIUM,
+    "scripts.scrape_products": SELENIUM,
+    "scripts.scrape_discounts": SELENIUM,
+}
+
+# Cumulative import time in seconds, as reported by `python -X importtime`.
+IMPORT_SECONDS = {
+    "src.scrapers": 0.5,
+    "src.archive": 0.25,
+    "src.metrics": 0.1,
+}
+
+
+def imported_packages(module):
+    code = (
+        f"import json, sys; import {module}; "
+        "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return set(json.loads(output))
+
+
+def import_seconds(module):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    # Lines read "import time: <self us> | <cumulative us> | <module>".
+    pattern = re.compile(rf"\|\s*(\d+) \| {re.escape(module)}$", re.MULTILINE)
+    return int(pattern.search(stderr).group(1)) / 1e6
+
+
+@pytest.mark.parametrize("module", BUDGETS)
+def test_import_budget(module):
+    assert not imported_packages(module) & BUDGETS[module]
+
+
+@pytest.mark.parametrize("module", IMPORT_SECONDS)
+def test_import_time(module):
+    # The fastest of a few runs, to ride out a busy machine.
+    seconds = min(import_seconds(module) for _ in range(3))
+    assert seconds < IMPORT_SECONDS[module]
+
+
+def test_lazy_package_attributes():
+    from src import ColesProductTileScraper
+    from src.scrapers import ColesProductTileScraper as scraper_class
+
+    assert ColesProductTileScraper is scraper_class
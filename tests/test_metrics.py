@@ -0,0 +1,161 @@
+"""
+Tests for crawl metrics and instrumentation.
+"""
+
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from src.httptiming import (
+    TimingHTTPAdapter,
+    pop_connection_timings,
+    reset_connection_timings,
+)
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry, percentile
+
+# --- Helpers for Testing --- #
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connections are pooled
+
+    def do_GET(self):
+        body = b"<html>ok</html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = HTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_port}"
+    server.shutdown()
+
+
+# --- Tests --- #
+
+
+def test_percentile():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 0.5) == 3.0
+    assert percentile(values, 0.9) == pytest.approx(4.6)
+    assert percentile([7.0], 0.99) == 7.0
+
+
+def test_summary():
+    metrics = MetricsRegistry()
+    metrics.increment("cookie_refreshes_total")
+    metrics.increment("cookie_refreshes_total")
+    for value in [0.1, 0.2, 0.3]:
+        metrics.observe("fetch_seconds", value, host="www.coles.com.au")
+
+    summary = metrics.summary()
+
+    assert summary["counters"] == {"cookie_refreshes_total": 2}
+    fetch = summary["distributions"]['fetch_seconds{host="www.coles.com.au"}']
+    assert fetch["count"] == 3
+    assert fetch["p50"] == pytest.approx(0.2)
+    assert fetch["max"] == pytest.approx(0.3)
+
+
+def test_to_prometheus():
+    metrics = MetricsRegistry()
+    metrics.increment("bot_blocks_total", host="www.coles.com.au")
+    metrics.observe("tiles_per_page", 48)
+
+    text = metrics.to_prometheus()
+
+    assert "# TYPE coles_bot_blocks_total counter" in text
+    assert 'coles_bot_blocks_total{host="www.coles.com.au"} 1' in text
+    assert "# TYPE coles_tiles_per_page summary" in text
+    assert 'coles_tiles_per_page{quantile="0.5"} 48' in text
+    assert "coles_tiles_per_page_count 1" in text
+
+
+def test_timer_and_json_summary(tmp_path):
+    metrics = MetricsRegistry()
+
+    @metrics.timed("storage_write_seconds", stage="dump")
+    def dump():
+        return "done"
+
+    assert dump() == "done"
+    path = tmp_path / "run.json"
+    metrics.write_json_summary(str(path))
+
+    summary = json.loads(path.read_text())
+    assert summary["distributions"]['storage_write_seconds{stage="dump"}']["count"] == 1
+
+
+def test_timing_adapter_records_connection_stages(local_server):
+    session = requests.Session()
+    session.mount("http://", TimingHTTPAdapter())
+
+    reset_connection_timings()
+    session.get(local_server)
+    first = pop_connection_timings()
+    session.get(local_server)
+    second = pop_connection_timings()
+
+    assert set(first) == {"dns", "connect"}
+    # The pooled connection is reused, so no new connection is timed.
+    assert second == {}
+
+
+def test_timing_adapter_falls_back_to_next_address(local_server, monkeypatch):
+    port = int(local_server.rsplit(":", 1)[1])
+    getaddrinfo = socket.getaddrinfo
+
+    def fake_getaddrinfo(host, *args, **kwargs):
+        if host != "localhost":
+            return getaddrinfo(host, *args, **kwargs)
+        # Nothing listens on the first address, as with an unreachable IPv6 one.
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))
+            for address in ("127.0.0.2", "127.0.0.1")
+        ]
+
+    monkeypatch.setattr(socket, "getaddrinfo", fake_getaddrinfo)
+    with requests.Session() as session:
+        session.mount("http://", TimingHTTPAdapter())
+        assert session.get(local_server).status_code == 200
+
+
+def test_fetcher_keeps_adapters_of_given_session():
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=3, pool_maxsize=32)
+    session.mount("https://", adapter)
+
+    fetcher = ColesPageFetcher(session=session, headers={"cookie": "test"})
+
+    assert fetcher.session.get_adapter("https://www.coles.com.au") is adapter
+    own = ColesPageFetcher(headers={"cookie": "test"})
+    assert isinstance(
+        own.session.get_adapter("https://www.coles.com.au"), TimingHTTPAdapter
+    )
+
+
+def test_distributions_are_bounded():
+    metrics = MetricsRegistry(reservoir_size=100)
+    for value in range(1, 10001):
+        metrics.observe("fetch_body_bytes", float(value))
+
+    distribution = metrics.summary()["distributions"]["fetch_body_bytes"]
+    assert distribution["count"] == 10000
+    assert distribution["sum"] == 10000 * 10001 / 2
+    assert distribution["max"] == 10000
+    # Estimated from a sample of 100 values spread over the whole range.
+    assert 3000 < distribution["p50"] < 7000
+    assert len(metrics._observations[("fetch_body_bytes", ())].sample) == 100
@@ -0,0 +1,71 @@
+"""
+Tests for crawling through the Next.js data routes, against the local stand-in.
+"""
+
+import pytest
+import requests
+
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry
+from src.nextdata import NextDataClient
+from src.ratelimit import AdaptiveRateLimiter
+from src.retry import RetryPolicy
+from src.scrapers import ColesProductTileScraper
+from src.standin import ColesStandIn
+
+BROWSE_URL = "https://www.coles.com.au/browse/dairy-eggs-fridge?page=2"
+
+# --- Helpers for Testing --- #
+
+
+def make_fetcher(base_url):
+    return ColesPageFetcher(
+        headers={"cookie": "stand-in"},
+        sleep_func=lambda seconds: None,
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+        retry_policy=RetryPolicy(base_delay=0),
+        metrics=MetricsRegistry(),
+        base_url=base_url,
+    )
+
+
+# --- Tests --- #
+
+
+def test_data_route_tiles_match_html_tiles():
+    with ColesStandIn() as standin:
+        fetcher = make_fetcher(standin.base_url)
+        client = NextDataClient(fetcher)
+
+        tiles = client.get_tiles(BROWSE_URL)
+        html_tiles = ColesProductTileScraper(
+            fetcher.get(BROWSE_URL).content
+        ).get_all_products()
+
+        assert client.build_id == "20241022.02_v4.26.0"
+        assert len(tiles) == 58
+        assert tiles == html_tiles
+        assert client.get_tiles(BROWSE_URL.replace("page=2", "page=99")) == []
+
+        product = client.get_product(
+            "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+        )
+        assert product.product_code == "Code: 6433306"
+        assert product.price_cents == 90
+
+
+def test_data_route_rediscovers_build_id_after_deploy():
+    with ColesStandIn() as standin:
+        fetcher = make_fetcher(standin.base_url)
+        client = NextDataClient(fetcher)
+        assert client.get_tiles(BROWSE_URL)
+
+        standin.build_id = "20241105.01_v4.27.0"
+        assert len(client.get_tiles(BROWSE_URL)) == 58
+        assert client.build_id == "20241105.01_v4.27.0"
+        counters = fetcher.metrics.summary()["counters"]
+        assert counters["next_build_id_discoveries_total"] == 2
+
+        # A 404 under the current build is a missing page, not a deploy.
+        with pytest.raises(requests.HTTPError):
+            client.get_page_props("https://www.coles.com.au/recipes-inspiration")
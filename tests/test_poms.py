@@ -0,0 +1,112 @@
+"""
+Tests for Selenium page object models.
+"""
+
+import json
+
+from selenium.webdriver.common.by import By
+
+from src.models import ProductTile
+from src.poms import BasePage, CategoriesPage, ProductsPage
+
+# --- Helpers for Testing --- #
+
+
+class FakeScriptDriver:
+    """
+    A fake Selenium driver that answers execute_script with canned rows
+    and records every call, so round trips can be counted.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.script_calls = []
+        self.find_calls = []
+
+    def execute_script(self, script, *args):
+        self.script_calls.append(args)
+        strategy, target, attributes = args
+        return json.dumps(
+            [{key: row.get(key) for key in attributes} for row in self.rows]
+        )
+
+    def find_elements(self, by, value):
+        self.find_calls.append((by, value))
+        return ["element"] * len(self.rows)
+
+
+# --- Tests --- #
+
+
+def test_extract_attributes_single_round_trip():
+    driver = FakeScriptDriver(rows=[{"name": "A", "url": "/a"}, {"name": "B"}])
+    page = BasePage(driver)
+
+    result = page.extract_attributes(
+        (By.XPATH, "//a"), {"name": "text", "url": "href"}
+    )
+
+    assert result == [{"name": "A", "url": "/a"}, {"name": "B", "url": None}]
+    assert len(driver.script_calls) == 1
+    assert driver.script_calls[0][:2] == ("xpath", "//a")
+    assert driver.find_calls == []
+
+
+def test_extract_attributes_falls_back_to_located_elements():
+    driver = FakeScriptDriver(rows=[{"name": "A"}])
+    page = BasePage(driver)
+
+    result = page.extract_attributes((By.CLASS_NAME, "card"), {"name": "text"})
+
+    assert result == [{"name": "A"}]
+    assert driver.find_calls == [(By.CLASS_NAME, "card")]
+    assert driver.script_calls[0][0] is None
+
+
+def test_list_categories():
+    driver = FakeScriptDriver(
+        rows=[
+            {"name": "Pantry", "url": "https://www.coles.com.au/browse/pantry"},
+            {"name": "Bakery", "url": "https://www.coles.com.au/browse/bakery"},
+        ]
+    )
+    categories = CategoriesPage(driver).list_categories()
+
+    assert categories == [
+        {
+            "name": "Pantry",
+            "url": "https://www.coles.com.au/browse/pantry",
+            "slug": "pantry",
+        },
+        {
+            "name": "Bakery",
+            "url": "https://www.coles.com.au/browse/bakery",
+            "slug": "bakery",
+        },
+    ]
+    assert len(driver.script_calls) == 1
+
+
+def test_list_products(monkeypatch):
+    tile_html = (
+        '<section data-testid="product-tile">'
+        '<a class="product__link" href="/product/coles-milk-2l-123"></a>'
+        '<h2 class="product__title">Coles Milk | 2L</h2>'
+        '<span class="price__value">$3.10</span>'
+        '<div class="price__calculation_method">$1.55 per 1L</div>'
+        "</section>"
+    )
+    driver = FakeScriptDriver(rows=[{"html": tile_html}, {"html": tile_html}])
+    page = ProductsPage(driver, category="dairy-eggs-fridge")
+    monkeypatch.setattr(page, "wait_for_element_visibility", lambda locator: True)
+
+    products = page.list_products()
+
+    assert len(products) == 2
+    assert products[0] == ProductTile(
+        name="Coles Milk | 2L",
+        url="/product/coles-milk-2l-123",
+        price="$3.10",
+        price_calc_method="$1.55 per 1L",
+    )
+    assert len(driver.script_calls) == 1
@@ -0,0 +1,84 @@
+"""
+Tests for typed prices.
+"""
+
+import pandas as pd
+
+from src.models import ProductTile
+from src.prices import TypedPrices, Unit, price_frame, to_cents, unit_label
+
+
+def test_to_cents():
+    assert to_cents("$1,209.50") == 120950
+    assert to_cents(2.675) == 268
+    assert to_cents(None) is None
+
+
+def test_typed_prices_from_display():
+    cheese = TypedPrices.from_display("$2.15", "$1.34 per 100gWas $2.70 on Sep 2024")
+    bulk = TypedPrices.from_display(
+        "$1,100.00", "$1,016.67 per 1kg | Was $1,209.50 on Oct 2024"
+    )
+    milk = TypedPrices.from_display("$3.00", "$1.50 per 1L")
+
+    assert cheese == TypedPrices(215, 270, 134, 100, Unit.GRAM)
+    assert bulk == TypedPrices(110000, 120950, 101667, 1, Unit.KILOGRAM)
+    assert milk == TypedPrices(300, None, 150, 1, Unit.LITRE)
+    assert TypedPrices.from_display("$3.00", "Was $3.50").unit is None
+
+
+def test_typed_prices_from_pricing():
+    pricing = {
+        "now": 4.75,
+        "was": 4.9,
+        "unit": {"ofMeasureQuantity": 100, "ofMeasureUnits": "ml", "price": 0.47},
+    }
+    assert TypedPrices.from_pricing(pricing) == TypedPrices(
+        475, 490, 47, 100, Unit.MILLILITRE
+    )
+    assert TypedPrices.from_pricing({"now": 3.0, "was": 0}).was_price_cents is None
+    assert unit_label(100, Unit.MILLILITRE) == "100mL"
+
+
+def test_price_frame_reads_typed_and_legacy_rows():
+    df = pd.DataFrame(
+        {
+            "price": ["$2.15", "$3.00"],
+            "price_calc_method": ["$1.34 per 100gWas $2.70", "$1.50 per 1L"],
+            "price_cents": [215, None],
+            "was_price_cents": [270, None],
+            "unit_price_cents": [134, None],
+            "unit_quantity": [100, None],
+            "unit": ["g", None],
+        }
+    )
+    prices = price_frame(df)
+
+    assert prices["price_aud"].tolist() == [2.15, 3.00]
+    assert prices["unit_price_aud"].tolist() == [1.34, 1.50]
+    assert prices["unit"].tolist() == ["100g", "1L"]
+    assert prices["was_price_aud"].iloc[0] == 2.70
+    assert pd.isna(prices["was_price_aud"].iloc[1])
+
+
+def test_tile_keeps_page_state_prices_without_now_price():
+    # Page state pricing with a was price but no current one.
+    typed = TypedPrices.from_pricing(
+        {
+            "was": 4.9,
+            "unit": {"ofMeasureQuantity": 100, "ofMeasureUnits": "ml", "price": 0.47},
+        }
+    )
+    tile = ProductTile(
+        price="$4.75",
+        price_calc_method="$0.50 per 100gWas $5.00",
+        **vars(typed),
+    )
+
+    assert tile.price_cents == 475  # only missing fields come from the display
+    assert tile.was_price_cents == 490
+    assert (tile.unit_price_cents, tile.unit_quantity, tile.unit) == (
+        47,
+        100,
+        Unit.MILLILITRE,
+    )
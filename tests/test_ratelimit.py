@@ -0,0 +1,96 @@
+"""
+Tests for the adaptive rate limiter.
+"""
+
+import pytest
+
+from src.ratelimit import AdaptiveRateLimiter, TokenBucket
+
+# --- Helpers for Testing --- #
+
+
+class FakeClock:
+    """A manually advanced clock whose sleep moves time forward."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock, **kwargs):
+    return AdaptiveRateLimiter(clock=clock, sleep_func=clock.sleep, **kwargs)
+
+
+# --- Tests --- #
+
+
+def test_token_bucket_reserve(clock):
+    bucket = TokenBucket(rate=2.0, capacity=1.0, clock=clock)
+
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_acquire_paces_requests(clock):
+    limiter = make_limiter(clock, initial_rate=1.0)
+
+    for _ in range(3):
+        limiter.acquire("www.coles.com.au")
+
+    assert clock.sleeps == [pytest.approx(1.0), pytest.approx(1.0)]
+
+
+def test_hosts_are_limited_independently(clock):
+    limiter = make_limiter(clock, initial_rate=1.0)
+
+    limiter.acquire("www.coles.com.au")
+    limiter.acquire("localhost:8000")
+
+    assert clock.sleeps == []
+
+
+def test_record_success_increases_rate_up_to_max(clock):
+    limiter = make_limiter(clock, initial_rate=1.0, increase=0.5, max_rate=2.0)
+
+    limiter.record_success("www.coles.com.au")
+    assert limiter.rate("www.coles.com.au") == 1.5
+
+    for _ in range(5):
+        limiter.record_success("www.coles.com.au")
+    assert limiter.rate("www.coles.com.au") == 2.0
+
+
+def test_record_throttle_decreases_rate_down_to_min(clock):
+    limiter = make_limiter(clock, initial_rate=1.0, min_rate=0.1)
+
+    limiter.record_throttle("www.coles.com.au")
+    assert limiter.rate("www.coles.com.au") == 0.5
+
+    limiter.record_throttle("www.coles.com.au", factor=AdaptiveRateLimiter.BLOCK_FACTOR)
+    assert limiter.rate("www.coles.com.au") == 0.125
+
+    limiter.record_throttle("www.coles.com.au")
+    assert limiter.rate("www.coles.com.au") == 0.1
+
+
+def test_record_throttle_drains_bucket(clock):
+    limiter = make_limiter(clock, initial_rate=1.0)
+    clock.now += 10  # plenty of time to refill
+
+    limiter.record_throttle("www.coles.com.au")
+    limiter.acquire("www.coles.com.au")
+
+    assert clock.sleeps == [pytest.approx(2.0)]
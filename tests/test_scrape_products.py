@@ -0,0 +1,143 @@
+"""
+Tests for the product crawler's subcategory sharding.
+"""
+
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from scripts.scrape_products import (
+    BrowseQuery,
+    build_shards,
+    crawl_category,
+    merge_shard_results,
+)
+from src.models import Category, ProductTile
+
+# --- Helpers for Testing --- #
+
+
+def make_tile_html(slug: str) -> str:
+    return (
+        '<section data-testid="product-tile">'
+        f'<a class="product__link" href="/product/{slug}"></a>'
+        f'<h2 class="product__title">{slug}</h2>'
+        '<span class="price__value">$1.00</span>'
+        "</section>"
+    )
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeFetcher:
+    """
+    A fake ColesPageFetcher serving one page of tiles per browse path.
+    Subsequent pages are empty, which ends pagination.
+    """
+
+    def __init__(self, pages, failing=()):
+        self.pages = pages
+        self.failing = set(failing)
+        self.requested = []
+
+    def get(self, url):
+        self.requested.append(url)
+        if url in self.failing:
+            raise requests.ConnectionError("reset")
+        parsed = urlparse(url)
+        path = parsed.path.replace("/browse/", "", 1)
+        page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+        slugs = self.pages.get(path, []) if page == 1 else []
+        return FakeResponse("".join(make_tile_html(slug) for slug in slugs))
+
+
+def make_category(product_count, subcategories=()):
+    return Category(
+        name="Pantry",
+        slug="pantry",
+        url="https://www.coles.com.au/browse/pantry",
+        product_count=product_count,
+        subcategories=[
+            Category(
+                name=slug,
+                slug=slug,
+                url=f"https://www.coles.com.au/browse/pantry/{slug}",
+                level=2,
+            )
+            for slug in subcategories
+        ],
+    )
+
+
+# --- Tests --- #
+
+
+def test_browse_query_url():
+    assert (
+        BrowseQuery(category="pantry", page=2).url
+        == "https://www.coles.com.au/browse/pantry?page=2"
+    )
+    assert (
+        BrowseQuery(category="pantry", subcategory="snacks").url
+        == "https://www.coles.com.au/browse/pantry/snacks?page=1"
+    )
+
+
+def test_build_shards_small_category():
+    category = make_category(product_count=100, subcategories=["snacks", "canned"])
+    assert build_shards(category) == [BrowseQuery(category="pantry")]
+
+
+def test_build_shards_large_category():
+    category = make_category(product_count=8507, subcategories=["snacks", "canned"])
+    assert build_shards(category) == [
+        BrowseQuery(category="pantry", subcategory="snacks"),
+        BrowseQuery(category="pantry", subcategory="canned"),
+    ]
+
+
+def test_merge_shard_results_dedupes_by_url():
+    a = ProductTile(name="A", url="/product/a-1")
+    b = ProductTile(name="B", url="/product/b-2")
+    a_again = ProductTile(name="A (other aisle)", url="/product/a-1")
+
+    assert merge_shard_results([[a, b], [a_again]]) == [a, b]
+
+
+def test_crawl_category_sharded():
+    fetcher = FakeFetcher(
+        pages={
+            "pantry/snacks": ["chips-1", "nuts-2"],
+            "pantry/canned": ["beans-3", "nuts-2"],
+        }
+    )
+    category = make_category(product_count=8507, subcategories=["snacks", "canned"])
+
+    result = crawl_category(fetcher, category, max_workers=2)
+
+    assert result.complete
+    assert sorted(product.url for product in result.products) == [
+        "/product/beans-3",
+        "/product/chips-1",
+        "/product/nuts-2",
+    ]
+    assert not any(
+        url.startswith("https://www.coles.com.au/browse/pantry?")
+        for url in fetcher.requested
+    )
+
+
+def test_crawl_category_with_failed_page_is_incomplete():
+    fetcher = FakeFetcher(
+        pages={"pantry/snacks": ["chips-1"], "pantry/canned": ["beans-3"]},
+        failing=["https://www.coles.com.au/browse/pantry/canned?page=1"],
+    )
+    category = make_category(product_count=8507, subcategories=["snacks", "canned"])
+
+    result = crawl_category(fetcher, category, max_workers=2)
+
+    assert not result.complete
+    assert [product.url for product in result.products] == ["/product/chips-1"]
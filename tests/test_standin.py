@@ -0,0 +1,156 @@
+"""
+Tests for the local Coles stand-in server.
+"""
+
+import gc
+import weakref
+
+import pytest
+import requests
+
+from src.exceptions import BotDetectedError
+from src.fetcher import ColesPageFetcher
+from src.metrics import MetricsRegistry
+from src.ratelimit import AdaptiveRateLimiter
+from src.retry import FailureKind, RetryPolicy, RetryRule, Strategy
+from src.scrapers import ColesProductScraper, ColesProductTileScraper
+from src.standin import (
+    PAGE_CACHE_SIZE,
+    ColesStandIn,
+    LatencyDistribution,
+    StandInConfig,
+)
+
+# --- Helpers for Testing --- #
+
+
+def make_fetcher(base_url, **kwargs):
+    return ColesPageFetcher(
+        headers={"cookie": "stand-in"},
+        sleep_func=lambda seconds: None,
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e9, max_rate=1e9),
+        retry_policy=RetryPolicy(base_delay=0),
+        metrics=MetricsRegistry(),
+        base_url=base_url,
+        **kwargs,
+    )
+
+
+# --- Tests --- #
+
+
+def test_latency_distribution_parse():
+    latency = LatencyDistribution.parse("lognormal:0.2,0.5")
+    assert latency == LatencyDistribution("lognormal", 0.2, 0.5)
+    assert LatencyDistribution.parse("constant:0.05").sample(None) == 0.05
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("gaussian:1")
+
+
+def test_fetcher_base_url_rewrites_origin():
+    fetcher = make_fetcher("http://127.0.0.1:8000")
+    assert (
+        fetcher.resolve_url("https://www.coles.com.au/browse/pantry?page=2")
+        == "http://127.0.0.1:8000/browse/pantry?page=2"
+    )
+    assert fetcher.refresh_url.startswith("http://127.0.0.1:8000/browse/")
+
+
+def test_standin_serves_paginated_browse_pages():
+    with ColesStandIn() as standin:
+        fetcher = make_fetcher(standin.base_url)
+
+        page_1 = ColesProductTileScraper(
+            fetcher.get("https://www.coles.com.au/browse/pantry?page=1").content
+        ).get_all_products()
+        page_2 = ColesProductTileScraper(
+            fetcher.get("https://www.coles.com.au/browse/pantry?page=2").content
+        ).get_all_products()
+        past_end = ColesProductTileScraper(
+            fetcher.get(
+                f"https://www.coles.com.au/browse/pantry?page={standin.last_page + 1}"
+            ).content
+        ).get_all_products()
+        product = ColesProductScraper(
+            fetcher.get(
+                "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+            ).content
+        ).get_product()
+
+    assert standin.last_page == 41
+    assert len(page_1) == len(page_2) > 0
+    assert not {p.url for p in page_1} & {p.url for p in page_2}
+    assert past_end == []
+    assert product.product_code == "Code: 8060378"
+
+
+def test_standin_page_caches_are_bounded_and_per_instance():
+    # Never started: only the rendering is used.
+    standin, other = ColesStandIn(), ColesStandIn()
+    standin.server.server_close()
+    other.server.server_close()
+    for page in range(1, PAGE_CACHE_SIZE + 10):
+        standin.browse_page_for(page)
+        standin.browse_data_for(page)
+
+    assert standin.browse_page_for.cache_info().currsize == PAGE_CACHE_SIZE
+    assert standin.browse_data_for.cache_info().currsize == PAGE_CACHE_SIZE
+    assert other.browse_page_for.cache_info().currsize == 0
+
+    # The caches don't keep the stand-in alive.
+    ref = weakref.ref(standin)
+    del standin
+    gc.collect()
+    assert ref() is None
+
+
+def test_standin_blocks_after_n_requests():
+    config = StandInConfig(block_after=2, block_for=1)
+    with ColesStandIn(config) as standin:
+        fetcher = make_fetcher(standin.base_url)
+        fetcher.get("https://www.coles.com.au/browse/pantry")
+        fetcher.get("https://www.coles.com.au/browse/pantry")
+        # Give up on blocks rather than refreshing the cookie with a browser.
+        fetcher.retry_policy = RetryPolicy(
+            rules={FailureKind.BOT_BLOCK: RetryRule(Strategy.GIVE_UP, 0)}
+        )
+        with pytest.raises(BotDetectedError):
+            fetcher.get("https://www.coles.com.au/browse/pantry")
+        fetcher.get("https://www.coles.com.au/browse/pantry")
+
+
+def test_standin_injects_errors_and_rate_limits():
+    config = StandInConfig(rate_limit_rate=0.5, error_rate=0.5, seed=1)
+    with ColesStandIn(config) as standin:
+        statuses = [
+            requests.get(f"{standin.base_url}/browse/pantry").status_code
+            for _ in range(20)
+        ]
+        retry_after = None
+        while retry_after is None:
+            response = requests.get(f"{standin.base_url}/browse/pantry")
+            retry_after = response.headers.get("Retry-After")
+
+    assert set(statuses) == {429, 503}
+    assert retry_after == "1"
+
+
+def test_fetcher_stops_after_page_state():
+    product_url = "https://www.coles.com.au/product/appy-fizz-250ml-8060378"
+    browse_url = "https://www.coles.com.au/browse/pantry?page=1"
+    with ColesStandIn() as standin:
+        full = make_fetcher(standin.base_url)
+        fetcher = make_fetcher(standin.base_url, stop_after_page_state=True)
+
+        response = fetcher.get(product_url)
+        assert response.truncated
+        assert response.content.endswith(b"</script>")
+        assert len(response.content) < len(full.get(product_url).content)
+        assert (
+            ColesProductScraper.from_response(response).get_product()
+            == ColesProductScraper.from_response(full.get(product_url)).get_product()
+        )
+
+        scraper = ColesProductTileScraper.from_response(fetcher.get(browse_url))
+        full_scraper = ColesProductTileScraper.from_response(full.get(browse_url))
+        assert scraper.get_all_products() == full_scraper.get_all_products()
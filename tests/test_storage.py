@@ -0,0 +1,114 @@
+"""
+Tests for the dataset storage layer.
+"""
+
+import os
+
+import pandas as pd
+import pytest
+
+from scripts.scrape_products import update_csv_with_archive
+from src.history import PriceHistory
+from src.storage import RAW_PRODUCTS_SCHEMA, DatasetStore, StorageFormat
+
+pytest.importorskip("pyarrow")
+
+COLUMNAR_FORMATS = [StorageFormat.PARQUET, StorageFormat.ARROW]
+
+# --- Helpers for Testing --- #
+
+
+def make_raw_products(timestamp, prices):
+    return pd.DataFrame(
+        {
+            "name": [f"Product {slug} | 500g" for slug in prices],
+            "url": [f"/product/{slug}-1" for slug in prices],
+            "price": list(prices.values()),
+            "price_calc_method": None,
+            "image_url": None,
+            "was_price": None,
+            "discount_percentage": None,
+            "special_type": "Special",
+            "is_on_special": True,
+            "category": "pantry",
+            "date": timestamp[:10],
+            "timestamp": timestamp,
+        }
+    )
+
+
+# --- Tests --- #
+
+
+@pytest.mark.parametrize("format", COLUMNAR_FORMATS)
+def test_columnar_round_trip_keeps_types(tmp_path, format):
+    store = DatasetStore(format)
+    df = make_raw_products("2024-10-01T10:00:00+10:00", {"milk": "$3.10"})
+
+    written = store.write(df, str(tmp_path / "products.csv"), RAW_PRODUCTS_SCHEMA)
+    loaded = store.read(str(tmp_path / "products.csv"))
+
+    assert written == str(tmp_path / f"products{format.extension}")
+    assert list(loaded.columns) == list(df.columns)
+    assert loaded["category"].dtype == "category"
+    assert loaded["is_on_special"].dtype == bool
+    assert loaded["timestamp"].iloc[0] == pd.Timestamp("2024-10-01T00:00:00Z")
+    assert loaded["price_calc_method"].isna().all()
+
+
+def test_read_falls_back_to_other_formats(tmp_path):
+    path = str(tmp_path / "products.csv")
+    pd.DataFrame({"url": ["/product/milk-1"]}).to_csv(path, index=False)
+
+    store = DatasetStore(StorageFormat.PARQUET)
+    assert store.resolve(path) == path
+    assert store.read(path)["url"].tolist() == ["/product/milk-1"]
+
+    store.write(store.read(path), path)
+    assert store.resolve(path) == str(tmp_path / "products.parquet")
+
+
+def test_resolve_reads_the_newest_copy(tmp_path):
+    path = str(tmp_path / "products.csv")
+    parquet_store = DatasetStore(StorageFormat.PARQUET)
+    csv_store = DatasetStore(StorageFormat.CSV)
+
+    # A CSV copy left over from before switching to Parquet.
+    csv_store.write(pd.DataFrame({"url": ["/product/milk-1"]}), path)
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    parquet_store.write(
+        pd.DataFrame({"url": ["/product/milk-1", "/product/bread-2"]}), path
+    )
+
+    # Switching back to CSV reads the newer Parquet copy, not the stale CSV.
+    assert csv_store.resolve(path) == str(tmp_path / "products.parquet")
+    assert len(csv_store.read(path)) == 2
+
+    # Exports are written where the store does not read datasets from.
+    export_dir = str(tmp_path / "export")
+    exported = parquet_store.export(path, StorageFormat.CSV, directory=export_dir)
+    assert exported == os.path.join(export_dir, "products.csv")
+    assert csv_store.resolve(path) == str(tmp_path / "products.parquet")
+
+
+@pytest.mark.parametrize("format", COLUMNAR_FORMATS)
+def test_update_csv_with_archive_in_columnar_format(tmp_path, format):
+    store = DatasetStore(format)
+    target = str(tmp_path / "raw" / "products.csv")
+    archive = str(tmp_path / "archive" / "products_dropped.csv")
+
+    day_1 = make_raw_products("2024-10-01T10:00:00+10:00", {"milk": "$3.10"})
+    day_2 = make_raw_products(
+        "2024-10-02T10:00:00+11:00", {"milk": "$2.90", "eggs": "$6.00"}
+    )
+    update_csv_with_archive(day_1, target, archive, store=store)
+    update_csv_with_archive(day_2, target, archive, store=store)
+
+    latest = store.read(target).sort_values("url")
+    assert latest["price"].tolist() == ["$6.00", "$2.90"]
+    assert store.read(archive)["price"].tolist() == ["$3.10"]
+
+    with PriceHistory(":memory:") as history:
+        assert history.ingest_dataset(archive, store=store, chunk_rows=1) == 1
+        assert history.ingest_dataset(target, store=store, chunk_rows=1) == 2
+        assert history.product_history("milk")["price_aud"].tolist() == [3.10, 2.90]
@@ -0,0 +1,49 @@
+"""
+Tests for unit price normalisation.
+"""
+
+import pandas as pd
+
+from src.prices import Unit
+from src.units import (
+    BASE_UNIT_COLUMNS,
+    add_base_unit_prices,
+    normalise_unit_prices,
+    parse_unit_of_measure,
+)
+
+
+def test_parse_unit_of_measure():
+    assert parse_unit_of_measure("100g") == (100, Unit.GRAM)
+    assert parse_unit_of_measure("100mL") == (100, Unit.MILLILITRE)
+    assert parse_unit_of_measure("kg") == (1, Unit.KILOGRAM)
+    assert parse_unit_of_measure("100 sheets") is None
+    assert parse_unit_of_measure(None) is None
+
+
+def test_normalise_unit_prices():
+    prices = pd.Series([1.34, 13.57, 0.48, 2.43, 0.85, 0.20, 1.50], index=range(10, 17))
+    units = pd.Series(["100g", "1kg", "100mL", "1L", "1ea", "100 sheets", None])
+    units.index = prices.index
+
+    normalised = normalise_unit_prices(prices, units)
+
+    assert list(normalised.columns) == BASE_UNIT_COLUMNS
+    assert normalised.index.equals(prices.index)
+    assert normalised["base_unit_price_aud"].tolist()[:5] == [
+        13.4,
+        13.57,
+        4.8,
+        2.43,
+        0.85,
+    ]
+    assert normalised["base_unit"].tolist()[:5] == ["kg", "kg", "L", "L", "ea"]
+    assert normalised["is_comparable"].tolist() == [True] * 5 + [False] * 2
+    assert normalised["base_unit"].iloc[5:].isna().all()
+
+
+def test_add_base_unit_prices_is_idempotent():
+    df = pd.DataFrame({"unit_price_aud": [1.34], "unit_of_measure": ["100g"]})
+    once = add_base_unit_prices(df)
+    assert add_base_unit_prices(once).equals(once)
+    assert once["base_unit_price_aud"].iloc[0] == 13.4